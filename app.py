@@ -1,17 +1,30 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_bcrypt import Bcrypt
 from werkzeug.security import generate_password_hash, check_password_hash
-from models.database import db, User, Plumber, Booking, TrustScore, FraudAlert, LocalModelUpdate, GlobalModel
+from models.database import (db, User, Plumber, Booking, TrustScore, FraudAlert, LocalModelUpdate, GlobalModel,
+                             PrivacyLedger)
+from models.dashboard_stats import get_admin_dashboard_stats
+from models.booking_counters import (record_booking_created, record_status_change, record_review,
+                                     get_booking_counts, rebuild_booking_counters,
+                                     backfill_booking_counters_if_empty)
+from models.migrations import ensure_indexes, ensure_weight_blob_columns, detach_memory_updates
+from models.fraud_features import booking_features
 from ml_models.fraud_detector import fraud_detector
+from ml_models.micro_batcher import fraud_micro_batcher
+from ml_models.model_registry import fraud_model_registry
 from ml_models.federated_orchestrator import federated_orchestrator
+from ml_models.aggregation_scheduler import federated_scheduler
+from ml_models.weight_codec import (WEIGHTS_MIMETYPE, encode_weights, decode_weights, is_sparse_payload,
+                                   decode_sparse_delta)
 from ml_models.trust_scorer import trust_scorer
 from config import Config
 from datetime import datetime, timedelta
 from functools import wraps
-import json
+import hmac
 import numpy as np
 import random
+import threading
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -21,6 +34,77 @@ bcrypt = Bcrypt(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
 
+fraud_detector.set_inference_engine(app.config['FRAUD_INFERENCE_ENGINE'])
+fraud_model_registry.configure(
+    model_dir=app.config['FRAUD_MODEL_DIR'],
+    poll_interval=app.config['FRAUD_MODEL_POLL_SECONDS'],
+    enabled=app.config['FRAUD_MODEL_RELOAD']
+)
+if fraud_model_registry.check_for_update():
+    print(f"Loaded fraud model version {fraud_detector.model_version} from {app.config['FRAUD_MODEL_DIR']}")
+fraud_micro_batcher.configure(
+    enabled=app.config['FRAUD_MICRO_BATCH'],
+    max_batch_size=app.config['FRAUD_MICRO_BATCH_MAX_SIZE'],
+    max_wait_ms=app.config['FRAUD_MICRO_BATCH_MAX_WAIT_MS']
+)
+federated_orchestrator.configure(
+    accumulation_dtype=app.config['FEDAVG_ACCUMULATION_DTYPE'],
+    aggregation_mode=app.config['FEDAVG_AGGREGATION_MODE'],
+    track_client_metadata=app.config['FEDAVG_CLIENT_METADATA'],
+    min_updates=app.config['FEDAVG_MIN_UPDATES'],
+    aggregation_rule=app.config['FEDAVG_AGGREGATION_RULE'],
+    trim_ratio=app.config['FEDAVG_TRIM_RATIO'],
+    byzantine_clients=app.config['FEDAVG_BYZANTINE_CLIENTS'],
+    multi_krum_size=app.config['FEDAVG_MULTI_KRUM_SIZE'],
+    dp_clip_norm=app.config['FEDAVG_DP_CLIP_NORM'],
+    dp_noise_multiplier=app.config['FEDAVG_DP_NOISE_MULTIPLIER'],
+    dp_sample_rate=app.config['FEDAVG_DP_SAMPLE_RATE'],
+    dp_delta=app.config['FEDAVG_DP_DELTA'],
+    async_buffer_size=app.config['FEDAVG_ASYNC_BUFFER_SIZE'],
+    max_staleness=app.config['FEDAVG_MAX_STALENESS'],
+    staleness_exponent=app.config['FEDAVG_STALENESS_EXPONENT'],
+    server_learning_rate=app.config['FEDAVG_SERVER_LEARNING_RATE']
+)
+
+def persist_global_model(version, weights, updates_aggregated, privacy=None):
+    """Write the GlobalModel row for a FedAvg round before it is published.
+
+    Runs in its own app context so the background scheduler can call it.
+    A retried round overwrites the row for its version: with the file
+    state backend the retry may have claimed more updates. (The sql
+    backend writes the row itself when it publishes.) A DP round's
+    privacy spent goes into PrivacyLedger in the same transaction.
+    """
+    with app.app_context():
+        try:
+            global_model = GlobalModel.query.filter_by(version=version).first()
+            if global_model is None:
+                db.session.add(GlobalModel(version=version, weights=weights, updates_aggregated=updates_aggregated))
+            else:
+                global_model.weights = weights
+                global_model.updates_aggregated = updates_aggregated
+            if privacy is not None:
+                entry = PrivacyLedger.query.filter_by(version=version).first()
+                if entry is None:
+                    entry = PrivacyLedger(version=version)
+                    db.session.add(entry)
+                entry.epsilon = privacy['epsilon']
+                entry.delta = privacy['delta']
+                entry.accountant_state = privacy
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+federated_scheduler.configure(
+    enabled=app.config['FEDAVG_AUTO_AGGREGATE'],
+    max_wait_seconds=app.config['FEDAVG_MAX_WAIT_SECONDS'],
+    min_samples=app.config['FEDAVG_MIN_SAMPLES'],
+    persist=persist_global_model
+)
+# Long polls of the global model waiting at once (see FEDAVG_LONG_POLL_MAX_WAITERS)
+long_poll_slots = threading.BoundedSemaphore(max(0, app.config['FEDAVG_LONG_POLL_MAX_WAITERS']))
+
 # Custom Jinja2 filter to convert UTC to IST
 @app.template_filter('to_ist')
 def to_ist(utc_dt):
@@ -31,6 +115,11 @@ def to_ist(utc_dt):
     ist_dt = utc_dt + ist_offset
     return ist_dt.strftime('%Y-%m-%d %H:%M IST')
 
+@app.before_request
+def watch_fraud_models():
+    # Cheap pid check; starts the reload watcher once per worker process
+    fraud_model_registry.ensure_watching()
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -158,98 +247,14 @@ def plumber_dashboard():
 @login_required
 @role_required('admin')
 def admin_dashboard():
-    total_users = User.query.count()
-    total_plumbers = Plumber.query.count()
-    total_bookings = Booking.query.count()
-    completed_bookings = Booking.query.filter_by(status='completed').count()
-    pending_bookings = Booking.query.filter_by(status='pending').count()
-    
-    fraud_alerts = FraudAlert.query.filter_by(status='pending').order_by(FraudAlert.flagged_at.desc()).all()
-    recent_bookings = Booking.query.order_by(Booking.created_at.desc()).limit(10).all()
-    
-    # Get all reviews (completed bookings with ratings)
-    all_reviews = Booking.query.filter(Booking.rating.isnot(None)).order_by(Booking.created_at.desc()).all()
-    
-    # Get all plumber profiles with their stats
-    plumbers = Plumber.query.all()
-    plumber_stats = []
-    for plumber in plumbers:
-        plumber_bookings = Booking.query.filter_by(plumber_id=plumber.id).count()
-        plumber_completed = Booking.query.filter_by(plumber_id=plumber.id, status='completed').count()
-        plumber_reviews = Booking.query.filter_by(plumber_id=plumber.id).filter(Booking.rating.isnot(None)).all()
-        avg_rating = sum([r.rating for r in plumber_reviews]) / len(plumber_reviews) if plumber_reviews else 0
-        trust = TrustScore.query.filter_by(plumber_id=plumber.id).first()
-        
-        plumber_stats.append({
-            'plumber': plumber,
-            'total_bookings': plumber_bookings,
-            'completed_bookings': plumber_completed,
-            'avg_rating': round(avg_rating, 2),
-            'review_count': len(plumber_reviews),
-            'trust_score': trust.overall_score if trust else 50
-        })
-    
-    # Get all customer profiles
-    customers = User.query.filter_by(role='customer').all()
-    customer_stats = []
-    for customer in customers:
-        customer_bookings = Booking.query.filter_by(customer_id=customer.id).count()
-        customer_completed = Booking.query.filter_by(customer_id=customer.id, status='completed').count()
-        trust = TrustScore.query.filter_by(user_id=customer.id).first()
-        
-        customer_stats.append({
-            'customer': customer,
-            'total_bookings': customer_bookings,
-            'completed_bookings': customer_completed,
-            'trust_score': trust.overall_score if trust else 50
-        })
-    
-    # Calculate statistics for charts
-    status_counts = {
-        'pending': pending_bookings,
-        'accepted': Booking.query.filter_by(status='accepted').count(),
-        'completed': completed_bookings,
-        'cancelled': Booking.query.filter_by(status='cancelled').count()
-    }
-    
-    # Fraud risk distribution
-    fraud_risk_counts = {
-        'no_risk': FraudAlert.query.filter(FraudAlert.risk_score < 30).count(),
-        'low': FraudAlert.query.filter(FraudAlert.risk_score.between(30, 50)).count(),
-        'medium': FraudAlert.query.filter(FraudAlert.risk_score.between(50, 70)).count(),
-        'high': FraudAlert.query.filter(FraudAlert.risk_score >= 70).count()
-    }
-    
-    # Rating distribution
-    rating_counts = {
-        '5': Booking.query.filter_by(rating=5).count(),
-        '4': Booking.query.filter_by(rating=4).count(),
-        '3': Booking.query.filter_by(rating=3).count(),
-        '2': Booking.query.filter_by(rating=2).count(),
-        '1': Booking.query.filter_by(rating=1).count()
-    }
-    
-    global_model = GlobalModel.query.filter_by(is_active=True).first()
+    stats = get_admin_dashboard_stats()
     fl_stats = federated_orchestrator.get_stats()
     fraud_metrics = fraud_detector.get_metrics()
     
     return render_template('admin_dashboard.html',
-                         total_users=total_users,
-                         total_plumbers=total_plumbers,
-                         total_bookings=total_bookings,
-                         completed_bookings=completed_bookings,
-                         pending_bookings=pending_bookings,
-                         fraud_alerts=fraud_alerts,
-                         recent_bookings=recent_bookings,
-                         all_reviews=all_reviews,
-                         plumber_stats=plumber_stats,
-                         customer_stats=customer_stats,
-                         status_counts=status_counts,
-                         fraud_risk_counts=fraud_risk_counts,
-                         rating_counts=rating_counts,
-                         global_model=global_model,
                          fl_stats=fl_stats,
-                         fraud_metrics=fraud_metrics)
+                         fraud_metrics=fraud_metrics,
+                         **stats)
 
 @app.route('/api/bookings/create', methods=['POST'])
 @login_required
@@ -270,49 +275,24 @@ def create_booking():
     )
     
     db.session.add(booking)
+    record_booking_created(booking)
     db.session.commit()
     
     # --- Build rich feature set for fraud detection ---
-    # Historical booking counts
-    customer_total_bookings = Booking.query.filter_by(customer_id=current_user.id).count()
-    plumber_total_bookings = Booking.query.filter_by(plumber_id=plumber.id).count()
-
-    # Historical cancellation rates
-    customer_cancelled = Booking.query.filter_by(customer_id=current_user.id, status='cancelled').count()
-    plumber_cancelled = Booking.query.filter_by(plumber_id=plumber.id, status='cancelled').count()
-
-    customer_cancellation_rate = (customer_cancelled / customer_total_bookings) if customer_total_bookings else 0.0
-    plumber_cancellation_rate = (plumber_cancelled / plumber_total_bookings) if plumber_total_bookings else 0.0
-
-    # Time to booking in hours from now
-    now_utc = datetime.utcnow()
-    time_to_booking_hours = max(0.0, (booking.scheduled_date - now_utc).total_seconds() / 3600.0)
-
-    # Price deviation from plumber's typical hourly rate.
-    # This drives price manipulation detection in the fraud engine.
-    baseline_price = plumber.hourly_rate or 0.0
-    price_dev = 0.0
-    if baseline_price > 0 and booking.price is not None:
-        ratio = float(booking.price) / float(baseline_price)
-        if ratio >= 3.0:
-            price_dev = 3.0
-        elif ratio >= 2.0:
-            price_dev = 2.0
-        else:
-            # small positive number when price modestly above typical rate
-            price_dev = max(0.0, ratio - 1.0)
-
-    booking_data = {
-        'price': booking.price,
-        'customer_total_bookings': customer_total_bookings,
-        'plumber_total_bookings': plumber_total_bookings,
-        'customer_cancellation_rate': customer_cancellation_rate,
-        'plumber_cancellation_rate': plumber_cancellation_rate,
-        'time_to_booking_hours': time_to_booking_hours,
-        'price_deviation_from_avg': price_dev
-    }
+    # Historical booking counts and cancellation rates, read from the
+    # incrementally maintained counters; time to booking from now.
+    customer_counts, plumber_counts = get_booking_counts(current_user.id, plumber.id)
+    booking_data = booking_features(
+        booking.price,
+        plumber.hourly_rate,
+        booking.scheduled_date,
+        datetime.utcnow(),
+        customer_counts,
+        plumber_counts
+    )
+    price_dev = booking_data['price_deviation_from_avg']
     
-    fraud_result = fraud_detector.detect_anomaly(booking_data)
+    fraud_result = fraud_micro_batcher.detect_anomaly(booking_data)
 
     # Convenience flag for frontend messaging when rule-based price deviation was high
     rule_price_deviation = price_dev >= 2.0
@@ -353,28 +333,105 @@ def get_trust_score(user_id):
         'total_transactions': trust_score.total_transactions
     })
 
+def valid_sample_count(num_samples):
+    """True for a positive, finite sample count (a JSON number or parsed header)"""
+    return (isinstance(num_samples, (int, float)) and not isinstance(num_samples, bool)
+            and 0 < num_samples < float('inf'))
+
 @app.route('/api/federated/submit-update', methods=['POST'])
 @login_required
 def submit_federated_update():
-    data = request.get_json()
-    
     client_id = current_user.id
-    local_weights = data.get('weights', [])
-    num_samples = data.get('num_samples', 0)
-    
-    if not local_weights or num_samples == 0:
-        return jsonify({'success': False, 'message': 'Invalid update data'}), 400
-    
-    federated_orchestrator.receive_local_update(client_id, local_weights, num_samples)
-    
-    local_update = LocalModelUpdate(
-        user_id=current_user.id,
-        model_version=federated_orchestrator.global_model_version,
-        update_data=json.dumps(local_weights),
-        data_samples_count=num_samples
-    )
-    db.session.add(local_update)
-    db.session.commit()
+    # (indices, values, base_version) when the client sent a sparse delta
+    delta = None
+    # Model version dense weights were trained from (asynchronous mode);
+    # None means the current version
+    trained_from = None
+    
+    if request.mimetype == WEIGHTS_MIMETYPE:
+        # Binary body (ml_models/weight_codec.py); sample count travels in
+        # the X-Num-Samples header or ?num_samples=
+        body = request.get_data(cache=False)
+        try:
+            if is_sparse_payload(body):
+                indices, values, header = decode_sparse_delta(body)
+                delta = (indices, values, header['version'])
+            else:
+                local_weights, header = decode_weights(body)
+                trained_from = header['version'] or None
+        except ValueError as e:
+            return jsonify({'success': False, 'message': f'Invalid update data: {e}'}), 400
+        num_samples = request.headers.get('X-Num-Samples', type=int) or request.args.get('num_samples', 0, type=int)
+        if not valid_sample_count(num_samples) or (delta is None and local_weights.size == 0):
+            return jsonify({'success': False, 'message': 'Invalid update data'}), 400
+    else:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'message': 'Invalid update data'}), 400
+        num_samples = data.get('num_samples', 0)
+        
+        if 'delta' in data:
+            # {"delta": {"indices": [...], "values": [...]}, "base_version": N, "num_samples": n}
+            sparse = data.get('delta') or {}
+            if not isinstance(sparse, dict) or not valid_sample_count(num_samples):
+                return jsonify({'success': False, 'message': 'Invalid update data'}), 400
+            delta = (sparse.get('indices', []), sparse.get('values', []), data.get('base_version'))
+        else:
+            local_weights = data.get('weights', [])
+            trained_from = data.get('base_version')
+            
+            if not local_weights or not valid_sample_count(num_samples):
+                return jsonify({'success': False, 'message': 'Invalid update data'}), 400
+    
+    ready = False
+    if federated_orchestrator.async_buffer_size is not None:
+        # Asynchronous mode: applied with a staleness discount, no round to wait for
+        if delta is not None:
+            indices, values, model_version = delta
+            result = federated_orchestrator.receive_async_update(client_id, num_samples, model_version,
+                                                                 sparse_delta=(indices, values))
+            payload = {'sparse_delta': (indices, values)}
+        else:
+            model_version = trained_from or federated_orchestrator.global_model_version
+            result = federated_orchestrator.receive_async_update(client_id, num_samples, model_version,
+                                                                 local_weights=local_weights)
+            payload = {'weights': local_weights}
+        if not result['success']:
+            return jsonify({'success': False, 'message': result['message']}), 409 if result['stale'] else 400
+        ready = result['ready']
+    elif delta is not None:
+        indices, values, base_version = delta
+        result = federated_orchestrator.receive_sparse_update(client_id, indices, values, num_samples, base_version)
+        if not result['success']:
+            # 409 tells the client to fetch the current model and recompute its delta
+            return jsonify({'success': False, 'message': result['message']}), 409 if result['stale'] else 400
+        model_version, payload = base_version, {'sparse_delta': (indices, values)}
+    else:
+        if not federated_orchestrator.receive_local_update(client_id, local_weights, num_samples):
+            expected = federated_orchestrator.global_weights.size
+            return jsonify({'success': False, 'message': f'Invalid update data: expected {expected} numeric weights'}), 400
+        model_version, payload = federated_orchestrator.global_model_version, {'weights': local_weights}
+    
+    # The sql state backend already stored the update as its pending row
+    if federated_orchestrator.state is None or not federated_orchestrator.state.records_updates:
+        local_update = LocalModelUpdate(
+            user_id=current_user.id,
+            model_version=model_version,
+            data_samples_count=num_samples,
+            # NULL: outside any shared round, this round lives in the orchestrator's memory
+            aggregated=None,
+            **payload
+        )
+        db.session.add(local_update)
+        db.session.commit()
+    if ready and not federated_scheduler.enabled:
+        # Without the background scheduler, the update that fills the buffer advances the model
+        try:
+            federated_orchestrator.aggregate_updates(persist=persist_global_model)
+        except Exception as e:
+            # Kept unpublished; the next full buffer or the admin endpoint retries it
+            print(f"Asynchronous aggregation failed: {e}")
+    federated_scheduler.notify()
     
     stats = federated_orchestrator.get_stats()
     
@@ -384,29 +441,177 @@ def submit_federated_update():
         'stats': stats
     })
 
+@app.route('/api/federated/regional/submit', methods=['POST'])
+def submit_regional_partial():
+    # Regional aggregators (run_regional_aggregator.py) authenticate with
+    # the shared token rather than a user session
+    token = app.config['FEDAVG_REGION_TOKEN']
+    if not token or not hmac.compare_digest(request.headers.get('X-Region-Token', ''), token):
+        return jsonify({'success': False, 'message': 'Invalid region token'}), 403
+    try:
+        weighted_sum, _ = decode_weights(request.get_data(cache=False))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid partial aggregate: {e}'}), 400
+    region = request.headers.get('X-Region', 'unknown')
+    
+    result = federated_orchestrator.receive_partial_aggregate(
+        region, weighted_sum, request.headers.get('X-Num-Samples', 0, type=float),
+        request.headers.get('X-Num-Updates', 0, type=int), partial_id=request.headers.get('X-Partial-Id'))
+    if not result['success']:
+        return jsonify(result), 400
+    if not result['duplicate']:
+        federated_scheduler.notify()
+    return jsonify({'success': True, 'duplicate': result['duplicate'], 'message': result['message'],
+                    'stats': federated_orchestrator.get_stats()})
+
+@app.route('/api/federated/regional/assignment')
+@login_required
+def regional_assignment():
+    # Where this user should post updates: the aggregator of their
+    # plumber location's region, or the root when none is configured
+    plumber = Plumber.query.filter_by(user_id=current_user.id).first()
+    region = plumber.location if plumber is not None else None
+    aggregator_url = app.config['FEDAVG_REGIONAL_AGGREGATORS'].get(region)
+    return jsonify({
+        'region': region,
+        'submit_url': aggregator_url.rstrip('/') + '/submit-update' if aggregator_url
+                      else url_for('submit_federated_update', _external=True)
+    })
+
 @app.route('/api/federated/global-model')
 @login_required
 def get_global_model():
-    global_model_data = federated_orchestrator.get_global_model()
-    return jsonify(global_model_data)
+    # Clients sending Accept: application/x-sae-weights get the binary
+    # format, optionally ?dtype=float16|int8 and ?compression=deflate|zstd.
+    # Both are serialized once per version. The weak ETag is the version:
+    # If-None-Match with the client's version gets 304, and
+    # ?since_version=N waits for a version other than N (long poll)
+    since_version = request.args.get('since_version', type=int)
+    if since_version is not None:
+        timeout = min(request.args.get('timeout', app.config['FEDAVG_LONG_POLL_SECONDS'], type=float),
+                      app.config['FEDAVG_LONG_POLL_SECONDS'])
+        if timeout <= 0:
+            snapshot = federated_orchestrator.get_snapshot()
+        elif long_poll_slots.acquire(blocking=False):
+            try:
+                snapshot = federated_orchestrator.wait_for_version(since_version, timeout)
+            finally:
+                long_poll_slots.release()
+        else:
+            snapshot = federated_orchestrator.get_snapshot()
+            if snapshot.version == since_version:
+                # Every slot is taken: an immediate 304 would have the client poll again at once
+                return long_poll_busy(snapshot.version)
+        if snapshot.version == since_version:
+            return not_modified(snapshot.version)
+    else:
+        snapshot = federated_orchestrator.get_snapshot()
+    if request.if_none_match.contains_weak(str(snapshot.version)):
+        return not_modified(snapshot.version)
+    
+    if request.accept_mimetypes.best_match(['application/json', WEIGHTS_MIMETYPE]) == WEIGHTS_MIMETYPE:
+        dtype, compression = request.args.get('dtype', 'float32'), request.args.get('compression', 'none')
+        try:
+            version, body = federated_orchestrator.get_global_model_binary(
+                lambda version, weights: encode_weights(weights, dtype=dtype, compression=compression, version=version),
+                (dtype, compression), snapshot=snapshot)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        response = Response(body, mimetype=WEIGHTS_MIMETYPE)
+    else:
+        version, body = federated_orchestrator.get_global_model_json(snapshot=snapshot)
+        response = Response(body, mimetype='application/json')
+    return model_version_headers(response, version)
+
+def not_modified(version):
+    return model_version_headers(Response(status=304), version)
+
+def long_poll_busy(version):
+    response = jsonify({'success': False, 'message': 'Too many clients waiting for the next model version'})
+    response.status_code = 503
+    # Jittered, so the turned-away clients do not all come back at once
+    retry_after = app.config['FEDAVG_LONG_POLL_RETRY_SECONDS']
+    response.headers['Retry-After'] = str(random.randint(retry_after, 2 * retry_after))
+    response.headers['X-Model-Version'] = str(version)
+    return response
+
+def model_version_headers(response, version):
+    response.set_etag(str(version), weak=True)
+    response.headers['X-Model-Version'] = str(version)
+    # Cached copies must be revalidated; the session makes them per user
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Accept')
+    return response
 
 @app.route('/api/federated/aggregate', methods=['POST'])
 @login_required
 @role_required('admin')
 def aggregate_federated_updates():
-    result = federated_orchestrator.aggregate_updates()
-    
-    if result['success']:
-        global_model = GlobalModel(
-            version=result['new_version'],
-            model_data=json.dumps(federated_orchestrator.global_weights.tolist()),
-            updates_aggregated=result['updates_aggregated']
-        )
-        db.session.add(global_model)
-        db.session.commit()
+    try:
+        if federated_orchestrator.secure_round is not None:
+            # Close the secure round first; plain updates wait for the next call
+            result = federated_orchestrator.aggregate_secure_round(persist=persist_global_model)
+        else:
+            result = federated_orchestrator.aggregate_updates(persist=persist_global_model)
+    except Exception as e:
+        # Nothing was published; the round is kept and retried by the next call
+        return jsonify({'success': False, 'message': f'Could not save the new global model: {e}'}), 500
     
     return jsonify(result)
 
+@app.route('/api/federated/secure/round', methods=['POST'])
+@login_required
+@role_required('admin')
+def start_secure_round():
+    # {"participants": [user ids], "neighbours": k (optional)}; clients agree
+    # pairwise mask seeds among themselves (for the returned "pairs" when
+    # neighbours is set) and submit to /api/federated/secure/submit
+    data = request.get_json() or {}
+    try:
+        status = federated_orchestrator.start_secure_round(data.get('participants', []), data.get('round_id'),
+                                                           neighbours=data.get('neighbours'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'round': status})
+
+@app.route('/api/federated/secure/submit', methods=['POST'])
+@login_required
+def submit_masked_update():
+    # Masked uint64 vector (ml_models/secure_aggregation.py mask_update):
+    # raw little-endian bytes as application/octet-stream, or
+    # {"masked": [...]} (integers above 2^53 need a 64-bit-exact JSON encoder)
+    if request.mimetype == 'application/octet-stream':
+        body = request.get_data(cache=False)
+        if len(body) % 8:
+            return jsonify({'success': False, 'message': 'Invalid masked update: length is not a multiple of 8'}), 400
+        masked = np.frombuffer(body, dtype='<u8')
+    else:
+        masked = (request.get_json() or {}).get('masked', [])
+    
+    result = federated_orchestrator.receive_masked_update(current_user.id, masked)
+    return jsonify(result), 200 if result['success'] else 400
+
+@app.route('/api/federated/secure/recover', methods=['POST'])
+@login_required
+@role_required('admin')
+def recover_secure_dropouts():
+    # {"revealed": [{"survivor": id, "dropped": id, "seed": int or hex string}]}
+    try:
+        revealed = {(item['survivor'], item['dropped']): int(item['seed'], 0) if isinstance(item['seed'], str)
+                    else int(item['seed'])
+                    for item in (request.get_json() or {}).get('revealed', [])}
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Invalid revealed seeds: {e}'}), 400
+    
+    result = federated_orchestrator.recover_secure_dropouts(revealed)
+    return jsonify(result), 200 if result['success'] else 400
+
+@app.route('/api/federated/scheduler')
+@login_required
+@role_required('admin')
+def federated_scheduler_stats():
+    return jsonify(federated_scheduler.get_stats())
+
 @app.route('/api/fraud/detect', methods=['POST'])
 @login_required
 def detect_fraud():
@@ -414,6 +619,45 @@ def detect_fraud():
     fraud_result = fraud_detector.detect_anomaly(data)
     return jsonify(fraud_result)
 
+@app.route('/api/fraud/detect-batch', methods=['POST'])
+@login_required
+def detect_fraud_batch():
+    data = request.get_json()
+    
+    # Accept a bare list of bookings, {"bookings": [...]} or columnar {"columns": {feature: [...]}}
+    if isinstance(data, dict):
+        bookings = data.get('columns') or data.get('bookings')
+    else:
+        bookings = data
+    
+    if not bookings or not isinstance(bookings, (list, dict)):
+        return jsonify({'success': False, 'message': 'Provide a list of bookings or columnar feature arrays'}), 400
+    
+    if isinstance(bookings, dict):
+        if not all(isinstance(column, list) for column in bookings.values()):
+            return jsonify({'success': False, 'message': 'Every feature column must be a list'}), 400
+        if len({len(column) for column in bookings.values()}) != 1:
+            return jsonify({'success': False, 'message': 'All feature columns must have the same length'}), 400
+    elif not all(isinstance(booking, dict) for booking in bookings):
+        return jsonify({'success': False, 'message': 'Every booking must be an object'}), 400
+    
+    try:
+        results = fraud_detector.detect_anomalies_batch(bookings)
+    except (TypeError, ValueError) as e:
+        # Feature values that are not numbers (e.g. strings or nested objects)
+        return jsonify({'success': False, 'message': f'Invalid feature values: {e}'}), 400
+    return jsonify({
+        'success': True,
+        'count': len(results),
+        'results': results
+    })
+
+@app.route('/api/fraud/model')
+@login_required
+@role_required('admin')
+def fraud_model_status():
+    return jsonify(fraud_model_registry.get_stats())
+
 @app.route('/api/bookings/<int:booking_id>/accept', methods=['POST'])
 @login_required
 @role_required('plumber')
@@ -436,6 +680,7 @@ def accept_booking(booking_id):
         print(f"ERROR: Booking status is {booking.status}, not pending")
         return jsonify({'success': False, 'message': f'Booking is already {booking.status}'}), 400
     
+    record_status_change(booking, booking.status, 'accepted')
     booking.status = 'accepted'
     db.session.commit()
     print(f"SUCCESS: Booking {booking_id} accepted by plumber {plumber.id}")
@@ -468,10 +713,8 @@ def reject_booking(booking_id):
     fraud_detected = False
     
     # Count total rejections/cancellations by this plumber (all time)
-    total_rejections = Booking.query.filter(
-        Booking.plumber_id == plumber.id,
-        Booking.status == 'cancelled'
-    ).count()
+    _, plumber_counts = get_booking_counts(booking.customer_id, plumber.id)
+    total_rejections = plumber_counts['cancelled_bookings']
     
     # This rejection will be the (total_rejections + 1)th rejection
     # Flag fraud if this will be the 2nd or more rejection
@@ -510,6 +753,7 @@ def reject_booking(booking_id):
         
         print(f"FRAUD DETECTED: Plumber {plumber.id} has rejected {total_rejections + 1} bookings")
     
+    record_status_change(booking, booking.status, 'cancelled')
     booking.status = 'cancelled'
     db.session.commit()
     print(f"SUCCESS: Booking {booking_id} rejected by plumber {plumber.id}")
@@ -547,6 +791,7 @@ def complete_booking(booking_id):
         print(f"ERROR: Booking status is {booking.status}, not accepted")
         return jsonify({'success': False, 'message': f'Booking must be accepted first (current status: {booking.status})'}), 400
     
+    record_status_change(booking, booking.status, 'completed')
     booking.status = 'completed'
     booking.completed_at = datetime.utcnow()
     db.session.commit()
@@ -683,7 +928,7 @@ def seed_database_if_empty():
             print("Creating initial global model...")
             global_model = GlobalModel(
                 version=1,
-                model_data='[0.1, -0.2, 0.3, -0.1, 0.4, -0.3, 0.2, -0.4, 0.1, 0.0]',
+                weights=[0.1, -0.2, 0.3, -0.1, 0.4, -0.3, 0.2, -0.4, 0.1, 0.0],
                 accuracy=0.0,
                 updates_aggregated=0,
                 is_active=True
@@ -691,6 +936,7 @@ def seed_database_if_empty():
             db.session.add(global_model)
             
             db.session.commit()
+            rebuild_booking_counters()
             print("\n" + "="*60)
             print("DATABASE SEEDED SUCCESSFULLY!")
             print("="*60)
@@ -702,10 +948,49 @@ def seed_database_if_empty():
         else:
             print(f"Database already contains {user_count} users. Skipping auto-seed.")
 
+def report_detached_updates(detached):
+    if detached:
+        print(f"Detached {detached} local model updates of the memory state backend from the shared round")
+
+def init_federated_state():
+    """Attach the FedAvg state backend and load the global model.
+
+    The in-memory orchestrator resumes from the newest GlobalModel row
+    rather than random weights, and its DP accounting from the
+    PrivacyLedger rows up to that version; shared backends keep their own
+    published model (the sql backend reads the same rows). Update rows the memory
+    backend left pending are detached first (detach_memory_updates), so
+    the sql backend's first round does not pick them up.
+    """
+    federated_orchestrator.configure(
+        state_backend=app.config['FEDAVG_STATE_BACKEND'],
+        state_dir=app.config['FEDAVG_STATE_DIR'],
+        state_engine=db.engine,
+        refresh_interval=app.config['FEDAVG_STATE_REFRESH_SECONDS']
+    )
+    if federated_orchestrator.state is not None:
+        federated_orchestrator.initialize_global_model()
+        report_detached_updates(detach_memory_updates(before_version=federated_orchestrator.get_snapshot().version))
+        return
+    report_detached_updates(detach_memory_updates())
+    latest = GlobalModel.query.order_by(GlobalModel.version.desc()).first()
+    if latest is None:
+        federated_orchestrator.initialize_global_model()
+    else:
+        federated_orchestrator.restore_global_model(latest.version, latest.weights)
+        ledger = PrivacyLedger.query.filter(PrivacyLedger.version <= latest.version) \
+            .order_by(PrivacyLedger.version).all()
+        if ledger:
+            federated_orchestrator.restore_privacy(ledger[-1].accountant_state,
+                                                   {entry.version: entry.epsilon for entry in ledger})
+
 with app.app_context():
     db.create_all()
-    federated_orchestrator.initialize_global_model()
+    ensure_indexes()
+    ensure_weight_blob_columns()
     seed_database_if_empty()  # Auto-seed if empty
+    backfill_booking_counters_if_empty()
+    init_federated_state()
 
 
 
@@ -729,7 +1014,8 @@ def cancel_booking(booking_id):
     credit_reduced = False
 
     # Count previous cancellations by this customer (before this one)
-    previous_cancellations = Booking.query.filter_by(customer_id=current_user.id, status='cancelled').count()
+    customer_counts, _ = get_booking_counts(current_user.id, booking.plumber_id)
+    previous_cancellations = customer_counts['cancelled_bookings']
 
     if booking.status == 'accepted':
         # Customer is cancelling after plumber accepted - reduce trust score
@@ -770,6 +1056,7 @@ def cancel_booking(booking_id):
             customer_trust.updated_at = datetime.utcnow()
             credit_reduced = True
     
+    record_status_change(booking, booking.status, 'cancelled')
     booking.status = 'cancelled'
     db.session.commit()
     
@@ -820,6 +1107,7 @@ def submit_review(booking_id):
     
     booking.rating = rating
     booking.review = review
+    record_review(booking, rating)
     
     # Update plumber's trust score based on new review
     plumber_trust = TrustScore.query.filter_by(plumber_id=booking.plumber_id).first()
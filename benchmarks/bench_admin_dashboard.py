@@ -0,0 +1,138 @@
+"""Benchmark: admin dashboard statistics, per-row loops vs grouped aggregates.
+
+Compares the original admin_dashboard query pattern (several queries per
+plumber and per customer) with models.dashboard_stats, reporting the SQL
+statement count and wall time at increasing data sizes. Both variants
+also walk the relationships the template renders so lazy loads count.
+
+Usage:
+    python -m benchmarks.bench_admin_dashboard [--sizes 100,1000,5000]
+"""
+import argparse
+
+from benchmarks.common import make_app, populate, count_queries, timed
+from models.database import db, User, Plumber, Booking, TrustScore, FraudAlert, GlobalModel
+from models.dashboard_stats import get_admin_dashboard_stats
+
+
+def legacy_dashboard_stats():
+    """The pre-aggregation admin_dashboard body, kept for comparison"""
+    stats = {
+        'total_users': User.query.count(),
+        'total_plumbers': Plumber.query.count(),
+        'total_bookings': Booking.query.count(),
+        'completed_bookings': Booking.query.filter_by(status='completed').count(),
+        'pending_bookings': Booking.query.filter_by(status='pending').count(),
+        'fraud_alerts': FraudAlert.query.filter_by(status='pending').order_by(FraudAlert.flagged_at.desc()).all(),
+        'recent_bookings': Booking.query.order_by(Booking.created_at.desc()).limit(10).all(),
+        'all_reviews': Booking.query.filter(Booking.rating.isnot(None)).order_by(Booking.created_at.desc()).all(),
+    }
+
+    plumber_stats = []
+    for plumber in Plumber.query.all():
+        plumber_bookings = Booking.query.filter_by(plumber_id=plumber.id).count()
+        plumber_completed = Booking.query.filter_by(plumber_id=plumber.id, status='completed').count()
+        plumber_reviews = Booking.query.filter_by(plumber_id=plumber.id).filter(Booking.rating.isnot(None)).all()
+        avg_rating = sum([r.rating for r in plumber_reviews]) / len(plumber_reviews) if plumber_reviews else 0
+        trust = TrustScore.query.filter_by(plumber_id=plumber.id).first()
+        plumber_stats.append({
+            'plumber': plumber,
+            'total_bookings': plumber_bookings,
+            'completed_bookings': plumber_completed,
+            'avg_rating': round(avg_rating, 2),
+            'review_count': len(plumber_reviews),
+            'trust_score': trust.overall_score if trust else 50
+        })
+    stats['plumber_stats'] = plumber_stats
+
+    customer_stats = []
+    for customer in User.query.filter_by(role='customer').all():
+        customer_bookings = Booking.query.filter_by(customer_id=customer.id).count()
+        customer_completed = Booking.query.filter_by(customer_id=customer.id, status='completed').count()
+        trust = TrustScore.query.filter_by(user_id=customer.id).first()
+        customer_stats.append({
+            'customer': customer,
+            'total_bookings': customer_bookings,
+            'completed_bookings': customer_completed,
+            'trust_score': trust.overall_score if trust else 50
+        })
+    stats['customer_stats'] = customer_stats
+
+    stats['status_counts'] = {
+        'pending': stats['pending_bookings'],
+        'accepted': Booking.query.filter_by(status='accepted').count(),
+        'completed': stats['completed_bookings'],
+        'cancelled': Booking.query.filter_by(status='cancelled').count()
+    }
+    stats['fraud_risk_counts'] = {
+        'no_risk': FraudAlert.query.filter(FraudAlert.risk_score < 30).count(),
+        'low': FraudAlert.query.filter(FraudAlert.risk_score.between(30, 50)).count(),
+        'medium': FraudAlert.query.filter(FraudAlert.risk_score.between(50, 70)).count(),
+        'high': FraudAlert.query.filter(FraudAlert.risk_score >= 70).count()
+    }
+    stats['rating_counts'] = {str(r): Booking.query.filter_by(rating=r).count() for r in (5, 4, 3, 2, 1)}
+    stats['global_model'] = GlobalModel.query.filter_by(is_active=True).first()
+    return stats
+
+
+def render_walk(stats):
+    """Touch every relationship admin_dashboard.html dereferences"""
+    for stat in stats['plumber_stats']:
+        stat['plumber'].user.name
+    for alert in stats['fraud_alerts']:
+        alert.user and alert.user.name
+        alert.plumber and alert.plumber.user.name
+    for booking in stats['recent_bookings'] + stats['all_reviews']:
+        booking.customer.name
+        booking.plumber.user.name
+
+
+def comparable(stats):
+    """Strip ORM objects so the two implementations can be compared"""
+    return {
+        'totals': (stats['total_users'], stats['total_plumbers'], stats['total_bookings'],
+                   stats['completed_bookings'], stats['pending_bookings']),
+        'status_counts': stats['status_counts'],
+        'fraud_risk_counts': stats['fraud_risk_counts'],
+        'rating_counts': stats['rating_counts'],
+        'plumber_stats': sorted((s['plumber'].id, s['total_bookings'], s['completed_bookings'], s['avg_rating'],
+                                 s['review_count'], s['trust_score']) for s in stats['plumber_stats']),
+        'customer_stats': sorted((s['customer'].id, s['total_bookings'], s['completed_bookings'], s['trust_score'])
+                                 for s in stats['customer_stats']),
+        'alerts': [a.id for a in stats['fraud_alerts']],
+        'reviews': len(stats['all_reviews']),
+    }
+
+
+def run_variant(fn):
+    def _run():
+        db.session.expunge_all()
+        with count_queries() as counter:
+            stats = fn()
+            render_walk(stats)
+        return stats, counter['queries']
+    seconds, (stats, queries) = timed(_run)
+    return seconds, queries, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,5000',
+                        help='comma separated plumber counts; customers = 2x, bookings = 10x')
+    args = parser.parse_args()
+
+    print(f"{'plumbers':>9} {'customers':>10} {'bookings':>9} | {'legacy q':>9} {'legacy ms':>10} | "
+          f"{'agg q':>6} {'agg ms':>8} | {'speedup':>7}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        app = make_app()
+        with app.app_context():
+            populate(num_plumbers=size, num_customers=size * 2, num_bookings=size * 10, num_alerts=size)
+            legacy_s, legacy_q, legacy_stats = run_variant(legacy_dashboard_stats)
+            agg_s, agg_q, agg_stats = run_variant(get_admin_dashboard_stats)
+            assert comparable(legacy_stats) == comparable(agg_stats), 'aggregate stats diverge from legacy loops'
+            print(f"{size:>9} {size * 2:>10} {size * 10:>9} | {legacy_q:>9} {legacy_s * 1000:>10.1f} | "
+                  f"{agg_q:>6} {agg_s * 1000:>8.1f} | {legacy_s / agg_s:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
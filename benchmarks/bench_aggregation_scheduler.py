@@ -0,0 +1,111 @@
+"""Benchmark: FedAvg in the request thread vs the background scheduler.
+
+Client threads submit updates to a FederatedOrchestrator for a fixed
+time. In 'inline' mode, the submission that completes a round also runs
+aggregate_updates (and the GlobalModel write) before returning, like the
+admin endpoint did in a request thread. In 'scheduler' mode, an
+AggregationScheduler does it in the background while submissions go to
+the next round. Reports rounds, submit latency and round time, and
+checks that no update was lost or counted twice, that GlobalModel
+versions are contiguous and that the last row matches the published
+in-memory weights.
+
+Usage:
+    python -m benchmarks.bench_aggregation_scheduler [--params 1000000] [--threads 4] [--seconds 5]
+"""
+import argparse
+import os
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.common import make_app, percentile
+from models.database import db, GlobalModel
+from ml_models.aggregation_scheduler import AggregationScheduler
+from ml_models.federated_orchestrator import FederatedOrchestrator
+
+
+def run(mode, args):
+    app = make_app()
+    db_path = app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):]
+    orchestrator = FederatedOrchestrator()
+    orchestrator.configure(min_updates=args.min_updates)
+    orchestrator.initialize_global_model((args.params,))
+
+    def persist(version, weights, updates_aggregated):
+        with app.app_context():
+            db.session.add(GlobalModel(version=version, weights=weights, updates_aggregated=updates_aggregated))
+            db.session.commit()
+
+    scheduler = AggregationScheduler(orchestrator, enabled=mode == 'scheduler', max_wait_seconds=1.0,
+                                     poll_interval=0.05, persist=persist)
+    pool = np.random.default_rng(0).standard_normal((8, args.params)) * 0.01
+    stop = threading.Event()
+    latencies = [[] for _ in range(args.threads)]
+    submitted = [0] * args.threads
+    round_ms = []
+
+    def client(index):
+        i = index
+        while not stop.is_set():
+            started = time.perf_counter()
+            assert orchestrator.receive_local_update(index, pool[i % len(pool)], 10 + i % 50)
+            if mode == 'scheduler':
+                scheduler.notify()
+            elif orchestrator.round_status()['pending_updates'] >= args.min_updates:
+                round_started = time.perf_counter()
+                if orchestrator.aggregate_updates(persist=persist)['success']:
+                    round_ms.append((time.perf_counter() - round_started) * 1000)
+            latencies[index].append(time.perf_counter() - started)
+            submitted[index] += 1
+            i += args.threads
+
+    try:
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        scheduler.enabled = False
+        # Flush the last partial round so every update is accounted for
+        orchestrator.aggregate_updates(min_updates=1, persist=persist)
+
+        with app.app_context():
+            rows = GlobalModel.query.order_by(GlobalModel.version).all()
+            versions = [row.version for row in rows]
+            aggregated = sum(row.updates_aggregated for row in rows)
+            last_weights = rows[-1].weights
+        if mode == 'scheduler':
+            round_ms = list(scheduler.round_latencies_ms)
+    finally:
+        os.remove(db_path)
+
+    flat = [value for per_thread in latencies for value in per_thread]
+    print(f"{mode:>9} | {len(rows):>6} {sum(submitted):>8,} | {percentile(flat, 50) * 1000:>8.2f} "
+          f"{percentile(flat, 99) * 1000:>8.2f} {max(flat) * 1000:>8.1f} | {np.mean(round_ms):>8.1f}")
+    assert aggregated == sum(submitted), f'{sum(submitted)} updates submitted, {aggregated} aggregated'
+    assert versions == list(range(2, 2 + len(rows))), 'GlobalModel versions are not contiguous'
+    assert np.array_equal(last_weights, orchestrator.global_weights), 'last GlobalModel row != published weights'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--params', type=int, default=1000000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--min-updates', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.threads} client threads, {args.params:,} params, round every {args.min_updates} updates")
+    print(f"{'mode':>9} | {'rounds':>6} {'updates':>8} | {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} | "
+          f"{'round ms':>8}")
+    for mode in ('inline', 'scheduler'):
+        run(mode, args)
+    print("no lost or double-counted updates; GlobalModel rows match the published weights")
+
+
+if __name__ == '__main__':
+    main()
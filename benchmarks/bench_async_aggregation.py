@@ -0,0 +1,159 @@
+"""Benchmark: convergence per wall-clock second, asynchronous (FedBuff) vs synchronous FedAvg.
+
+Discrete-event simulation on a simulated clock. Each client has its own
+speed: its local training takes a heavy-tailed time drawn around a
+per-client mean, so a few stragglers are much slower than the rest.
+Training itself is real (simulate_local_training on synthetic bookings) and so
+is the server path (FederatedOrchestrator).
+
+- sync: every round picks --concurrency clients, trains them all from
+  the current model and aggregates when the slowest one finishes (the
+  global barrier).
+- async: --concurrency clients are always training. Each submits with
+  the version it started from, the model advances every --buffer
+  updates, and the client restarts at once from the newest model. Runs
+  with the staleness discount and without it (exponent 0).
+
+Reports the global log loss on all clients' data at a few points in
+simulated time, the simulated time to reach the target loss, the model
+versions published and the stale updates rejected. Also reports the
+real server cost per update of each path.
+
+Usage:
+    python -m benchmarks.bench_async_aggregation [--clients 100] [--concurrency 20] [--buffer 10] [--seconds 600]
+"""
+import argparse
+import heapq
+import time
+
+import numpy as np
+
+from benchmarks.bench_local_training import log_loss
+from ml_models.federated_orchestrator import FederatedOrchestrator
+from ml_models.federated_simulator import synthetic_bookings
+
+
+class Population:
+    """Client datasets, per-client mean training times and the pooled evaluation set"""
+
+    def __init__(self, num_clients, mean_seconds, rng):
+        self.data = [synthetic_bookings(int(rng.integers(50, 500)), rng) for _ in range(num_clients)]
+        self.mean_seconds = mean_seconds * rng.lognormal(0.0, 0.8, num_clients)
+        self.pooled = ({name: np.concatenate([c[0][name] for c in self.data]) for name in self.data[0][0]},
+                       np.concatenate([c[1] for c in self.data]))
+        self.rng = rng
+
+    def duration(self, client):
+        return self.mean_seconds[client] * self.rng.lognormal(0.0, 0.3)
+
+
+def train(orchestrator, population, client, epochs, seed):
+    result = orchestrator.simulate_local_training(population.data[client], epochs=epochs, seed=seed)
+    return result['local_weights'], result['num_samples']
+
+
+def run_sync(population, args, initial):
+    """(loss curve [(simulated seconds, loss)], server seconds per update, versions, stale updates rejected)"""
+    orchestrator = FederatedOrchestrator(aggregation_mode='streaming')
+    orchestrator.configure(min_updates=args.concurrency)
+    orchestrator.restore_global_model(1, initial)
+    rng = np.random.default_rng(1)
+    clock, server_s, updates = 0.0, 0.0, 0
+    curve = [(0.0, log_loss(orchestrator.global_weights, *population.pooled))]
+    while clock < args.seconds:
+        clients = rng.choice(len(population.data), args.concurrency, replace=False)
+        round_seconds = 0.0
+        for client in clients:
+            weights, num_samples = train(orchestrator, population, client, args.epochs, seed=updates)
+            round_seconds = max(round_seconds, population.duration(client))
+            started = time.perf_counter()
+            assert orchestrator.receive_local_update(int(client), weights, num_samples)
+            server_s += time.perf_counter() - started
+            updates += 1
+        clock += round_seconds
+        started = time.perf_counter()
+        assert orchestrator.aggregate_updates()['success']
+        server_s += time.perf_counter() - started
+        curve.append((clock, log_loss(orchestrator.global_weights, *population.pooled)))
+    return curve, server_s / updates, orchestrator.global_model_version, 0
+
+
+def run_async(population, args, initial, staleness_exponent):
+    """Same result as run_sync, for the asynchronous mode"""
+    orchestrator = FederatedOrchestrator()
+    orchestrator.configure(async_buffer_size=args.buffer, max_staleness=args.max_staleness,
+                           staleness_exponent=staleness_exponent)
+    orchestrator.restore_global_model(1, initial)
+    rng = np.random.default_rng(1)
+    clock, server_s, updates = 0.0, 0.0, 0
+    curve = [(0.0, log_loss(orchestrator.global_weights, *population.pooled))]
+    # (finish time, client, base version, weights, samples); training uses the model at start time
+    running = []
+    idle = set(range(len(population.data)))
+
+    def start(now):
+        client = int(rng.choice(sorted(idle)))
+        idle.discard(client)
+        weights, num_samples = train(orchestrator, population, client, args.epochs, seed=len(running) + updates)
+        heapq.heappush(running, (now + population.duration(client), client, orchestrator.global_model_version,
+                                 weights, num_samples))
+
+    for _ in range(args.concurrency):
+        start(0.0)
+    while running:
+        clock, client, base_version, weights, num_samples = heapq.heappop(running)
+        if clock >= args.seconds:
+            break
+        started = time.perf_counter()
+        result = orchestrator.receive_async_update(client, num_samples, base_version, local_weights=weights)
+        published = result['success'] and result['ready'] and orchestrator.aggregate_updates()['success']
+        server_s += time.perf_counter() - started
+        if published:
+            curve.append((clock, log_loss(orchestrator.global_weights, *population.pooled)))
+        updates += 1
+        idle.add(client)
+        start(clock)
+    return curve, server_s / updates, orchestrator.global_model_version, orchestrator.stale_updates_rejected
+
+
+def loss_at(curve, seconds):
+    return [loss for clock, loss in curve if clock <= seconds][-1]
+
+
+def time_to(curve, target):
+    return next((clock for clock, loss in curve if loss <= target), None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=20, help='clients training at once (sync: per round)')
+    parser.add_argument('--buffer', type=int, default=10, help='async updates per model step (K)')
+    parser.add_argument('--max-staleness', type=int, default=10)
+    parser.add_argument('--seconds', type=float, default=600.0, help='simulated seconds to run')
+    parser.add_argument('--mean-seconds', type=float, default=5.0, help='median client training time')
+    parser.add_argument('--epochs', type=int, default=5, help='local epochs per update')
+    args = parser.parse_args()
+
+    population = Population(args.clients, args.mean_seconds, np.random.default_rng(0))
+    initial = np.full(10, 0.1)
+    runs = [('sync FedAvg', run_sync(population, args, initial)),
+            ('async s=0.5', run_async(population, args, initial, 0.5)),
+            ('async s=0', run_async(population, args, initial, 0.0))]
+
+    target = max(min(loss for _, loss in curve) for _, (curve, *_) in runs) * 1.01
+    checkpoints = [args.seconds * fraction for fraction in (0.05, 0.1, 0.25, 0.5, 1.0)]
+    print(f"{args.clients} clients, {args.concurrency} training at once, buffer {args.buffer}, "
+          f"{args.seconds:.0f} simulated s; target loss {target:.4f}")
+    print(f"{'mode':>12} | " + ' '.join(f"{f'loss@{c:.0f}s':>10}" for c in checkpoints)
+          + f" | {'to target':>9} {'versions':>8} {'rejected':>8} {'server us/update':>16}")
+    for name, (curve, server_s, versions, rejected) in runs:
+        reached = time_to(curve, target)
+        print(f"{name:>12} | " + ' '.join(f'{loss_at(curve, c):>10.4f}' for c in checkpoints)
+              + f" | {f'{reached:.0f} s' if reached is not None else '-':>9} {versions:>8} {rejected:>8} "
+              f"{server_s * 1e6:>16.1f}")
+        assert curve[-1][1] < curve[0][1], f'{name} did not reduce the global loss'
+
+
+if __name__ == '__main__':
+    main()
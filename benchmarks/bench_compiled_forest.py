@@ -0,0 +1,44 @@
+"""Benchmark: sklearn IsolationForest.score_samples vs CompiledForest.
+
+Trains the FraudDetector's IsolationForest (100 trees) on synthetic
+booking features, flattens it with FraudDetector.compile(), checks the
+scores agree to 1e-9 and times both engines at several batch sizes.
+
+Usage:
+    python -m benchmarks.bench_compiled_forest [--sizes 1,64,10000]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import timed
+from benchmarks.bench_fraud_batch import synthetic_bookings
+from ml_models.fraud_detector import FraudDetector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1,64,10000')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    detector = FraudDetector()
+    _, training = synthetic_bookings(5000, seed=1)
+    detector.train(training)
+    forest = detector.isolation_forest
+    compiled = detector.compile()
+
+    print(f"{'rows':>6} | {'sklearn ms':>10} {'compiled ms':>11} | {'speedup':>7} | {'max |diff|':>10}")
+    for n in (int(s) for s in args.sizes.split(',')):
+        _, features = synthetic_bookings(n, seed=2)
+        scaled = detector.scaler.transform(features)
+        repeat = args.repeat if n < 1000 else 3
+        sk_s, sk_scores = timed(lambda: forest.score_samples(scaled), repeat)
+        np_s, np_scores = timed(lambda: compiled.score_samples(scaled), repeat)
+        diff = float(np.abs(sk_scores - np_scores).max())
+        assert diff < 1e-9, f'compiled scores diverge by {diff}'
+        print(f"{n:>6} | {sk_s * 1000:>10.3f} {np_s * 1000:>11.3f} | {sk_s / np_s:>6.1f}x | {diff:>10.1e}")
+
+
+if __name__ == '__main__':
+    main()
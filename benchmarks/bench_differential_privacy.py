@@ -0,0 +1,112 @@
+"""Benchmark: latency of the differential-privacy stage and privacy spent.
+
+For each client count, stacks updates around the global model (10% of
+them with large norms, so clipping is exercised) and closes one round
+through FederatedOrchestrator with DP off and on: reports aggregation
+time, the DP stage's overhead and how many updates were clipped, and
+checks the clipping against a per-update loop. Then checks the RDP
+accountant's sampled Gaussian bound against numerical integration, and
+prints the cumulative epsilon after 10/100/1,000 rounds for a few noise
+multipliers and sampling rates.
+
+Usage:
+    python -m benchmarks.bench_differential_privacy [--clients 100,1000,10000] [--params 1000] [--clip 1.0]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+from scipy import integrate
+
+from ml_models.differential_privacy import RDPAccountant, clipped_delta_sum, sampled_gaussian_rdp
+from ml_models.federated_orchestrator import FederatedOrchestrator
+
+
+def close_round(updates, base, counts, repeat, **dp):
+    """(best aggregate seconds, last result, orchestrator) for one round of updates"""
+    timings = []
+    for _ in range(repeat):
+        orchestrator = FederatedOrchestrator()
+        orchestrator.configure(min_updates=1, **dp)
+        orchestrator.restore_global_model(1, base)
+        for client, (row, count) in enumerate(zip(updates, counts)):
+            assert orchestrator.receive_local_update(client, row, count)
+        started = time.perf_counter()
+        result = orchestrator.aggregate_updates()
+        timings.append(time.perf_counter() - started)
+        assert result['success'], result['message']
+    return min(timings), result, orchestrator
+
+
+def integrated_rdp(sample_rate, noise_multiplier, order):
+    """RDP of the sampled Gaussian mechanism by numerical integration of its definition"""
+    def integrand(x):
+        # density * ratio^order, in log space so large orders do not overflow
+        log_density = -x * x / (2 * noise_multiplier ** 2) - math.log(math.sqrt(2 * math.pi) * noise_multiplier)
+        log_ratio = math.log(sample_rate) + (2 * x - 1) / (2 * noise_multiplier ** 2)
+        if sample_rate < 1:
+            log_ratio = np.logaddexp(math.log1p(-sample_rate), log_ratio)
+        return math.exp(log_density + order * log_ratio)
+    value, _ = integrate.quad(integrand, -50 * noise_multiplier, 50 * noise_multiplier, limit=500)
+    return math.log(value) / (order - 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', default='100,1000,10000')
+    parser.add_argument('--params', type=int, default=1000)
+    parser.add_argument('--clip', type=float, default=1.0, help='L2 clip norm')
+    parser.add_argument('--noise', type=float, default=1.0, help='noise multiplier')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = rng.standard_normal(args.params)
+    print(f"{args.params:,} params, clip {args.clip}, noise multiplier {args.noise}")
+    print(f"{'clients':>7} | {'fedavg ms':>9} {'dp ms':>8} {'overhead':>8} | {'clipped':>7} {'noise std':>9} "
+          f"{'err vs clip mean':>16}")
+    for num_clients in (int(c) for c in args.clients.split(',')):
+        deltas = rng.standard_normal((num_clients, args.params)) * (0.5 * args.clip / math.sqrt(args.params))
+        deltas[:num_clients // 10] *= 20.0
+        updates = base + deltas
+        counts = rng.integers(10, 500, num_clients)
+
+        fedavg_s, _, _ = close_round(updates, base, counts, args.repeat)
+        dp_s, result, orchestrator = close_round(updates, base, counts, args.repeat,
+                                                 dp_clip_norm=args.clip, dp_noise_multiplier=args.noise)
+        privacy = result['privacy']
+
+        # Clipping against a per-update loop
+        expected = np.zeros(args.params)
+        for delta in deltas:
+            expected += delta * min(1.0, args.clip / np.linalg.norm(delta))
+        clipped_sum, clipped = clipped_delta_sum(updates, base, args.clip)
+        assert np.allclose(clipped_sum, expected, atol=1e-9) and clipped == privacy['updates_clipped']
+        error = np.abs(orchestrator.global_weights - (base + expected / num_clients)).max()
+        assert error < 6 * privacy['noise_std'], 'DP result is off by more than the noise'
+        print(f"{num_clients:>7,} | {fedavg_s * 1000:>9.2f} {dp_s * 1000:>8.2f} {dp_s / fedavg_s:>7.1f}x | "
+              f"{clipped:>7,} {privacy['noise_std']:>9.2e} {error:>16.2e}")
+
+    print("\nSampled Gaussian RDP, closed form vs numerical integration")
+    for sample_rate, noise_multiplier, order in ((0.01, 1.0, 8), (0.1, 2.0, 32), (0.5, 1.5, 4), (1.0, 1.0, 16)):
+        closed, numeric = sampled_gaussian_rdp(sample_rate, noise_multiplier, order), \
+            integrated_rdp(sample_rate, noise_multiplier, order)
+        print(f"  q={sample_rate:<4} z={noise_multiplier:<3} order {order:>2}: {closed:.6e} vs {numeric:.6e}")
+        assert math.isclose(closed, numeric, rel_tol=1e-6), 'RDP bound disagrees with integration'
+
+    print("\nCumulative epsilon at delta=1e-5")
+    print(f"{'noise':>5} {'q':>6} | " + ' '.join(f"{f'{rounds} rounds':>11}" for rounds in (10, 100, 1000)))
+    for noise_multiplier in (0.8, 1.0, 2.0):
+        for sample_rate in (1.0, 0.1, 0.01):
+            accountant = RDPAccountant()
+            epsilons = []
+            for rounds in (10, 100, 1000):
+                accountant.step(noise_multiplier, sample_rate, steps=rounds - accountant.steps)
+                epsilons.append(accountant.epsilon(1e-5)[0])
+            assert epsilons == sorted(epsilons), 'epsilon must grow with rounds'
+            print(f"{noise_multiplier:>5} {sample_rate:>6} | " + ' '.join(f'{epsilon:>11.3f}' for epsilon in epsilons))
+
+
+if __name__ == '__main__':
+    main()
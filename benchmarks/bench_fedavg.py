@@ -0,0 +1,109 @@
+"""Benchmark: per-client FedAvg loop vs UpdateBuffer vs StreamingAccumulator.
+
+For each clients x parameters size, feeds client updates to the original
+aggregation (a list of updates, np.array + axpy per client), to the
+buffered mode (rows written into a preallocated matrix, averaged with one
+matrix-vector product) in float64 and float32, and to the streaming mode
+(each update folded into a running weighted sum on arrival). Checks the
+averages agree and reports pending-update memory, receive time and
+aggregate time. The loop and buffered modes are skipped for sizes whose
+update matrix would exceed --max-gb; streaming needs one model's worth.
+
+Usage:
+    python -m benchmarks.bench_fedavg [--clients 1000,10000] [--params 10000,1000000] [--max-gb 2]
+"""
+import argparse
+import gc
+import time
+
+import numpy as np
+
+from ml_models.update_buffer import UpdateBuffer, StreamingAccumulator
+
+
+def legacy_aggregate(pending_updates, num_params):
+    """FederatedOrchestrator.aggregate_updates before the update buffer"""
+    total_samples = sum(update['num_samples'] for update in pending_updates)
+    new_weights = np.zeros(num_params)
+    for update in pending_updates:
+        weight = update['num_samples'] / total_samples
+        new_weights += weight * np.array(update['weights'])
+    return new_weights
+
+
+def client_updates(num_clients, num_params, seed=0):
+    """Yield (weights, num_samples) per client.
+
+    Weights cycle through a small pool of random vectors so generating
+    them does not dominate the large sizes; every client still has its
+    own sample count.
+    """
+    rng = np.random.default_rng(seed)
+    pool = rng.standard_normal((min(num_clients, 16), num_params))
+    for i in range(num_clients):
+        yield pool[i % len(pool)], int(rng.integers(10, 500))
+
+
+def run_legacy(num_clients, num_params):
+    started = time.perf_counter()
+    pending = [{'weights': weights.copy(), 'num_samples': n} for weights, n in client_updates(num_clients, num_params)]
+    receive_s = time.perf_counter() - started
+    started = time.perf_counter()
+    result = legacy_aggregate(pending, num_params)
+    return receive_s, time.perf_counter() - started, result, sum(u['weights'].nbytes for u in pending)
+
+
+def run_store(store, num_clients, num_params):
+    started = time.perf_counter()
+    for weights, n in client_updates(num_clients, num_params):
+        store.append(weights, n)
+    receive_s = time.perf_counter() - started
+    started = time.perf_counter()
+    result = store.weighted_average()
+    return receive_s, time.perf_counter() - started, result, store.nbytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', default='1000,10000')
+    parser.add_argument('--params', default='10000,1000000')
+    parser.add_argument('--max-gb', type=float, default=2.0, help='largest update matrix to attempt')
+    args = parser.parse_args()
+
+    print(f"{'clients':>7} {'params':>9} {'mode':>9} | {'pending MB':>10} | {'receive s':>9} {'aggregate ms':>12} | "
+          f"{'max rel err':>11}")
+    for num_clients in (int(c) for c in args.clients.split(',')):
+        for num_params in (int(p) for p in args.params.split(',')):
+            modes = [('loop', None)]
+            modes += [(dtype, lambda dtype=dtype: UpdateBuffer(num_params, dtype=dtype))
+                      for dtype in ('float64', 'float32')]
+            modes += [('streaming', lambda: StreamingAccumulator(num_params))]
+
+            expected = None
+            for mode, make_store in modes:
+                matrix_bytes = num_clients * num_params * (4 if mode == 'float32' else 8)
+                if mode != 'streaming' and matrix_bytes / 1e9 > args.max_gb:
+                    print(f"{num_clients:>7} {num_params:>9} {mode:>9} | {matrix_bytes / 1e6:>10,.0f} | "
+                          f"skipped (over --max-gb)")
+                    continue
+                if make_store is None:
+                    receive_s, aggregate_s, result, nbytes = run_legacy(num_clients, num_params)
+                else:
+                    receive_s, aggregate_s, result, nbytes = run_store(make_store(), num_clients, num_params)
+
+                if expected is None:
+                    # Compare against the float64 reference only (loop, else buffered float64)
+                    expected = result if mode in ('loop', 'float64') else None
+                    error_text = '-'
+                else:
+                    error = float(np.abs(result - expected).max() / np.abs(expected).max())
+                    assert error < (1e-3 if mode == 'float32' else 1e-9), f'{mode} average diverges by {error}'
+                    error_text = f'{error:.1e}'
+                print(f"{num_clients:>7} {num_params:>9} {mode:>9} | {nbytes / 1e6:>10,.1f} | {receive_s:>9.2f} "
+                      f"{aggregate_s * 1000:>12.1f} | {error_text:>11}")
+                del result
+                gc.collect()
+
+
+if __name__ == '__main__':
+    main()
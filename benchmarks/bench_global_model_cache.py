@@ -0,0 +1,121 @@
+"""Benchmark: server cost of polling the global model, per-request serialization vs cached payloads.
+
+For each model size, times --polls reads of the global model the way
+/api/federated/global-model answers them:
+
+- json: jsonify(get_global_model()), i.e. weights.tolist() and a full
+  JSON dump per poll (before the cache), vs get_global_model_json()
+  (weights serialized once per version, a few small fields per poll)
+- binary float32 / int8: encode_weights per poll vs get_global_model_binary()
+- 304: what a client sending If-None-Match with the current version costs
+
+The first poll after a publish misses the cache and pays the
+serialization once (reported as 'first'); 'cached' is every poll after
+that. Also measures long-poll wake-up: W threads wait in
+wait_for_version(), the next version is published, and the delay until
+each waiter returns is reported.
+
+Usage:
+    python -m benchmarks.bench_global_model_cache [--params 10000,100000,1000000] [--polls 200] [--waiters 1,16,256]
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+
+import numpy as np
+from flask import Flask, jsonify
+
+from ml_models.federated_orchestrator import FederatedOrchestrator
+from ml_models.weight_codec import encode_weights
+
+
+def per_poll_us(polls, poll):
+    started = time.perf_counter()
+    for _ in range(polls):
+        poll()
+    return (time.perf_counter() - started) / polls * 1e6
+
+
+def wake_latencies(orchestrator, num_waiters):
+    """Seconds from publishing the next version to each waiter returning"""
+    since_version = orchestrator.global_model_version
+    woke = [None] * num_waiters
+    waiting = threading.Barrier(num_waiters + 1)
+
+    def waiter(i):
+        waiting.wait()
+        snapshot = orchestrator.wait_for_version(since_version, timeout=30.0)
+        assert snapshot.version == since_version + 1
+        woke[i] = time.perf_counter()
+
+    threads = [threading.Thread(target=waiter, args=(i,)) for i in range(num_waiters)]
+    for thread in threads:
+        thread.start()
+    waiting.wait()
+    time.sleep(0.2)
+    published = time.perf_counter()
+    orchestrator.restore_global_model(since_version + 1, orchestrator.global_weights + 1.0)
+    for thread in threads:
+        thread.join()
+    return [t - published for t in woke]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--params', default='10000,100000,1000000')
+    parser.add_argument('--polls', type=int, default=200)
+    parser.add_argument('--waiters', default='1,16,256')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    print(f"{args.polls} polls per cell, us per poll")
+    print(f"{'params':>9} | {'format':>8} {'KB':>8} | {'per poll':>10} | {'first':>10} {'cached':>8} {'304':>6} "
+          f"{'speedup':>8}")
+    with app.app_context():
+        for num_params in (int(p) for p in args.params.split(',')):
+            orchestrator = FederatedOrchestrator()
+            orchestrator.restore_global_model(1, np.random.default_rng(0).standard_normal(num_params))
+            polls = max(3, args.polls * 10000 // max(num_params, 10000))
+
+            expected = json.loads(jsonify(orchestrator.get_global_model()).get_data())
+            _, body = orchestrator.get_global_model_json()
+            body = b''.join(body)
+            served = json.loads(body)
+            assert served.pop('timestamp') and expected.pop('timestamp')
+            assert served == expected, 'cached JSON differs from jsonify(get_global_model())'
+
+            cells = [('json', lambda: jsonify(orchestrator.get_global_model()).get_data(),
+                      lambda: orchestrator.get_global_model_json())]
+            for dtype in ('float32', 'int8'):
+                def encode(version, weights, dtype=dtype):
+                    return encode_weights(weights, dtype=dtype, version=version)
+                cells.append((dtype,
+                              lambda encode=encode: encode(*orchestrator.get_global_weights()),
+                              lambda encode=encode, dtype=dtype:
+                                  orchestrator.get_global_model_binary(encode, (dtype, 'none'))[1]))
+                assert cells[-1][1]() == cells[-1][2](), f'cached {dtype} body differs'
+
+            for name, uncached, cached in cells:
+                size_kb = len(uncached()) / 1024
+                uncached_us = per_poll_us(polls, uncached)
+                # New snapshot: the first cached poll misses
+                orchestrator.restore_global_model(1, orchestrator.global_weights)
+                first_us = per_poll_us(1, cached)
+                cached_us = per_poll_us(polls, cached)
+                not_modified_us = per_poll_us(polls, lambda: orchestrator.get_snapshot().version == 1)
+                print(f"{num_params:>9,} | {name:>8} {size_kb:>8.0f} | {uncached_us:>10.1f} | {first_us:>10.1f} "
+                      f"{cached_us:>8.1f} {not_modified_us:>6.2f} {uncached_us / cached_us:>7.1f}x")
+
+    print()
+    print(f"{'waiters':>7} | {'wake p50 ms':>11} {'wake max ms':>11}")
+    for num_waiters in (int(w) for w in args.waiters.split(',')):
+        orchestrator = FederatedOrchestrator()
+        orchestrator.restore_global_model(1, np.zeros(1000))
+        latencies = wake_latencies(orchestrator, num_waiters)
+        print(f"{num_waiters:>7} | {statistics.median(latencies) * 1000:>11.2f} {max(latencies) * 1000:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
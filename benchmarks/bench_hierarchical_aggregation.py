@@ -0,0 +1,109 @@
+"""Benchmark: root ingress and aggregation time, flat vs hierarchical FedAvg.
+
+Flat: every client posts its update to the root (binary float32 payload,
+decoded and passed to receive_local_update), then the root aggregates.
+Hierarchical: the clients are split over R regions. Each region runs as a
+separate process with a RegionalAggregator that folds its clients'
+updates into one partial sum and encodes it (lossless float64), and the
+root decodes R partials (receive_partial_aggregate) and aggregates.
+
+Reports the bytes and messages reaching the root, the root's receive and
+aggregate time, and the slowest region's time (the critical path when
+regions run on their own hosts), and checks that the hierarchical model
+matches the flat one.
+
+Usage:
+    python -m benchmarks.bench_hierarchical_aggregation [--clients 2000] [--params 10000] [--regions 1,4,16,64]
+"""
+import argparse
+import multiprocessing
+import time
+
+import numpy as np
+
+from ml_models.federated_orchestrator import FederatedOrchestrator
+from ml_models.regional_aggregator import RegionalAggregator, encode_partial
+from ml_models.weight_codec import encode_weights, decode_weights
+
+
+def client_update(client, num_params):
+    """(weights, samples) of one simulated client, reproducible in any process"""
+    rng = np.random.default_rng(client)
+    return rng.standard_normal(num_params), int(rng.integers(10, 500))
+
+
+def run_region(job):
+    """Worker process: pre-aggregate one region's clients; returns (encoded partial, headers, seconds)"""
+    region, clients, num_params = job
+    payloads = [(encode_weights(weights, dtype='float32'), samples)
+                for weights, samples in (client_update(client, num_params) for client in clients)]
+    started = time.perf_counter()
+    aggregator = RegionalAggregator(region, forward=encode_partial)
+    for client, (body, samples) in zip(clients, payloads):
+        weights, _ = decode_weights(body)
+        assert aggregator.receive_local_update(client, weights, samples)
+    body, headers = aggregator.flush()
+    return body, headers, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--params', type=int, default=10000)
+    parser.add_argument('--regions', default='1,4,16,64')
+    args = parser.parse_args()
+
+    payloads = [(encode_weights(weights, dtype='float32'), samples)
+                for weights, samples in (client_update(client, args.params) for client in range(args.clients))]
+    flat = FederatedOrchestrator(aggregation_mode='streaming')
+    flat.configure(min_updates=1)
+    flat.initialize_global_model((args.params,))
+    started = time.perf_counter()
+    for client, (body, samples) in enumerate(payloads):
+        weights, _ = decode_weights(body)
+        assert flat.receive_local_update(client, weights, samples)
+    receive_s = time.perf_counter() - started
+    started = time.perf_counter()
+    assert flat.aggregate_updates()['success']
+    aggregate_s = time.perf_counter() - started
+    flat_bytes = sum(len(body) for body, _ in payloads)
+    del payloads
+
+    print(f"{args.clients:,} clients x {args.params:,} params")
+    print(f"{'regions':>7} | {'root msgs':>9} {'root MB':>8} {'root recv ms':>12} {'root agg ms':>11} "
+          f"{'root x':>7} | {'slowest region ms':>17} | {'max err':>8}")
+    print(f"{'flat':>7} | {args.clients:>9,} {flat_bytes / 1e6:>8.1f} {receive_s * 1000:>12.1f} "
+          f"{aggregate_s * 1000:>11.2f} {1.0:>7.1f} | {'-':>17} | {'-':>8}")
+    flat_root_s = receive_s + aggregate_s
+
+    context = multiprocessing.get_context('spawn')
+    for num_regions in (int(r) for r in args.regions.split(',')):
+        jobs = [(f'region-{r}', list(range(r, args.clients, num_regions)), args.params) for r in range(num_regions)]
+        with context.Pool(min(num_regions, multiprocessing.cpu_count())) as pool:
+            partials = pool.map(run_region, jobs)
+
+        root = FederatedOrchestrator(aggregation_mode='streaming')
+        root.configure(min_updates=1)
+        root.initialize_global_model((args.params,))
+        started = time.perf_counter()
+        for body, headers, _ in partials:
+            weighted_sum, _ = decode_weights(body)
+            result = root.receive_partial_aggregate(headers['X-Region'], weighted_sum,
+                                                    float(headers['X-Num-Samples']), int(headers['X-Num-Updates']))
+            assert result['success'], result['message']
+        receive_s = time.perf_counter() - started
+        started = time.perf_counter()
+        result = root.aggregate_updates()
+        aggregate_s = time.perf_counter() - started
+        assert result['success'] and result['updates_aggregated'] == args.clients
+
+        error = np.abs(root.global_weights - flat.global_weights).max()
+        root_bytes = sum(len(body) for body, _, _ in partials)
+        print(f"{num_regions:>7} | {num_regions:>9,} {root_bytes / 1e6:>8.1f} {receive_s * 1000:>12.1f} "
+              f"{aggregate_s * 1000:>11.2f} {flat_root_s / (receive_s + aggregate_s):>7.1f} | "
+              f"{max(seconds for _, _, seconds in partials) * 1000:>17.1f} | {error:>8.1e}")
+        assert error < 1e-12, 'hierarchical FedAvg does not match the flat round'
+
+
+if __name__ == '__main__':
+    main()
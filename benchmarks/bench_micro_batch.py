@@ -0,0 +1,70 @@
+"""Benchmark: per-request detect_anomaly vs the MicroBatcher under concurrency.
+
+Simulates gunicorn request threads issuing booking-time fraud checks
+against a trained detector, and reports p50/p99 latency and throughput
+for the direct per-request path and the micro-batching queue.
+
+Usage:
+    python -m benchmarks.bench_micro_batch [--threads 4,16,64] [--requests 200]
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.common import percentile
+from benchmarks.bench_fraud_batch import synthetic_bookings
+from ml_models.fraud_detector import FraudDetector
+from ml_models.micro_batcher import MicroBatcher
+
+
+def run_load(check, bookings, num_threads, requests_per_thread):
+    latencies = [[] for _ in range(num_threads)]
+    barrier = threading.Barrier(num_threads + 1)
+
+    def worker(index):
+        barrier.wait()
+        offset = index * requests_per_thread
+        for i in range(requests_per_thread):
+            start = time.perf_counter()
+            check(bookings[(offset + i) % len(bookings)])
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    flat = [value for per_thread in latencies for value in per_thread]
+    return percentile(flat, 50) * 1000, percentile(flat, 99) * 1000, len(flat) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', default='4,16,64')
+    parser.add_argument('--requests', type=int, default=200, help='fraud checks per thread')
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    detector = FraudDetector()
+    _, training = synthetic_bookings(2000, seed=1)
+    detector.train(training)
+    bookings, _ = synthetic_bookings(5000)
+
+    batcher = MicroBatcher(detector, enabled=True, max_batch_size=args.max_batch_size,
+                           max_wait_ms=args.max_wait_ms, result_timeout=30.0)
+
+    print(f"{'threads':>7} {'mode':>8} | {'p50 ms':>8} {'p99 ms':>8} {'checks/s':>9}")
+    for num_threads in (int(t) for t in args.threads.split(',')):
+        for mode, check in (('direct', detector.detect_anomaly), ('batched', batcher.detect_anomaly)):
+            p50, p99, throughput = run_load(check, bookings, num_threads, args.requests)
+            print(f"{num_threads:>7} {mode:>8} | {p50:>8.2f} {p99:>8.2f} {throughput:>9,.0f}")
+    print(f"batcher stats: {batcher.get_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Benchmark: hot-swapping fraud model versions under concurrent load.
+
+Request threads call detect_anomaly continuously while new artifact
+versions (alternating between two differently trained models) are
+published to a temporary model directory. A ModelRegistry watcher picks
+each one up in the background. Checks that no check fails, that every
+result matches the model of the version it reports (no mixed
+versions), and that each thread only ever moves forward in versions.
+Reports reload latency, publish-to-serve lag and request latency.
+
+Usage:
+    python -m benchmarks.bench_model_reload [--threads 8] [--versions 10]
+"""
+import argparse
+import tempfile
+import threading
+import time
+
+from benchmarks.common import percentile
+from benchmarks.bench_fraud_batch import synthetic_bookings
+from ml_models.fraud_detector import FraudDetector
+from ml_models.model_registry import ModelRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--versions', type=int, default=10, help='versions published during the run')
+    parser.add_argument('--publish-interval', type=float, default=0.3, help='seconds between publishes')
+    parser.add_argument('--poll-interval', type=float, default=0.05)
+    args = parser.parse_args()
+
+    models = []
+    for seed in (1, 2):
+        model = FraudDetector()
+        model.isolation_forest.set_params(n_estimators=50, random_state=seed)
+        _, training = synthetic_bookings(3000, seed=seed)
+        model.train(training)
+        models.append(model)
+    bookings, _ = synthetic_bookings(200, seed=3)
+    # Expected (is_fraud, risk_score) per booking for each of the two models
+    expected = [[(r['is_fraud'], r['risk_score']) for r in (m.detect_anomaly(b) for b in bookings)] for m in models]
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        first_version = models[0].save_artifact(model_dir)
+        detector = FraudDetector()
+        registry = ModelRegistry(detector, model_dir=model_dir, poll_interval=args.poll_interval, enabled=True)
+        registry.check_for_update()
+        registry.ensure_watching()
+
+        stop = threading.Event()
+        latencies = [[] for _ in range(args.threads)]
+        errors = []
+
+        def worker(index):
+            last_version = first_version
+            i = index
+            while not stop.is_set():
+                booking = bookings[i % len(bookings)]
+                start = time.perf_counter()
+                result = detector.detect_anomaly(booking)
+                latencies[index].append(time.perf_counter() - start)
+                version = result.get('model_version')
+                model_index = (version - first_version) % 2 if version else None
+                if result['fraud_type'] == 'error' or version is None or version < last_version:
+                    errors.append((index, result))
+                elif (result['is_fraud'], result['risk_score']) != expected[model_index][i % len(bookings)]:
+                    errors.append((index, result))
+                last_version = version or last_version
+                i += 1
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for n in range(1, args.versions + 1):
+            time.sleep(args.publish_interval)
+            models[n % 2].save_artifact(model_dir)
+        time.sleep(args.publish_interval)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        registry.enabled = False
+
+    stats = registry.get_stats()
+    flat = [value for per_thread in latencies for value in per_thread]
+    print(f"{len(flat):,} checks on {args.threads} threads, {stats['reloads']} reloads "
+          f"(served version {stats['active_version']})")
+    print(f"reload ms: avg {stats['avg_reload_ms']}, max {stats['max_reload_ms']}; "
+          f"last publish-to-serve lag {stats['last_publish_lag_ms']} ms")
+    print(f"check latency ms: p50 {percentile(flat, 50) * 1000:.3f}, p99 {percentile(flat, 99) * 1000:.3f}, "
+          f"max {max(flat) * 1000:.3f}")
+    assert not errors, f'{len(errors)} inconsistent results, e.g. {errors[0]}'
+    assert stats['active_version'] == first_version + args.versions, 'watcher did not reach the last version'
+    print("no failed or mixed-version checks")
+
+
+if __name__ == '__main__':
+    main()
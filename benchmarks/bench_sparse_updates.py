@@ -0,0 +1,123 @@
+"""Benchmark: dense weight updates vs sparse top-k deltas.
+
+For each parameter count, simulates clients whose local training moved
+the global model by a heavy-tailed random delta and submits them to the
+FederatedOrchestrator as dense weights and as top-k deltas (k a fraction
+of the parameters). Reports float32 wire size, receive time and
+aggregate time per mode, and checks that sparse deltas which carry every
+changed entry aggregate to exactly the dense FedAvg.
+
+Then runs rounds in which every client takes a small step toward a
+shared target, sending top-k deltas with and without error
+feedback (DeltaCompressor), and prints the distance of the global model
+from the target after each round. Without error feedback, entries that
+never make a client's top k are dropped for good.
+
+Usage:
+    python -m benchmarks.bench_sparse_updates [--params 10000,1000000] [--clients 50] [--fractions 0.01,0.001]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ml_models.federated_orchestrator import FederatedOrchestrator
+from ml_models.sparse_updates import DeltaCompressor, top_k_delta
+from ml_models.weight_codec import encode_weights, encode_sparse_delta
+
+
+def new_orchestrator(base_weights, num_clients):
+    orchestrator = FederatedOrchestrator()
+    orchestrator.min_updates_for_aggregation = num_clients
+    orchestrator.global_weights = base_weights.copy()
+    return orchestrator
+
+
+def client_deltas(num_clients, num_params, seed=0):
+    """Yield (delta, num_samples) per client; deltas are heavy-tailed so top-k matters"""
+    rng = np.random.default_rng(seed)
+    pool = rng.standard_t(2, size=(min(num_clients, 8), num_params)) * 1e-3
+    for i in range(num_clients):
+        yield pool[i % len(pool)], int(rng.integers(10, 500))
+
+
+def run_round(base_weights, num_clients, fraction):
+    """Submit one round; fraction None sends dense weights, 1.0 exact deltas"""
+    num_params = base_weights.size
+    orchestrator = new_orchestrator(base_weights, num_clients)
+    wire_bytes = 0
+    receive_s = 0.0
+    for client_id, (delta, num_samples) in enumerate(client_deltas(num_clients, num_params)):
+        if fraction is None:
+            weights = base_weights + delta
+            wire_bytes += len(encode_weights(weights))
+            started = time.perf_counter()
+            orchestrator.receive_local_update(client_id, weights, num_samples)
+        else:
+            indices, values = top_k_delta(delta, max(1, int(num_params * fraction)))
+            wire_bytes += len(encode_sparse_delta(indices, values, orchestrator.global_model_version))
+            started = time.perf_counter()
+            orchestrator.receive_sparse_update(client_id, indices, values, num_samples,
+                                               orchestrator.global_model_version)
+        receive_s += time.perf_counter() - started
+    started = time.perf_counter()
+    orchestrator.aggregate_updates()
+    return wire_bytes, receive_s, time.perf_counter() - started, orchestrator.global_weights
+
+
+def run_convergence(num_params, num_clients, fraction, rounds, error_feedback):
+    """Distance from the shared target after each round of top-k training"""
+    rng = np.random.default_rng(1)
+    target = rng.standard_normal(num_params)
+    orchestrator = new_orchestrator(np.zeros(num_params), num_clients)
+    compressor = DeltaCompressor(k=max(1, int(num_params * fraction)), error_feedback=error_feedback)
+    distances = []
+    for _ in range(rounds):
+        base = orchestrator.global_weights.copy()
+        for client_id in range(num_clients):
+            # One small local step (learning rate 0.1) toward the target, with per-client noise
+            local = base + 0.1 * (target - base) + rng.standard_normal(num_params) * 0.01
+            indices, values = compressor.compress(client_id, local, base)
+            orchestrator.receive_sparse_update(client_id, indices, values, 100, orchestrator.global_model_version)
+        orchestrator.aggregate_updates()
+        distances.append(float(np.linalg.norm(orchestrator.global_weights - target) / np.linalg.norm(target)))
+    return distances
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--params', default='10000,1000000')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--fractions', default='0.01,0.001', help='top-k sizes as a fraction of the parameters')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+    fractions = [float(f) for f in args.fractions.split(',')]
+
+    print(f"{'params':>9} {'mode':>11} | {'wire MB':>8} {'vs dense':>8} | {'receive ms':>10} {'aggregate ms':>12}")
+    for num_params in (int(p) for p in args.params.split(',')):
+        base_weights = np.random.default_rng(2).standard_normal(num_params) * 0.05
+        dense_bytes, receive_s, aggregate_s, dense_result = run_round(base_weights, args.clients, None)
+        print(f"{num_params:>9} {'dense':>11} | {dense_bytes / 1e6:>8.2f} {1.0:>7.1f}x | {receive_s * 1000:>10.1f} "
+              f"{aggregate_s * 1000:>12.1f}")
+        for fraction in [1.0] + fractions:
+            wire_bytes, receive_s, aggregate_s, result = run_round(base_weights, args.clients, fraction)
+            label = 'exact delta' if fraction == 1.0 else f'top {fraction:.1%}'
+            print(f"{num_params:>9} {label:>11} | {wire_bytes / 1e6:>8.2f} {dense_bytes / wire_bytes:>7.1f}x | "
+                  f"{receive_s * 1000:>10.1f} {aggregate_s * 1000:>12.1f}")
+            if fraction == 1.0:
+                error = float(np.abs(result - dense_result).max())
+                assert error < 1e-12, f'exact sparse deltas diverge from dense FedAvg by {error}'
+
+    num_params = int(args.params.split(',')[0])
+    fraction = fractions[0]
+    print(f"\ndistance to target, {num_params} params, top {fraction:.1%}, {args.clients} clients:")
+    print(f"{'round':>5} {'no feedback':>12} {'error feedback':>15}")
+    plain = run_convergence(num_params, args.clients, fraction, args.rounds, error_feedback=False)
+    feedback = run_convergence(num_params, args.clients, fraction, args.rounds, error_feedback=True)
+    for round_number, (a, b) in enumerate(zip(plain, feedback), start=1):
+        print(f"{round_number:>5} {a:>12.4f} {b:>15.4f}")
+    assert feedback[-1] < plain[-1], 'error feedback did not converge faster than plain top-k'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark: JSON Text weight columns vs binary blobs.
+
+Fills local_model_updates with JSON weight rows the way the federated
+endpoints used to write them, measures database size, a listing query
+that loads every payload (the old eager column), the same listing with
+the deferred column, and loading plus decoding every update. Then runs
+the JSON-to-binary migration (models/migrations.py), checks every row
+decodes to the same weights, and measures again.
+
+Usage:
+    python -m benchmarks.bench_weight_storage [--updates 100] [--params 100000]
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import undefer
+
+from benchmarks.common import make_app, timed
+from models.database import db, LocalModelUpdate
+from models.migrations import convert_json_weights
+
+
+def database_mb(db_path):
+    db.session.execute(text('VACUUM'))
+    return os.path.getsize(db_path) / 1e6
+
+
+def measure(label, db_path):
+    db.session.expire_all()
+    size_mb = database_mb(db_path)
+
+    def list_eager():
+        db.session.expunge_all()
+        return LocalModelUpdate.query.options(undefer(LocalModelUpdate.update_data)).all()
+
+    def list_deferred():
+        db.session.expunge_all()
+        return [(u.id, u.model_version, u.data_samples_count) for u in LocalModelUpdate.query.all()]
+
+    def load_all():
+        db.session.expunge_all()
+        return [u.weights for u in LocalModelUpdate.query.options(undefer(LocalModelUpdate.update_data))]
+
+    eager_s, _ = timed(list_eager)
+    deferred_s, _ = timed(list_deferred)
+    load_s, weights = timed(load_all)
+    print(f"{label:>7} | {size_mb:>8.1f} | {eager_s * 1000:>11.1f} {deferred_s * 1000:>13.2f} | "
+          f"{load_s * 1000:>14.1f}")
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=100)
+    parser.add_argument('--params', type=int, default=100000)
+    args = parser.parse_args()
+
+    app = make_app()
+    db_path = app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):]
+    rng = np.random.default_rng(0)
+    expected = rng.standard_normal((min(args.updates, 8), args.params)) * 0.05
+
+    try:
+        with app.app_context():
+            insert = text('INSERT INTO local_model_updates (model_version, update_data, data_samples_count, aggregated) '
+                          'VALUES (1, :data, :samples, 0)')
+            for i in range(args.updates):
+                db.session.execute(insert, {'data': json.dumps(expected[i % len(expected)].tolist()),
+                                            'samples': int(rng.integers(10, 500))})
+            db.session.commit()
+
+            print(f"{args.updates} updates x {args.params:,} params")
+            print(f"{'storage':>7} | {'db MB':>8} | {'list+data ms':>11} {'list meta ms':>13} | "
+                  f"{'load+decode ms':>14}")
+            measure('json', db_path)
+            started = time.perf_counter()
+            converted = convert_json_weights()
+            migrate_s = time.perf_counter() - started
+            weights = measure('binary', db_path)
+            print(f"migration: {converted} rows in {migrate_s:.2f} s")
+
+            assert converted == args.updates
+            for i, row in enumerate(weights):
+                assert np.array_equal(row, expected[i % len(expected)]), f'update {i} changed in migration'
+            print("all rows decode to the original weights")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Benchmark: JSON float lists vs the binary weight format.
+
+Encodes a random weight vector the way the federated endpoints do (JSON
+list, or ml_models/weight_codec.py in each dtype and compression) and
+reports payload size, encode and decode time, and the largest absolute
+error introduced by the wire dtype.
+
+Usage:
+    python -m benchmarks.bench_weight_transport [--params 10000,1000000]
+"""
+import argparse
+import json
+
+import numpy as np
+
+from benchmarks.common import timed
+from ml_models.weight_codec import WIRE_DTYPES, available_compressions, encode_weights, decode_weights
+
+
+def json_roundtrip(weights):
+    encode_s, body = timed(lambda: json.dumps({'weights': weights.tolist(), 'num_samples': 50}).encode())
+    decode_s, decoded = timed(lambda: np.array(json.loads(body)['weights']))
+    return len(body), encode_s, decode_s, decoded
+
+
+def binary_roundtrip(weights, dtype, compression):
+    encode_s, body = timed(lambda: encode_weights(weights, dtype=dtype, compression=compression))
+    decode_s, (decoded, _) = timed(lambda: decode_weights(body))
+    return len(body), encode_s, decode_s, decoded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--params', default='10000,1000000')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'params':>9} {'format':>16} | {'bytes':>11} {'vs json':>7} | {'encode ms':>9} {'decode ms':>9} | "
+          f"{'max |err|':>9}")
+    for num_params in (int(p) for p in args.params.split(',')):
+        weights = rng.standard_normal(num_params) * 0.05
+        size, encode_s, decode_s, decoded = json_roundtrip(weights)
+        json_size = size
+        print(f"{num_params:>9} {'json':>16} | {size:>11,} {1.0:>6.2f}x | {encode_s * 1000:>9.2f} "
+              f"{decode_s * 1000:>9.2f} | {float(np.abs(decoded - weights).max()):>9.1e}")
+        for dtype in WIRE_DTYPES:
+            for compression in available_compressions():
+                size, encode_s, decode_s, decoded = binary_roundtrip(weights, dtype, compression)
+                print(f"{num_params:>9} {dtype + '/' + compression:>16} | {size:>11,} {json_size / size:>6.1f}x | "
+                      f"{encode_s * 1000:>9.2f} {decode_s * 1000:>9.3f} | "
+                      f"{float(np.abs(decoded - weights).max()):>9.1e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite database so they never touch
+the application's configured DATABASE_URL or auto-seed logic in app.py.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from flask import Flask
+from sqlalchemy import event
+from models.database import db, User, Plumber, Booking, TrustScore, FraudAlert, GlobalModel
+
+STATUSES = ['pending', 'accepted', 'completed', 'cancelled']
+
+
+def make_app(db_path=None):
+    """Create a bare Flask app bound to a temporary SQLite file"""
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(suffix='.db', prefix='bench_')
+        os.close(fd)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+def populate(num_plumbers, num_customers, num_bookings, num_alerts=0, seed=42, global_model=True):
+    """Bulk-insert a synthetic marketplace; must run inside an app context"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    users = [{'email': 'admin@bench', 'password_hash': 'x', 'name': 'Admin', 'role': 'admin'}]
+    users += [{'email': f'customer{i}@bench', 'password_hash': 'x', 'name': f'Customer {i}', 'role': 'customer'}
+              for i in range(num_customers)]
+    users += [{'email': f'plumber{i}@bench', 'password_hash': 'x', 'name': f'Plumber {i}', 'role': 'plumber'}
+              for i in range(num_plumbers)]
+    db.session.bulk_insert_mappings(User, users)
+    db.session.flush()
+
+    bench_users = User.query.filter(User.email.like('%@bench')).order_by(User.id)
+    customer_ids = [u.id for u in bench_users if u.role == 'customer']
+    plumber_user_ids = [u.id for u in bench_users if u.role == 'plumber']
+
+    db.session.bulk_insert_mappings(Plumber, [{
+        'user_id': uid,
+        'specialty': 'General Plumbing',
+        'location': rng.choice(['Bengaluru North', 'Bengaluru South', 'Bengaluru East', 'Bengaluru West']),
+        'hourly_rate': rng.uniform(30, 90),
+        'experience_years': rng.randint(1, 20),
+        'available': True
+    } for uid in plumber_user_ids])
+    db.session.flush()
+    plumber_ids = [p.id for p in Plumber.query.filter(Plumber.user_id.in_(plumber_user_ids)).order_by(Plumber.id)]
+
+    trust_rows = [{'user_id': cid, 'overall_score': rng.uniform(40, 95)} for cid in customer_ids]
+    trust_rows += [{'plumber_id': pid, 'overall_score': rng.uniform(40, 95)} for pid in plumber_ids]
+    db.session.bulk_insert_mappings(TrustScore, trust_rows)
+
+    bookings = []
+    for i in range(num_bookings):
+        status = rng.choice(STATUSES)
+        bookings.append({
+            'customer_id': rng.choice(customer_ids),
+            'plumber_id': rng.choice(plumber_ids),
+            'service_description': f'Benchmark booking #{i}',
+            'scheduled_date': now + timedelta(hours=rng.uniform(-240, 720)),
+            'status': status,
+            'price': rng.uniform(50, 300),
+            'rating': rng.randint(1, 5) if status == 'completed' and rng.random() > 0.3 else None,
+            'created_at': now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+        })
+    db.session.bulk_insert_mappings(Booking, bookings)
+
+    db.session.bulk_insert_mappings(FraudAlert, [{
+        'user_id': rng.choice(customer_ids),
+        'plumber_id': rng.choice(plumber_ids),
+        'alert_type': 'suspicious_pattern',
+        'risk_score': rng.uniform(0, 100),
+        'status': rng.choice(['pending', 'resolved']),
+        'flagged_at': now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+    } for _ in range(num_alerts)])
+
+    if global_model:
+        db.session.add(GlobalModel(version=1, weights=[], is_active=True))
+    db.session.commit()
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed on the current engine"""
+    counter = {'queries': 0}
+
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['queries'] += 1
+
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _before_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before_execute)
+
+
+def timed(fn, repeat=3):
+    """Return (best wall time in seconds, last result) over repeat runs"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
@@ -0,0 +1,150 @@
+"""Check that every route's SQL is served by an index, not a table scan.
+
+Drives each route through the Flask test client against a populated
+temporary SQLite database, captures the statements it executes and runs
+EXPLAIN QUERY PLAN on each. Any "SCAN <table>" step that is not backed
+by an index fails the check, unless the statement is a deliberate
+whole-table read listed in ALLOWED_FULL_SCANS.
+
+SQLite only; MySQL and PostgreSQL receive the same index definitions
+through models/migrations.py and serve_at_ease_mysql.sql.
+
+Usage:
+    python -m benchmarks.explain_routes
+"""
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+_fd, _db_path = tempfile.mkstemp(suffix='.db', prefix='explain_')
+os.close(_fd)
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_path}'
+
+from benchmarks.common import populate
+from sqlalchemy import event
+
+from app import app
+from models.database import db, Plumber
+from models.booking_counters import rebuild_booking_counters
+
+# (table, statement pattern, reason) for scans that read the whole table on purpose
+ALLOWED_FULL_SCANS = [
+    ('users', r'^SELECT count\(users\.id\)', 'dashboard total, counts every user'),
+    ('plumbers', r'^SELECT count\(plumbers\.id\)', 'dashboard total, counts every plumber'),
+    ('plumbers', r'FROM plumbers LEFT OUTER JOIN \(SELECT bookings\.plumber_id', 'dashboard lists every plumber'),
+    ('plumbers', r'WHERE plumbers\.available = ', 'customer dashboard lists available plumbers (low selectivity)'),
+    ('bookings', r'^SELECT count\(bookings\.id\) AS count_1, coalesce\(sum\(CASE', 'dashboard status/rating totals'),
+    ('fraud_alerts', r'^SELECT coalesce\(sum\(CASE WHEN \(fraud_alerts\.risk_score', 'dashboard risk buckets'),
+    ('trust_scores', r'LEFT OUTER JOIN trust_scores', 'dashboard joins every trust row'),
+]
+
+SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?(.*)$')
+
+
+def capture_route_statements(client_calls):
+    """Run (client, method, url, kwargs) calls, returning (route, sql, params)"""
+    captured = []
+    current = {'route': None}
+
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        if current['route'] and not executemany:
+            captured.append((current['route'], statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', _before_execute)
+    try:
+        for client, method, url, kwargs in client_calls:
+            current['route'] = f'{method.upper()} {url}'
+            response = getattr(client, method)(url, **kwargs)
+            assert response.status_code < 500, f'{current["route"]} failed with {response.status_code}'
+            current['route'] = None
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _before_execute)
+    return captured
+
+
+def scan_violations(route, statement, parameters):
+    """Return table scans in the statement's plan that no index backs"""
+    flat_sql = ' '.join(statement.split())
+    plan = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    violations = []
+    for row in plan:
+        detail = row[-1]
+        match = SCAN_RE.match(detail)
+        if not match or 'INDEX' in match.group(2):
+            continue
+        table = match.group(1)
+        if any(t == table and re.search(pattern, flat_sql) for t, pattern, _ in ALLOWED_FULL_SCANS):
+            continue
+        violations.append((route, detail, flat_sql))
+    return violations
+
+
+def login(email, password):
+    client = app.test_client()
+    client.post('/login', data={'email': email, 'password': password})
+    return client
+
+
+def main():
+    with app.app_context():
+        populate(num_plumbers=200, num_customers=400, num_bookings=4000, num_alerts=300, global_model=False)
+        rebuild_booking_counters()
+        db.session.execute(db.text('ANALYZE'))
+        plumber_id = Plumber.query.join(Plumber.user).filter_by(email='plumber1@gmail.com').first().id
+
+    admin = login('admin@gmail.com', 'admin')
+    customer = login('customer1@gmail.com', '123456')
+    plumber = login('plumber1@gmail.com', '123456')
+    scheduled = (datetime.utcnow() + timedelta(days=2)).isoformat()
+
+    def new_booking():
+        response = customer.post('/api/bookings/create', json={
+            'plumber_id': plumber_id, 'service_description': 'Leak repair',
+            'scheduled_date': scheduled, 'price': 80})
+        return response.get_json()['booking_id']
+
+    with app.app_context():
+        booking_ids = [new_booking() for _ in range(4)]
+
+    calls = [
+        (customer, 'get', '/customer/dashboard', {}),
+        (plumber, 'get', '/plumber/dashboard', {}),
+        (admin, 'get', '/admin/dashboard', {}),
+        (customer, 'post', '/api/bookings/create', {'json': {
+            'plumber_id': plumber_id, 'service_description': 'Drain cleaning',
+            'scheduled_date': scheduled, 'price': 500}}),
+        (plumber, 'post', f'/api/bookings/{booking_ids[0]}/accept', {}),
+        (plumber, 'post', f'/api/bookings/{booking_ids[0]}/complete', {}),
+        (customer, 'post', f'/api/bookings/{booking_ids[0]}/review', {'json': {'rating': 4, 'review': 'Good'}}),
+        (customer, 'post', f'/api/bookings/{booking_ids[1]}/cancel', {}),
+        (plumber, 'post', f'/api/bookings/{booking_ids[2]}/reject', {}),
+        (plumber, 'post', f'/api/bookings/{booking_ids[3]}/reject', {}),
+        (customer, 'get', '/api/trust-score/2', {}),
+        (customer, 'post', '/api/fraud/detect', {'json': {'price': 500, 'price_deviation_from_avg': 3}}),
+        (customer, 'post', '/api/federated/submit-update', {'json': {'weights': [0.1] * 10, 'num_samples': 5}}),
+        (customer, 'get', '/api/federated/global-model', {}),
+        (admin, 'post', '/api/federated/aggregate', {}),
+    ]
+
+    with app.app_context():
+        statements = capture_route_statements(calls)
+        violations = []
+        for route, statement, parameters in statements:
+            violations.extend(scan_violations(route, statement, parameters))
+
+    print(f'Checked {len(statements)} statements across {len(calls)} routes.')
+    for route, detail, sql in violations:
+        print(f'\n[{route}] {detail}\n    {sql[:300]}')
+    if violations:
+        print(f'\n{len(violations)} unindexed table scan(s) found.')
+        return 1
+    print('All queries are served by indexes.')
+    return 0
+
+
+if __name__ == '__main__':
+    status = main()
+    os.remove(_db_path)
+    sys.exit(status)
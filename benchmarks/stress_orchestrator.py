@@ -0,0 +1,142 @@
+"""Stress check: concurrent submissions, aggregations and reads on FederatedOrchestrator.
+
+Client threads submit thousands of dense updates (JSON-style lists and
+arrays) and sparse deltas while an aggregator thread closes rounds as
+fast as it can and reader threads poll the published model. With a tiny
+thread switch interval to force interleavings, checks that:
+
+- every accepted update is aggregated exactly once (update count, sample
+  total and the FedAvg numerator all add up across rounds);
+- readers only ever see a version together with the weights published
+  for it, read-only, and versions never go backwards.
+
+Runs once per aggregation mode.
+
+Usage:
+    python -m benchmarks.stress_orchestrator [--threads 16] [--updates 500] [--readers 4]
+"""
+import argparse
+import sys
+import threading
+import time
+
+import numpy as np
+
+from ml_models.federated_orchestrator import FederatedOrchestrator
+from ml_models.update_buffer import AGGREGATION_MODES
+
+
+def run(mode, args):
+    orchestrator = FederatedOrchestrator(aggregation_mode=mode)
+    orchestrator.configure(min_updates=args.min_updates)
+    orchestrator.initialize_global_model((args.params,))
+    # version -> first weight, recorded before each version is published
+    published = {1: float(orchestrator.global_weights[0])}
+    results = []
+    errors = []
+    clients_done = threading.Event()
+    stop_readers = threading.Event()
+
+    def persist(version, weights, updates_aggregated):
+        published[version] = float(weights[0])
+
+    def client(index, totals):
+        rng = np.random.default_rng(index)
+        for i in range(args.updates):
+            num_samples = int(rng.integers(1, 100))
+            value = float(rng.uniform(-1, 1))
+            if i % 4 == 3:
+                # Sparse delta on index 0; retried against the new version on 409
+                while True:
+                    version, weights = orchestrator.get_global_weights()
+                    result = orchestrator.receive_sparse_update(index, [0], [value], num_samples, version)
+                    if result['success']:
+                        totals['numerator'] += num_samples * (weights[0] + value)
+                        break
+                    if not result['stale']:
+                        errors.append(result['message'])
+                        return
+            else:
+                weights = np.full(args.params, value)
+                if not orchestrator.receive_local_update(index, weights if i % 2 else weights.tolist(), num_samples):
+                    errors.append(f'client {index} update {i} rejected')
+                    return
+                totals['numerator'] += num_samples * value
+            totals['updates'] += 1
+            totals['samples'] += num_samples
+
+    def aggregator():
+        while not clients_done.is_set():
+            result = orchestrator.aggregate_updates(persist=persist)
+            if result['success']:
+                results.append((result, float(orchestrator.global_weights[0])))
+        result = orchestrator.aggregate_updates(min_updates=1, persist=persist)
+        if result['success']:
+            results.append((result, float(orchestrator.global_weights[0])))
+
+    def reader(reads):
+        last_version = 0
+        while not stop_readers.is_set():
+            version, weights = orchestrator.get_global_weights()
+            model = orchestrator.get_global_model()
+            reads[0] += 2
+            if version < last_version or model['version'] < version:
+                errors.append(f'version went backwards: {last_version} -> {version} -> {model["version"]}')
+            if weights.flags.writeable:
+                errors.append(f'version {version} weights are writeable')
+            if float(weights[0]) != published.get(version) or model['weights'][0] != published.get(model['version']):
+                errors.append(f'version {version} served weights that were not published for it')
+            last_version = version
+
+    totals = [{'updates': 0, 'samples': 0, 'numerator': 0.0} for _ in range(args.threads)]
+    reads = [[0] for _ in range(args.readers)]
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client, args=(i, totals[i])) for i in range(args.threads)]
+    readers = [threading.Thread(target=reader, args=(reads[i],)) for i in range(args.readers)]
+    aggregator_thread = threading.Thread(target=aggregator)
+    for thread in clients + readers + [aggregator_thread]:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    clients_done.set()
+    aggregator_thread.join()
+    stop_readers.set()
+    for thread in readers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    submitted = sum(t['updates'] for t in totals)
+    samples = sum(t['samples'] for t in totals)
+    numerator = sum(t['numerator'] for t in totals)
+    aggregated = sum(result['updates_aggregated'] for result, _ in results)
+    aggregated_samples = sum(result['total_samples'] for result, _ in results)
+    aggregated_numerator = sum(first_weight * result['total_samples'] for result, first_weight in results)
+    print(f"{mode:>9} | {submitted:>7,} {len(results):>6} {sum(r[0] for r in reads):>8,} | {elapsed:>6.2f}")
+
+    assert not errors, f'{len(errors)} errors, e.g. {errors[0]}'
+    assert aggregated == submitted, f'{submitted} updates accepted, {aggregated} aggregated'
+    assert aggregated_samples == samples, f'{samples} samples accepted, {aggregated_samples} aggregated'
+    assert abs(aggregated_numerator - numerator) <= 1e-9 * max(1.0, abs(numerator)), 'FedAvg numerator differs'
+    assert orchestrator.get_stats()['pending_updates'] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16, help='client threads')
+    parser.add_argument('--updates', type=int, default=500, help='updates per client thread')
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--params', type=int, default=1000)
+    parser.add_argument('--min-updates', type=int, default=3)
+    args = parser.parse_args()
+
+    # Switch threads far more often than the 5 ms default to shake out races
+    sys.setswitchinterval(1e-5)
+    print(f"{args.threads} client threads x {args.updates} updates, {args.readers} readers")
+    print(f"{'mode':>9} | {'updates':>7} {'rounds':>6} {'reads':>8} | {'secs':>6}")
+    for mode in AGGREGATION_MODES:
+        run(mode, args)
+    print("no lost, double-counted or torn updates; readers saw only published snapshots")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Stress check: several processes sharing one federated round.
+
+Spawns worker processes that each run their own FederatedOrchestrator on
+the same shared state (a state directory, or one SQLite database), the
+way gunicorn workers or separate nodes would. Every worker submits dense
+updates and sparse deltas and tries to close rounds while the others
+keep submitting; then one final flush aggregates what is left. Checks
+that:
+
+- every accepted update is aggregated exactly once (update count, sample
+  total and the FedAvg numerator add up across all published versions);
+- published versions are contiguous, with no version produced twice.
+
+Runs once per shared backend.
+
+Usage:
+    python -m benchmarks.stress_shared_state [--workers 4] [--updates 300] [--backend file|sql]
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+
+from benchmarks.common import make_app
+from ml_models.federated_orchestrator import FederatedOrchestrator
+
+SHARED_BACKENDS = ('file', 'sql')
+
+
+def make_orchestrator(backend, location, min_updates):
+    orchestrator = FederatedOrchestrator()
+    if backend == 'sql':
+        # Writers queue on SQLite's database lock instead of failing
+        engine = create_engine(f'sqlite:///{location}', connect_args={'timeout': 60})
+        orchestrator.configure(state_backend='sql', state_engine=engine, min_updates=min_updates)
+    else:
+        orchestrator.configure(state_backend='file', state_dir=location, min_updates=min_updates)
+        # Keep every version so the check can read back each round's weights
+        orchestrator.state.keep_versions = 1000000
+    return orchestrator
+
+
+def worker(index, backend, location, args, queue):
+    orchestrator = make_orchestrator(backend, location, args.min_updates)
+    rng = np.random.default_rng(index)
+    totals = {'updates': 0, 'samples': 0, 'numerator': 0.0, 'stale': 0, 'rounds': [], 'conflicts': 0}
+    for i in range(args.updates):
+        num_samples = int(rng.integers(1, 100))
+        value = float(rng.uniform(-1, 1))
+        if i % 4 == 3:
+            # Sparse delta on index 0 against the latest version; retried when stale
+            while True:
+                version, weights = orchestrator.get_global_weights()
+                result = orchestrator.receive_sparse_update(index, [0], [value], num_samples, version)
+                if result['success']:
+                    totals['numerator'] += num_samples * (weights[0] + value)
+                    break
+                assert result['stale'], result['message']
+                totals['stale'] += 1
+        else:
+            assert orchestrator.receive_local_update(index, np.full(args.params, value), num_samples)
+            totals['numerator'] += num_samples * value
+        totals['updates'] += 1
+        totals['samples'] += num_samples
+
+        if i % args.aggregate_every == 0:
+            result = orchestrator.aggregate_updates()
+            if result['success']:
+                totals['rounds'].append((result['new_version'], result['updates_aggregated'],
+                                         result['total_samples']))
+            elif result.get('conflict'):
+                totals['conflicts'] += 1
+    queue.put(totals)
+
+
+def run(backend, args):
+    tmp_dir = tempfile.mkdtemp(prefix='sae-fl-state-')
+    if backend == 'sql':
+        app = make_app()
+        location = app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):]
+    else:
+        location = tmp_dir
+    try:
+        parent = make_orchestrator(backend, location, args.min_updates)
+        parent.initialize_global_model((args.params,))
+        first_version = parent.get_snapshot().version
+
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        started = time.perf_counter()
+        processes = [context.Process(target=worker, args=(i, backend, location, args, queue))
+                     for i in range(args.workers)]
+        for process in processes:
+            process.start()
+        totals = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0, f'worker exited with {process.exitcode}'
+        elapsed = time.perf_counter() - started
+
+        rounds = [r for t in totals for r in t['rounds']]
+        result = parent.aggregate_updates(min_updates=1)
+        if result['success']:
+            rounds.append((result['new_version'], result['updates_aggregated'], result['total_samples']))
+        assert not result.get('updates_dropped'), f"{result.get('updates_dropped')} updates dropped"
+
+        submitted = sum(t['updates'] for t in totals)
+        samples = sum(t['samples'] for t in totals)
+        numerator = sum(t['numerator'] for t in totals)
+        versions = sorted(version for version, _, _ in rounds)
+        aggregated_numerator = sum(float(parent.state.load_weights(version)[0]) * round_samples
+                                   for version, _, round_samples in rounds)
+        print(f"{backend:>7} | {submitted:>7,} {len(rounds):>6} {sum(t['conflicts'] for t in totals):>9} "
+              f"{sum(t['stale'] for t in totals):>7} | {elapsed:>6.2f}")
+
+        assert versions == list(range(first_version + 1, first_version + 1 + len(rounds))), \
+            f'published versions are not contiguous: {versions}'
+        assert sum(r[1] for r in rounds) == submitted, f'{submitted} updates accepted, {sum(r[1] for r in rounds)} aggregated'
+        assert sum(r[2] for r in rounds) == samples, 'sample totals differ'
+        assert abs(aggregated_numerator - numerator) <= 1e-9 * max(1.0, abs(numerator)), 'FedAvg numerator differs'
+        assert parent.round_status()['pending_updates'] == 0
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if backend == 'sql':
+            os.remove(location)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='worker processes')
+    parser.add_argument('--updates', type=int, default=300, help='updates per worker')
+    parser.add_argument('--params', type=int, default=1000)
+    parser.add_argument('--min-updates', type=int, default=8)
+    parser.add_argument('--aggregate-every', type=int, default=5, help='updates between aggregation attempts')
+    parser.add_argument('--backend', choices=SHARED_BACKENDS, action='append')
+    args = parser.parse_args()
+
+    print(f"{args.workers} worker processes x {args.updates} updates, {args.params:,} params")
+    print(f"{'backend':>7} | {'updates':>7} {'rounds':>6} {'conflicts':>9} {'stale':>7} | {'secs':>6}")
+    for backend in args.backend or SHARED_BACKENDS:
+        run(backend, args)
+    print("every update aggregated exactly once; versions contiguous across processes")
+
+
+if __name__ == '__main__':
+    main()
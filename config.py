@@ -44,6 +44,99 @@ class Config:
         'pool_recycle': 300,
     }
 
+    # Fraud check micro-batching: coalesce concurrent booking-time checks
+    # into one model call, flushed every MAX_WAIT_MS or at MAX_BATCH_SIZE rows
+    FRAUD_MICRO_BATCH = os.environ.get('FRAUD_MICRO_BATCH', '0') == '1'
+    FRAUD_MICRO_BATCH_MAX_SIZE = int(os.environ.get('FRAUD_MICRO_BATCH_MAX_SIZE', '64'))
+    FRAUD_MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get('FRAUD_MICRO_BATCH_MAX_WAIT_MS', '2'))
+
+    # Fraud model inference engine: 'sklearn' or 'compiled' (pure numpy tree walk)
+    FRAUD_INFERENCE_ENGINE = os.environ.get('FRAUD_INFERENCE_ENGINE', 'sklearn')
+
+    # Versioned fraud model artifacts (publish_fraud_model.py); the CURRENT
+    # version is memory-mapped at startup when present
+    FRAUD_MODEL_DIR = os.environ.get('FRAUD_MODEL_DIR', 'ml_models/artifacts')
+    # Poll FRAUD_MODEL_DIR in the background and hot-swap newly published versions
+    FRAUD_MODEL_RELOAD = os.environ.get('FRAUD_MODEL_RELOAD', '1') == '1'
+    FRAUD_MODEL_POLL_SECONDS = float(os.environ.get('FRAUD_MODEL_POLL_SECONDS', '5'))
+
+    # FedAvg accumulation precision: 'float64' or 'float32' (half the memory)
+    FEDAVG_ACCUMULATION_DTYPE = os.environ.get('FEDAVG_ACCUMULATION_DTYPE', 'float64')
+    # 'buffered' keeps every pending update until aggregation; 'streaming'
+    # folds each into a running weighted sum (memory of one model)
+    FEDAVG_AGGREGATION_MODE = os.environ.get('FEDAVG_AGGREGATION_MODE', 'buffered')
+    # Keep client id / sample count / timestamp per pending update
+    FEDAVG_CLIENT_METADATA = os.environ.get('FEDAVG_CLIENT_METADATA', '1') == '1'
+    FEDAVG_MIN_UPDATES = int(os.environ.get('FEDAVG_MIN_UPDATES', '3'))
+    # Background aggregation: run a round once FEDAVG_MIN_UPDATES updates or
+    # FEDAVG_MIN_SAMPLES samples (0 = off) are pending, or the oldest pending
+    # update has waited FEDAVG_MAX_WAIT_SECONDS
+    FEDAVG_AUTO_AGGREGATE = os.environ.get('FEDAVG_AUTO_AGGREGATE', '0') == '1'
+    FEDAVG_MIN_SAMPLES = int(os.environ.get('FEDAVG_MIN_SAMPLES', '0'))
+    FEDAVG_MAX_WAIT_SECONDS = float(os.environ.get('FEDAVG_MAX_WAIT_SECONDS', '60'))
+    # How a round's dense updates are combined: 'fedavg' (sample-weighted
+    # mean), or the poisoning-robust 'median', 'trimmed_mean' (drops
+    # FEDAVG_TRIM_RATIO of each coordinate's values at both ends), 'krum'
+    # or 'multi_krum' (tolerate FEDAVG_BYZANTINE_CLIENTS bad clients;
+    # multi-Krum averages the FEDAVG_MULTI_KRUM_SIZE best, 0 = n - f).
+    # The robust rules need FEDAVG_AGGREGATION_MODE=buffered and refuse
+    # sparse deltas
+    FEDAVG_AGGREGATION_RULE = os.environ.get('FEDAVG_AGGREGATION_RULE', 'fedavg')
+    FEDAVG_TRIM_RATIO = float(os.environ.get('FEDAVG_TRIM_RATIO', '0.1'))
+    FEDAVG_BYZANTINE_CLIENTS = int(os.environ.get('FEDAVG_BYZANTINE_CLIENTS', '1'))
+    FEDAVG_MULTI_KRUM_SIZE = int(os.environ.get('FEDAVG_MULTI_KRUM_SIZE', '0'))
+    # Differential privacy (DP-FedAvg): clip each update's change to the
+    # global model to FEDAVG_DP_CLIP_NORM in L2 norm (0 = off) and add
+    # Gaussian noise of FEDAVG_DP_NOISE_MULTIPLIER x the clip norm to the
+    # sum. FEDAVG_DP_SAMPLE_RATE is the fraction of all clients in a round
+    # (privacy amplification; 1 = none), FEDAVG_DP_DELTA the delta epsilon
+    # is reported at. Needs the fedavg rule, buffered mode and the memory
+    # state backend
+    FEDAVG_DP_CLIP_NORM = float(os.environ.get('FEDAVG_DP_CLIP_NORM', '0'))
+    FEDAVG_DP_NOISE_MULTIPLIER = float(os.environ.get('FEDAVG_DP_NOISE_MULTIPLIER', '1.0'))
+    FEDAVG_DP_SAMPLE_RATE = float(os.environ.get('FEDAVG_DP_SAMPLE_RATE', '1.0'))
+    FEDAVG_DP_DELTA = float(os.environ.get('FEDAVG_DP_DELTA', '1e-5'))
+    # Buffered asynchronous aggregation (FedBuff): with
+    # FEDAVG_ASYNC_BUFFER_SIZE = K > 0 the model advances every K updates
+    # (instead of FEDAVG_MIN_UPDATES) with no round for clients to wait on.
+    # Each update counts as its change to the version it was trained from,
+    # weighted by (1 + staleness)^-FEDAVG_STALENESS_EXPONENT; updates more
+    # than FEDAVG_MAX_STALENESS versions behind get 409. The step is scaled
+    # by FEDAVG_SERVER_LEARNING_RATE. Needs the fedavg rule without DP and
+    # the memory state backend
+    FEDAVG_ASYNC_BUFFER_SIZE = int(os.environ.get('FEDAVG_ASYNC_BUFFER_SIZE', '0'))
+    FEDAVG_MAX_STALENESS = int(os.environ.get('FEDAVG_MAX_STALENESS', '10'))
+    FEDAVG_STALENESS_EXPONENT = float(os.environ.get('FEDAVG_STALENESS_EXPONENT', '0.5'))
+    FEDAVG_SERVER_LEARNING_RATE = float(os.environ.get('FEDAVG_SERVER_LEARNING_RATE', '1.0'))
+    # Hierarchical aggregation: regional aggregators
+    # (run_regional_aggregator.py) forward one partial FedAvg sum per
+    # region to /api/federated/regional/submit, authenticated with this
+    # shared token (empty = endpoint disabled). FEDAVG_REGIONAL_AGGREGATORS
+    # maps regions (Plumber.location) to aggregator URLs for clients:
+    # "Bengaluru North=http://10.0.0.5:5101,Bengaluru South=http://..."
+    FEDAVG_REGION_TOKEN = os.environ.get('FEDAVG_REGION_TOKEN', '')
+    FEDAVG_REGIONAL_AGGREGATORS = dict(
+        entry.split('=', 1) for entry in os.environ.get('FEDAVG_REGIONAL_AGGREGATORS', '').split(',') if '=' in entry
+    )
+    # /api/federated/global-model?since_version=N long-polls: the request
+    # waits up to FEDAVG_LONG_POLL_SECONDS (or the client's shorter
+    # ?timeout=) for a version other than N, then answers 304. Each waiting
+    # request holds a server thread, so at most FEDAVG_LONG_POLL_MAX_WAITERS
+    # wait at once (keep it below gunicorn's --threads). Polls beyond that
+    # get 503 with a Retry-After of FEDAVG_LONG_POLL_RETRY_SECONDS to twice
+    # that (jittered). 0 seconds = no waiting
+    FEDAVG_LONG_POLL_SECONDS = float(os.environ.get('FEDAVG_LONG_POLL_SECONDS', '25'))
+    FEDAVG_LONG_POLL_MAX_WAITERS = int(os.environ.get('FEDAVG_LONG_POLL_MAX_WAITERS', '12'))
+    FEDAVG_LONG_POLL_RETRY_SECONDS = max(1, int(os.environ.get('FEDAVG_LONG_POLL_RETRY_SECONDS', '5')))
+    # Where the open round and published model live: 'memory' (this
+    # process only), 'file' (FEDAVG_STATE_DIR, shared by the workers of a
+    # host or a shared filesystem) or 'sql' (the database, shared by every
+    # node); with 'file' or 'sql', run as many workers as needed
+    FEDAVG_STATE_BACKEND = os.environ.get('FEDAVG_STATE_BACKEND', 'memory')
+    FEDAVG_STATE_DIR = os.environ.get('FEDAVG_STATE_DIR', 'ml_models/federated_state')
+    # How long a worker serves its copy of the shared model before re-checking
+    FEDAVG_STATE_REFRESH_SECONDS = float(os.environ.get('FEDAVG_STATE_REFRESH_SECONDS', '1'))
+
     # Session lifetime
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
 
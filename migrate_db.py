@@ -0,0 +1,19 @@
+from app import app
+from models.migrations import ensure_indexes, ensure_weight_blob_columns, convert_json_weights
+
+def migrate():
+    with app.app_context():
+        print("Checking indexes...")
+        created = ensure_indexes()
+        for name in created:
+            print(f"  created {name}")
+        print(f"Done ({len(created)} index(es) created).")
+
+        print("Checking weight columns...")
+        for name in ensure_weight_blob_columns():
+            print(f"  converted {name} to binary")
+        converted = convert_json_weights()
+        print(f"Done ({converted} JSON weight row(s) rewritten as binary).")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from ml_models.federated_orchestrator import federated_orchestrator
+
+class AggregationScheduler:
+    """
+    Runs FedAvg rounds in the background instead of in a request thread.
+
+    A worker thread checks the orchestrator's open round whenever an
+    update arrives (notify) and every poll_interval seconds, and
+    aggregates as soon as one trigger fires:
+
+    - 'min_updates': min_updates_for_aggregation updates are pending
+    - 'min_samples': the pending updates carry min_samples samples
+    - 'max_wait': the round's first update has waited max_wait_seconds
+      (aggregates whatever is pending, even a single update)
+
+    persist(version, weights, updates_aggregated) writes the GlobalModel
+    row before the new weights are published in memory, so both change
+    together; if it fails, the computed round is retried on the next
+    check. Submissions go to a fresh round while aggregation runs (see
+    FederatedOrchestrator.aggregate_updates).
+    """
+
+    def __init__(self, orchestrator, enabled=False, max_wait_seconds=60.0, min_samples=None,
+                 poll_interval=1.0, persist=None):
+        self.orchestrator = orchestrator
+        self.enabled = enabled
+        self.max_wait_seconds = max_wait_seconds
+        self.min_samples = min_samples
+        self.poll_interval = poll_interval
+        self.persist = persist
+
+        self._worker = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+        self.rounds = 0
+        self.failed_rounds = 0
+        self.last_error = None
+        self.last_trigger = None
+        self.last_round_at = None
+        self.triggers = {'min_updates': 0, 'min_samples': 0, 'max_wait': 0, 'retry': 0}
+        # Most recent aggregate-and-publish durations
+        self.round_latencies_ms = deque(maxlen=100)
+
+    def configure(self, enabled=None, max_wait_seconds=None, min_samples=None, poll_interval=None, persist=None):
+        """Update settings; the worker uses them from its next check"""
+        if enabled is not None:
+            self.enabled = enabled
+        if max_wait_seconds is not None:
+            self.max_wait_seconds = max(0.0, float(max_wait_seconds))
+        if min_samples is not None:
+            self.min_samples = int(min_samples) or None
+        if poll_interval is not None:
+            self.poll_interval = max(0.01, float(poll_interval))
+        if persist is not None:
+            self.persist = persist
+
+    def notify(self):
+        """Called after each accepted update: wake the worker to check the triggers"""
+        if not self.enabled:
+            return
+        self.ensure_running()
+        self._wakeup.set()
+
+    def ensure_running(self):
+        """Start the worker lazily, and again in each forked gunicorn worker"""
+        pid = os.getpid()
+        if not self.enabled or (self._worker is not None and self._worker_pid == pid and self._worker.is_alive()):
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != pid or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='fedavg-scheduler', daemon=True)
+                self._worker_pid = pid
+                self._worker.start()
+
+    def due_trigger(self):
+        """Name of the trigger that fires for the open round, or None"""
+        status = self.orchestrator.round_status()
+        if status['unpublished']:
+            return 'retry'
+        if status['pending_updates'] == 0:
+            return None
+        if status['pending_updates'] >= self.orchestrator.min_updates_for_aggregation:
+            return 'min_updates'
+        if self.min_samples and status['pending_samples'] >= self.min_samples:
+            return 'min_samples'
+        if self.max_wait_seconds and status['round_age_seconds'] >= self.max_wait_seconds:
+            return 'max_wait'
+        return None
+
+    def run_once(self):
+        """Aggregate if a trigger fires; returns the aggregation result or None"""
+        trigger = self.due_trigger()
+        if trigger is None:
+            return None
+
+        started = time.perf_counter()
+        try:
+            # Below min_updates only because another trigger fired
+            result = self.orchestrator.aggregate_updates(
+                min_updates=None if trigger == 'min_updates' else 1, persist=self.persist)
+        except Exception as e:
+            self.failed_rounds += 1
+            self.last_error = str(e)
+            print(f"ERROR: Scheduled FedAvg round failed: {e}")
+            return None
+
+        if result['success']:
+            self.round_latencies_ms.append((time.perf_counter() - started) * 1000)
+            self.rounds += 1
+            self.triggers[trigger] += 1
+            self.last_trigger = trigger
+            self.last_round_at = datetime.utcnow()
+        return result
+
+    def _run(self):
+        while self.enabled:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                # Keep going while triggers fire (updates may pile up during a round)
+                while self.enabled:
+                    result = self.run_once()
+                    if not result or not result['success']:
+                        break
+            except Exception as e:
+                self.last_error = str(e)
+
+    def get_stats(self):
+        """Return trigger settings and round statistics"""
+        latencies = list(self.round_latencies_ms)
+        return {
+            'enabled': self.enabled,
+            'min_updates': self.orchestrator.min_updates_for_aggregation,
+            'min_samples': self.min_samples,
+            'max_wait_seconds': self.max_wait_seconds,
+            'rounds': self.rounds,
+            'failed_rounds': self.failed_rounds,
+            'triggers': dict(self.triggers),
+            'last_trigger': self.last_trigger,
+            'last_error': self.last_error,
+            'last_round_at': self.last_round_at.isoformat() if self.last_round_at else None,
+            'last_round_ms': round(latencies[-1], 3) if latencies else None,
+            'avg_round_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'max_round_ms': round(max(latencies), 3) if latencies else None
+        }
+
+federated_scheduler = AggregationScheduler(federated_orchestrator)
@@ -0,0 +1,82 @@
+import numpy as np
+from ml_models.update_buffer import validate_sparse_delta
+
+
+def staleness_weight(staleness, exponent=0.5):
+    """Polynomial staleness discount (FedAsync): (1 + staleness)^-exponent.
+
+    An update trained on the current model weighs 1; exponent 0 turns the
+    discount off.
+    """
+    return (1.0 + staleness) ** -exponent
+
+
+class StalenessBuffer:
+    """
+    Buffered asynchronous aggregation (FedBuff): a running sum of client
+    deltas, each taken against the model version the client trained from
+    and weighted by samples x staleness discount.
+
+    Like StreamingAccumulator, every update is folded in on arrival, so
+    memory is one model's worth. server_step() is the sample-weighted
+    mean of the discounted deltas: the discount shrinks a stale update's
+    share of the step without raising anyone else's.
+    """
+
+    def __init__(self, num_params):
+        self.num_params = int(num_params)
+        self.delta_sum = np.zeros(self.num_params)
+        self._scratch = np.empty(self.num_params)
+        self.samples = 0.0
+        self.count = 0
+        self.staleness_sum = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, weights, base_weights, num_samples, staleness, exponent=0.5):
+        """Fold in a dense update: weights - base_weights, discounted.
+
+        Raises ValueError if the update does not have num_params values.
+        """
+        if len(weights) != self.num_params:
+            raise ValueError(f'Expected {self.num_params} weights, got {len(weights)}')
+        self._scratch[:] = weights
+        self._scratch -= base_weights
+        num_samples = float(num_samples)
+        self._scratch *= num_samples * staleness_weight(staleness, exponent)
+        self.delta_sum += self._scratch
+        return self._counted(num_samples, staleness)
+
+    def append_sparse(self, indices, values, num_samples, staleness, exponent=0.5):
+        """Fold in a sparse delta (already relative to the client's base model)"""
+        indices, values = validate_sparse_delta(indices, values, self.num_params)
+        num_samples = float(num_samples)
+        if indices.size:
+            np.add.at(self.delta_sum, indices, values * (num_samples * staleness_weight(staleness, exponent)))
+        return self._counted(num_samples, staleness)
+
+    def _counted(self, num_samples, staleness):
+        self.samples += num_samples
+        self.staleness_sum += staleness
+        self.count += 1
+        return self.count - 1
+
+    def total_samples(self):
+        return self.samples
+
+    def mean_staleness(self):
+        return self.staleness_sum / self.count if self.count else 0.0
+
+    def server_step(self):
+        """sum(n_i * s(tau_i) * delta_i) / sum(n_i)"""
+        return self.delta_sum / self.samples
+
+    def clear(self):
+        self.delta_sum.fill(0.0)
+        self.samples = 0.0
+        self.count = 0
+        self.staleness_sum = 0
+
+    def nbytes(self):
+        return self.delta_sum.nbytes + self._scratch.nbytes
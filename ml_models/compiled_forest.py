@@ -0,0 +1,174 @@
+import numpy as np
+
+def average_path_length(n_samples):
+    """
+    Expected path length of an unsuccessful BST search over n samples,
+    c(n) in the Isolation Forest paper (same formula as scikit-learn)
+    """
+    n_samples = np.asarray(n_samples, dtype=float)
+    result = np.zeros_like(n_samples)
+    result[n_samples == 2] = 1.0
+    mask = n_samples > 2
+    result[mask] = (
+        2.0 * (np.log(n_samples[mask] - 1.0) + np.euler_gamma)
+        - 2.0 * (n_samples[mask] - 1.0) / n_samples[mask]
+    )
+    return result
+
+class CompiledForest:
+    """
+    Array-backed IsolationForest scorer with no scikit-learn call at inference.
+
+    Every tree of a fitted IsolationForest is flattened into shared
+    contiguous node arrays, renumbered breadth-first so the two children
+    of a split are adjacent:
+
+    - feature, threshold: split column (in full feature space) and cut
+      point; thresholds are stored as the largest float32 not above the
+      sklearn threshold, which keeps x <= threshold exact for float32 input
+    - left: global index of the left child; the right child is left + 1.
+      Leaves point at themselves with an infinite threshold, so rows that
+      reach a leaf early simply stay there
+    - leaf_value: path length credited at a leaf, i.e. node depth plus
+      c(n_node_samples) for the samples the leaf did not separate
+    - roots: index of each tree's root node
+    - packed: left child and split feature in one int32 (derived)
+    - scaler_mean, scaler_scale: optional StandardScaler parameters applied
+      by score_features before the trees
+
+    score_samples walks all trees for a batch of rows level by level with
+    numpy gathers and reproduces IsolationForest.score_samples. Arrays are
+    used as given, so read-only memory-mapped arrays work without a copy.
+    """
+
+    ARRAY_NAMES = ('feature', 'threshold', 'left', 'leaf_value', 'roots')
+    SCALER_ARRAY_NAMES = ('scaler_mean', 'scaler_scale')
+
+    def __init__(self, feature, threshold, left, leaf_value, roots, max_samples, max_depth, offset,
+                 packed=None, scaler_mean=None, scaler_scale=None, version=None, row_chunk_size=1024):
+        self.feature = np.asarray(feature)
+        self.threshold = np.asarray(threshold)
+        self.left = np.asarray(left)
+        self.leaf_value = np.asarray(leaf_value)
+        self.roots = np.asarray(roots)
+        self.max_samples = int(max_samples)
+        self.max_depth = int(max_depth)
+        # IsolationForest.offset_: rows scoring below it are predicted outliers
+        self.offset = float(offset)
+        self.row_chunk_size = row_chunk_size
+        # left child and split feature packed into one int32 so each level
+        # needs a single gather for both
+        self.feature_bits = max(1, int(self.feature.max(initial=0)).bit_length())
+        if packed is None:
+            packed = ((self.left.astype(np.int64) << self.feature_bits) | self.feature).astype(np.int32)
+        self.packed = np.asarray(packed)
+        self.scaler_mean = None if scaler_mean is None else np.asarray(scaler_mean)
+        self.scaler_scale = None if scaler_scale is None else np.asarray(scaler_scale)
+        # Published artifact version the arrays came from, if any
+        self.version = version
+        self.denominator = len(self.roots) * float(average_path_length([self.max_samples])[0])
+
+    @classmethod
+    def from_isolation_forest(cls, forest, scaler=None):
+        """Flatten a fitted sklearn IsolationForest (and optionally the
+        StandardScaler fitted in front of it) into contiguous node arrays"""
+        features, thresholds, lefts, leaf_values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator, tree_features in zip(forest.estimators_, forest.estimators_features_):
+            tree = estimator.tree_
+            children_left, children_right = tree.children_left, tree.children_right
+
+            # Breadth-first order, appending both children of a split together
+            order = [0]
+            depth = {0: 0}
+            for node in order:
+                if children_left[node] != -1:
+                    for child in (children_left[node], children_right[node]):
+                        depth[child] = depth[node] + 1
+                        order.append(child)
+            order = np.asarray(order)
+            position = np.empty(tree.node_count, dtype=np.int64)
+            position[order] = np.arange(tree.node_count)
+
+            is_leaf = children_left[order] == -1
+            node_depth = np.asarray([depth[node] for node in order])
+            threshold = tree.threshold[order].astype(np.float32)
+            # Round down where float32 rounding went above the float64 cut point
+            too_high = threshold.astype(np.float64) > tree.threshold[order]
+            threshold[too_high] = np.nextafter(threshold[too_high], np.float32(-np.inf))
+
+            features.append(np.where(is_leaf, 0, np.asarray(tree_features)[np.maximum(tree.feature[order], 0)]))
+            thresholds.append(np.where(is_leaf, np.float32(np.inf), threshold))
+            lefts.append(offset + np.where(is_leaf, np.arange(tree.node_count),
+                                           position[np.maximum(children_left[order], 0)]))
+            leaf_values.append(np.where(is_leaf, node_depth + average_path_length(tree.n_node_samples[order]), 0.0))
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, int(node_depth.max()))
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float32),
+            left=np.concatenate(lefts).astype(np.int32),
+            leaf_value=np.concatenate(leaf_values).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_samples=forest.max_samples_,
+            max_depth=max_depth,
+            offset=forest.offset_,
+            scaler_mean=None if scaler is None else np.asarray(scaler.mean_, dtype=np.float64),
+            scaler_scale=None if scaler is None else np.asarray(scaler.scale_, dtype=np.float64)
+        )
+
+    def to_arrays(self):
+        """Node arrays plus scalar metadata, e.g. for saving to disk"""
+        arrays = {name: getattr(self, name) for name in self.ARRAY_NAMES + ('packed',)}
+        if self.scaler_mean is not None:
+            arrays.update({name: getattr(self, name) for name in self.SCALER_ARRAY_NAMES})
+        return arrays, {'max_samples': self.max_samples, 'max_depth': self.max_depth, 'offset': self.offset}
+
+    @classmethod
+    def from_arrays(cls, arrays, metadata, version=None):
+        optional = {name: arrays.get(name) for name in ('packed',) + cls.SCALER_ARRAY_NAMES}
+        return cls(max_samples=metadata['max_samples'], max_depth=metadata['max_depth'],
+                   offset=metadata['offset'], version=version,
+                   **{name: arrays[name] for name in cls.ARRAY_NAMES}, **optional)
+
+    def _path_lengths(self, X):
+        """Sum over trees of the path length each row ends with"""
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        feature_mask = (1 << self.feature_bits) - 1
+        nodes = np.repeat(self.roots[None, :], n_rows, axis=0)
+
+        for _ in range(self.max_depth):
+            packed = np.take(self.packed, nodes)
+            # sklearn trees send a row left when x[feature] <= threshold
+            go_right = np.take(flat_X, row_base + (packed & feature_mask)) > np.take(self.threshold, nodes)
+            nodes = (packed >> self.feature_bits) + go_right
+
+        return np.take(self.leaf_value, nodes).sum(axis=1)
+
+    def score_samples(self, X):
+        """Equivalent of IsolationForest.score_samples (lower is more abnormal)"""
+        # sklearn evaluates trees on float32 input; cast identically so splits agree
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        depths = np.empty(len(X))
+        for start in range(0, len(X), self.row_chunk_size):
+            stop = start + self.row_chunk_size
+            depths[start:stop] = self._path_lengths(X[start:stop])
+
+        if self.denominator == 0:
+            return -np.ones(len(X))
+        return -(2 ** (-depths / self.denominator))
+
+    def score_features(self, X):
+        """score_samples on unscaled feature rows, standardised with the
+        stored scaler parameters (StandardScaler.transform arithmetic)"""
+        X = np.asarray(X, dtype=float)
+        if self.scaler_mean is not None:
+            X = (X - self.scaler_mean) / self.scaler_scale
+        return self.score_samples(X)
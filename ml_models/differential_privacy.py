@@ -0,0 +1,125 @@
+import math
+import numpy as np
+
+# Rows per block in clipped_delta_sum: about 1 MB of float64 deltas, so
+# each block is still in cache when it is reduced to norms and summed
+BLOCK_BYTES = 1024 * 1024
+
+# Integer Renyi orders the accountant tracks; epsilon is the minimum over them
+RDP_ORDERS = tuple(range(2, 65)) + (80, 96, 128, 192, 256, 512, 1024)
+
+
+def clipped_delta_sum(rows, base, clip_norm, block_bytes=BLOCK_BYTES):
+    """Sum of the updates' deltas to base, each scaled to an L2 norm of at
+    most clip_norm; returns (sum as float64, number of deltas clipped).
+
+    One pass over the (clients, params) matrix in row blocks: a block's
+    deltas are written into one reused float64 buffer, reduced to their
+    norms and folded into the sum with a (block,) x (block, params)
+    product while still in cache. Nothing the size of the update matrix
+    is allocated.
+    """
+    num_rows, num_params = rows.shape
+    base = np.asarray(base, dtype=np.float64).ravel()
+    step = max(1, min(num_rows, block_bytes // (8 * max(1, num_params))))
+    buffer = np.empty((step, num_params))
+    total = np.zeros(num_params)
+    clipped = 0
+    for start in range(0, num_rows, step):
+        block = rows[start:start + step]
+        deltas = buffer[:len(block)]
+        np.subtract(block, base, out=deltas)
+        norms = np.sqrt(np.einsum('ij,ij->i', deltas, deltas))
+        clipped += int(np.count_nonzero(norms > clip_norm))
+        total += np.minimum(1.0, clip_norm / np.maximum(norms, 1e-12)) @ deltas
+    return total, clipped
+
+
+def gaussian_noise(size, std, rng=None):
+    """Gaussian noise vector, N(0, std^2) per coordinate"""
+    rng = rng if rng is not None else np.random.default_rng()
+    return rng.standard_normal(size) * std
+
+
+def _log_add(a, b):
+    high, low = max(a, b), min(a, b)
+    if low == -math.inf:
+        return high
+    return high + math.log1p(math.exp(low - high))
+
+
+def sampled_gaussian_rdp(sample_rate, noise_multiplier, order):
+    """RDP of one sampled Gaussian mechanism step at an integer order.
+
+    Mironov, Talwar and Zhang (2019), the integer-order binomial
+    expansion: log(sum_k C(a,k) (1-q)^(a-k) q^k exp((k^2 - k) / 2z^2)) / (a - 1),
+    summed in log space. sample_rate 1 reduces to the plain Gaussian
+    mechanism, a / 2z^2.
+    """
+    if noise_multiplier <= 0:
+        return math.inf
+    if sample_rate <= 0:
+        return 0.0
+    if sample_rate >= 1.0:
+        return order / (2.0 * noise_multiplier ** 2)
+    log_a = -math.inf
+    log_q, log_1q = math.log(sample_rate), math.log1p(-sample_rate)
+    for k in range(order + 1):
+        log_coefficient = math.lgamma(order + 1) - math.lgamma(k + 1) - math.lgamma(order - k + 1)
+        log_a = _log_add(log_a, log_coefficient + k * log_q + (order - k) * log_1q
+                         + (k * k - k) / (2.0 * noise_multiplier ** 2))
+    return log_a / (order - 1)
+
+
+class RDPAccountant:
+    """
+    Renyi-DP accountant for repeated sampled Gaussian rounds.
+
+    Each step adds the round's RDP at every order (RDP composes by
+    addition); epsilon(delta) converts the total to (epsilon, delta)-DP
+    with the conversion of Balle et al. (2020) and takes the best order.
+    """
+
+    def __init__(self, orders=RDP_ORDERS):
+        self.orders = tuple(orders)
+        self.rdp = np.zeros(len(self.orders))
+        self.steps = 0
+        # (sample_rate, noise_multiplier) -> per-order RDP of one step
+        self._cache = {}
+
+    def step(self, noise_multiplier, sample_rate=1.0, steps=1):
+        key = (float(sample_rate), float(noise_multiplier))
+        if key not in self._cache:
+            self._cache[key] = np.array([sampled_gaussian_rdp(key[0], key[1], order) for order in self.orders])
+        # A new array rather than in place, so a concurrent epsilon() reads a consistent total
+        self.rdp = self.rdp + steps * self._cache[key]
+        self.steps += steps
+
+    def copy(self):
+        accountant = RDPAccountant(self.orders)
+        accountant.rdp, accountant.steps, accountant._cache = self.rdp, self.steps, self._cache
+        return accountant
+
+    def state(self):
+        """JSON-serializable totals, for from_state() after a restart"""
+        return {'orders': list(self.orders), 'rdp': self.rdp.tolist(), 'steps': self.steps}
+
+    @classmethod
+    def from_state(cls, state):
+        accountant = cls(state['orders'])
+        if len(state['rdp']) != len(accountant.orders):
+            raise ValueError(f"{len(state['rdp'])} RDP values for {len(accountant.orders)} orders")
+        accountant.rdp = np.array(state['rdp'], dtype=np.float64)
+        accountant.steps = int(state['steps'])
+        return accountant
+
+    def epsilon(self, delta):
+        """(epsilon, order achieving it) for the rounds so far"""
+        if self.steps == 0:
+            return 0.0, None
+        orders = np.array(self.orders, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            epsilons = self.rdp + np.log1p(-1.0 / orders) - (math.log(delta) + np.log(orders)) / (orders - 1)
+        epsilons = np.where(np.isnan(epsilons), np.inf, epsilons)
+        best = int(np.argmin(epsilons))
+        return max(0.0, float(epsilons[best])), self.orders[best]
@@ -1,116 +1,1181 @@
 import numpy as np
 import json
+import threading
+import time
+from collections import namedtuple
 from datetime import datetime
+from ml_models.update_buffer import (UpdateBuffer, StreamingAccumulator, SparseDeltaAccumulator,
+                                     validate_sparse_delta, ACCUMULATION_DTYPES, AGGREGATION_MODES)
+from ml_models.orchestrator_state import create_state, RoundConflict
+from ml_models.local_training import train_logistic_regression
+from ml_models.robust_aggregation import aggregate, minimum_updates, AGGREGATION_RULES
+from ml_models.secure_aggregation import SecureAggregator
+from ml_models.differential_privacy import RDPAccountant, clipped_delta_sum, gaussian_noise
+from ml_models.async_aggregation import StalenessBuffer
+from ml_models.model_payload_cache import ModelPayloadCache
+
+# Regional partial ids remembered for de-duplication. Kept across rounds:
+# a partial resent after a lost response may arrive after its round closed
+MERGED_PARTIAL_IDS = 10000
+
+# The published global model. Replaced as a whole, never modified (weights
+# is a read-only array), so readers get a consistent version/weights pair
+# from a single attribute read, without a lock.
+ModelSnapshot = namedtuple('ModelSnapshot', ['version', 'weights', 'published_at'])
+
+def _snapshot(version, weights):
+    if weights is not None:
+        weights.flags.writeable = False
+    return ModelSnapshot(version, weights, datetime.utcnow())
+
+def _sample_count(num_samples):
+    """num_samples as a positive finite int or float; raises ValueError otherwise"""
+    if isinstance(num_samples, (bool, str, bytes)):
+        raise ValueError('num_samples must be a number')
+    try:
+        count = float(num_samples)
+    except (TypeError, ValueError):
+        raise ValueError('num_samples must be a number') from None
+    if not 0 < count < float('inf'):
+        raise ValueError(f'num_samples must be positive, got {num_samples!r}')
+    return int(count) if count.is_integer() else count
 
 class FederatedOrchestrator:
     """
     Simulates federated learning orchestration
     Implements FedAvg (Federated Averaging) algorithm
+    
+    Safe for threaded workers: writers (receive_*, aggregation) take a
+    short lock to append to or swap the pending stores, and publishing
+    replaces the ModelSnapshot reference; readers of the global model
+    (get_global_weights, get_global_model, get_stats) take no lock.
+    
+    With a shared state backend (configure(state_backend='file'|'sql'),
+    see ml_models/orchestrator_state.py) the open round and the published
+    model live outside the process: every worker appends to the same
+    round, one of them closes it, and the others pick up the new version
+    within refresh_interval seconds.
     """
     
-    def __init__(self):
-        self.global_model_version = 1
-        self.global_weights = None
+    def __init__(self, accumulation_dtype='float64', aggregation_mode='buffered', track_client_metadata=True):
+        self._published = _snapshot(1, None)
+        # Per-client metadata of pending updates (optional); their weights
+        # live in pending_weights, stacked (UpdateBuffer) or folded into a
+        # running sum (StreamingAccumulator) depending on aggregation_mode
         self.pending_updates = []
+        self.pending_weights = None
+        # Sparse deltas against the current global model, scatter-added
+        self.pending_deltas = None
+        # Regional partial sums (StreamingAccumulator), merged as they arrive
+        self.pending_partials = None
+        # Ids of the last MERGED_PARTIAL_IDS partials merged, oldest first
+        self._merged_partials = {}
+        # When the first update of the open round arrived (time.monotonic())
+        self.round_started_at = None
+        self.accumulation_dtype = accumulation_dtype
+        self.aggregation_mode = aggregation_mode
+        self.track_client_metadata = track_client_metadata
         self.min_updates_for_aggregation = 3
+        # How dense updates are combined (see AGGREGATION_RULES); the robust
+        # rules need the stacked update matrix, i.e. aggregation_mode 'buffered'
+        self.aggregation_rule = 'fedavg'
+        self.trim_ratio = 0.1
+        self.byzantine_clients = 1
+        self.multi_krum_size = None
+        # Differential privacy (DP-FedAvg, off while dp_clip_norm is None):
+        # each update's delta to the global model is clipped to dp_clip_norm,
+        # and Gaussian noise of std dp_noise_multiplier * clip / n is added
+        # to the mean delta. dp_sample_rate is the fraction of the client
+        # population taking part in a round (1: no amplification by sampling).
+        self.dp_clip_norm = None
+        self.dp_noise_multiplier = 1.0
+        self.dp_delta = 1e-5
+        self.dp_sample_rate = 1.0
+        self.privacy_accountant = RDPAccountant()
+        # Cumulative epsilon after each DP round, by the version it published
+        self.privacy_ledger = {}
+        self._noise_rng = np.random.default_rng()
+        # Buffered asynchronous mode (FedBuff; None: synchronous rounds):
+        # clients submit against the version they trained from, their deltas
+        # are discounted by staleness (versions behind, at most
+        # max_staleness) and the model advances by server_learning_rate x
+        # the buffered step every async_buffer_size updates
+        self.async_buffer_size = None
+        self.max_staleness = 10
+        self.staleness_exponent = 0.5
+        self.server_learning_rate = 1.0
+        self.pending_async = None
+        self.stale_updates_rejected = 0
+        # Recently published weights by version: the base models of stale updates
+        self._history = {}
+        
+        # Guards the pending stores and publishing; held only for appends
+        # and pointer swaps, never while converting or averaging
+        self._lock = threading.Lock()
+        # Notified (under _lock) whenever _published is replaced; long polls wait on it
+        self._published_changed = threading.Condition(self._lock)
+        # Serialized forms of the published model, rebuilt once per snapshot
+        self.payload_cache = ModelPayloadCache()
+        # One aggregation at a time (admin endpoint or AggregationScheduler)
+        self._aggregation_lock = threading.Lock()
+        # Stores of the last closed round, cleared and reused by the next
+        # one (double buffering: updates keep arriving during aggregation)
+        self._spare_weights = None
+        self._spare_deltas = None
+        self._spare_async = None
+        # Set from closing a round until its result is published
+        self._round_closing = False
+        # Round closed and averaged but not yet published (persist failed)
+        self._unpublished = None
+        
+        # Shared round/model store (None: the in-process stores above)
+        self.state = None
+        # Seconds a process serves its copy of the shared published model
+        self.refresh_interval = 1.0
+        self._refreshed_at = None
+        
+        # Open pairwise-masked round (SecureAggregator), separate from the
+        # plain pending stores: only masked vectors and their sum are held
+        self.secure_round = None
+    
+    @property
+    def global_weights(self):
+        return self._published.weights
+    
+    @global_weights.setter
+    def global_weights(self, weights):
+        with self._lock:
+            self._replace_published(self._published.version, np.array(weights, dtype=np.float64))
+    
+    @property
+    def global_model_version(self):
+        return self._published.version
+    
+    @global_model_version.setter
+    def global_model_version(self, version):
+        with self._lock:
+            self._replace_published(version, self._published.weights)
+    
+    def _replace_published(self, version, weights):
+        """Publish a new ModelSnapshot and wake long polls; the caller holds _lock"""
+        self._published = _snapshot(version, weights)
+        self._published_changed.notify_all()
+    
+    def get_snapshot(self):
+        """The published ModelSnapshot (initializing the model if needed)"""
+        if self.state is not None:
+            return self._refresh_published()
+        snapshot = self._published
+        if snapshot.weights is None:
+            with self._lock:
+                if self._published.weights is None:
+                    self._initialize(self._published.version, (10,))
+            snapshot = self._published
+        return snapshot
+    
+    def configure(self, accumulation_dtype=None, aggregation_mode=None, track_client_metadata=None,
+                  min_updates=None, state_backend=None, state_dir=None, state_engine=None,
+                  refresh_interval=None, aggregation_rule=None, trim_ratio=None, byzantine_clients=None,
+                  multi_krum_size=None, dp_clip_norm=None, dp_noise_multiplier=None, dp_delta=None,
+                  dp_sample_rate=None, async_buffer_size=None, max_staleness=None, staleness_exponent=None,
+                  server_learning_rate=None):
+        """Update settings (see ACCUMULATION_DTYPES, AGGREGATION_MODES, AGGREGATION_RULES
+        and STATE_BACKENDS).
+
+        A new dtype or mode applies from the next round; updates already
+        pending are aggregated the way they were received. Choose the
+        state backend at startup: switching drops the reference to the
+        previous backend's round.
+        
+        dp_clip_norm=0 turns differential privacy off. DP needs the fedavg
+        rule in buffered mode and the memory state backend (the privacy
+        accountant is per process).
+        
+        async_buffer_size=0 returns to synchronous rounds. In asynchronous
+        mode the buffer size replaces min_updates; it needs the fedavg rule
+        without DP and the memory state backend.
+        """
+        if state_backend is not None:
+            self.state = create_state(state_backend, state_dir=state_dir, engine=state_engine)
+            self._refreshed_at = None
+        if refresh_interval is not None:
+            self.refresh_interval = max(0.0, float(refresh_interval))
+        if min_updates is not None:
+            self.min_updates_for_aggregation = max(1, int(min_updates))
+        if accumulation_dtype is not None:
+            if accumulation_dtype not in ACCUMULATION_DTYPES:
+                raise ValueError(f'Unknown accumulation dtype {accumulation_dtype!r}, '
+                                 f'expected one of {ACCUMULATION_DTYPES}')
+            self.accumulation_dtype = accumulation_dtype
+        if aggregation_mode is not None:
+            if aggregation_mode not in AGGREGATION_MODES:
+                raise ValueError(f'Unknown aggregation mode {aggregation_mode!r}, expected one of {AGGREGATION_MODES}')
+            self.aggregation_mode = aggregation_mode
+        if track_client_metadata is not None:
+            self.track_client_metadata = track_client_metadata
+        if aggregation_rule is not None:
+            if aggregation_rule not in AGGREGATION_RULES:
+                raise ValueError(f'Unknown aggregation rule {aggregation_rule!r}, expected one of {AGGREGATION_RULES}')
+            self.aggregation_rule = aggregation_rule
+        if self.aggregation_rule != 'fedavg' and self.aggregation_mode == 'streaming':
+            raise ValueError(f"The {self.aggregation_rule} rule needs every update, use aggregation_mode 'buffered'")
+        if trim_ratio is not None:
+            if not 0.0 <= trim_ratio < 0.5:
+                raise ValueError('trim_ratio must be in [0, 0.5)')
+            self.trim_ratio = float(trim_ratio)
+        if byzantine_clients is not None:
+            self.byzantine_clients = max(0, int(byzantine_clients))
+        if multi_krum_size is not None:
+            self.multi_krum_size = int(multi_krum_size) or None
+        if dp_clip_norm is not None:
+            if dp_clip_norm < 0:
+                raise ValueError('dp_clip_norm must be positive, or 0 for no differential privacy')
+            self.dp_clip_norm = float(dp_clip_norm) or None
+        if dp_noise_multiplier is not None:
+            if dp_noise_multiplier <= 0:
+                raise ValueError('dp_noise_multiplier must be positive')
+            self.dp_noise_multiplier = float(dp_noise_multiplier)
+        if dp_delta is not None:
+            if not 0.0 < dp_delta < 1.0:
+                raise ValueError('dp_delta must be in (0, 1)')
+            self.dp_delta = float(dp_delta)
+        if dp_sample_rate is not None:
+            if not 0.0 < dp_sample_rate <= 1.0:
+                raise ValueError('dp_sample_rate must be in (0, 1]')
+            self.dp_sample_rate = float(dp_sample_rate)
+        if self.dp_clip_norm is not None:
+            if self.aggregation_rule != 'fedavg' or self.aggregation_mode != 'buffered':
+                raise ValueError("Differential privacy needs the fedavg rule with aggregation_mode 'buffered'")
+            if self.state is not None:
+                raise ValueError(f'Differential privacy needs the memory state backend, not {self.state.name!r}')
+        if async_buffer_size is not None:
+            self.async_buffer_size = max(0, int(async_buffer_size)) or None
+        if max_staleness is not None:
+            self.max_staleness = max(0, int(max_staleness))
+        if staleness_exponent is not None:
+            if staleness_exponent < 0:
+                raise ValueError('staleness_exponent must not be negative')
+            self.staleness_exponent = float(staleness_exponent)
+        if server_learning_rate is not None:
+            if server_learning_rate <= 0:
+                raise ValueError('server_learning_rate must be positive')
+            self.server_learning_rate = float(server_learning_rate)
+        if self.async_buffer_size is not None:
+            if self.aggregation_rule != 'fedavg' or self.dp_clip_norm is not None:
+                raise ValueError('Asynchronous aggregation needs the fedavg rule without differential privacy')
+            if self.state is not None:
+                raise ValueError(f'Asynchronous aggregation needs the memory state backend, not {self.state.name!r}')
+            self.min_updates_for_aggregation = self.async_buffer_size
+        with self._lock:
+            if self.pending_weights is not None and len(self.pending_weights) == 0:
+                self.pending_weights = None
         
     def initialize_global_model(self, model_shape=(10,)):
-        """Initialize global model with random weights"""
-        self.global_weights = np.random.randn(*model_shape) * 0.01
-        return self.global_weights
+        """Initialize global model with random weights
+        
+        With a shared state, only if no process has published a model yet.
+        """
+        if self.state is not None:
+            return self._refresh_published(force=True, model_shape=model_shape).weights
+        with self._lock:
+            self._initialize(self._published.version, model_shape)
+            return self._published.weights
+    
+    def restore_global_model(self, version, weights):
+        """Resume from a persisted model (e.g. the latest GlobalModel row)"""
+        with self._lock:
+            self._set_model(version, np.array(weights, dtype=np.float64))
+    
+    def _initialize(self, version, model_shape):
+        self._set_model(version, np.random.randn(*model_shape) * 0.01)
+    
+    def _set_model(self, version, weights):
+        self._replace_published(version, weights)
+        size = self._published.weights.size
+        if any(store.num_params != size for store in self._pending_stores()):
+            # Pending updates were for a model of another shape
+            self.pending_weights = None
+            self.pending_deltas = None
+            self.pending_partials = None
+            self.pending_async = None
+            self.pending_updates = []
+            self.round_started_at = None
+        self._spare_weights = None
+        self._spare_deltas = None
+        self._spare_async = None
+        self._history = {}
+    
+    def _refresh_published(self, force=False, model_shape=(10,)):
+        """Adopt the shared state's latest published model, at most every refresh_interval"""
+        snapshot = self._published
+        now = time.monotonic()
+        if (not force and snapshot.weights is not None and self._refreshed_at is not None
+                and now - self._refreshed_at < self.refresh_interval):
+            return snapshot
+        
+        version = self.state.published_version()
+        if version is None:
+            # The first process to start publishes the initial model
+            with self.state.round_lock():
+                version = self.state.published_version()
+                if version is None:
+                    try:
+                        self.state.publish(None, 1, np.random.randn(*model_shape) * 0.01, 0)
+                    except RoundConflict:
+                        pass
+                    version = self.state.published_version()
+        
+        if snapshot.weights is None or version > snapshot.version:
+            weights = self.state.load_weights(version)
+            with self._lock:
+                if self._published.weights is None or version > self._published.version:
+                    self._replace_published(version, weights)
+        self._refreshed_at = now
+        return self._published
+    
+    def _matches_settings(self, store):
+        return (store.num_params == self.global_weights.size
+                and store.dtype == np.dtype(self.accumulation_dtype)
+                and isinstance(store, StreamingAccumulator) == (self.aggregation_mode == 'streaming'))
+    
+    def _get_pending_weights(self):
+        if self.pending_weights is None:
+            if self._spare_weights is not None and self._matches_settings(self._spare_weights):
+                self.pending_weights = self._spare_weights
+            else:
+                store = StreamingAccumulator if self.aggregation_mode == 'streaming' else UpdateBuffer
+                self.pending_weights = store(self.global_weights.size, dtype=self.accumulation_dtype)
+            self._spare_weights = None
+        return self.pending_weights
+    
+    def _get_pending_deltas(self):
+        if self.pending_deltas is None:
+            if self._spare_deltas is not None and self._spare_deltas.num_params == self.global_weights.size:
+                self.pending_deltas = self._spare_deltas
+            else:
+                self.pending_deltas = SparseDeltaAccumulator(self.global_weights.size)
+            self._spare_deltas = None
+        return self.pending_deltas
+    
+    def _get_pending_async(self):
+        if self.pending_async is None:
+            if self._spare_async is not None and self._spare_async.num_params == self.global_weights.size:
+                self.pending_async = self._spare_async
+            else:
+                self.pending_async = StalenessBuffer(self.global_weights.size)
+            self._spare_async = None
+        return self.pending_async
+    
+    def _pending_stores(self):
+        return [store for store in (self.pending_weights, self.pending_deltas, self.pending_partials, self.pending_async)
+                if store is not None]
+    
+    def _pending_count(self):
+        return sum(len(store) for store in self._pending_stores())
+    
+    def _pending_samples(self):
+        return sum(store.total_samples() for store in self._pending_stores())
+    
+    def round_status(self):
+        """Size and age of the open round (AggregationScheduler's triggers)"""
+        if self.state is not None:
+            status = self.state.round_status()
+            status.pop('pending_sparse_updates')
+            status['unpublished'] = False
+            return status
+        with self._lock:
+            started_at = self.round_started_at
+            return {
+                'pending_updates': self._pending_count(),
+                'pending_samples': self._pending_samples(),
+                'round_age_seconds': time.monotonic() - started_at if started_at is not None else 0.0,
+                'unpublished': self._unpublished is not None
+            }
+    
+    def _update_received(self):
+        if self.round_started_at is None:
+            self.round_started_at = time.monotonic()
+    
+    def _record_client_metadata(self, client_id, num_samples, **extra):
+        if self.track_client_metadata:
+            update = {
+                'client_id': client_id,
+                'num_samples': num_samples,
+                'timestamp': datetime.utcnow(),
+                'version': self.global_model_version
+            }
+            update.update(extra)
+            self.pending_updates.append(update)
     
     def receive_local_update(self, client_id, local_weights, num_samples):
-        """Receive and store local model update from a client"""
-        update = {
-            'client_id': client_id,
-            'weights': local_weights,
-            'num_samples': num_samples,
-            'timestamp': datetime.utcnow(),
-            'version': self.global_model_version
-        }
-        self.pending_updates.append(update)
+        """Receive and store local model update from a client.
+
+        The weights are copied into the pending update buffer, or folded
+        into the running sum in streaming mode. Returns False if they are
+        not numeric, do not match the global model's size, or num_samples
+        is not a positive number.
+        """
+        snapshot = self.get_snapshot()
+        try:
+            num_samples = _sample_count(num_samples)
+            # Parse a JSON list before taking the lock, which then only covers the row copy
+            if not isinstance(local_weights, np.ndarray):
+                local_weights = np.asarray(local_weights, dtype=np.float64)
+        except (TypeError, ValueError):
+            return False
+        
+        if self.state is not None:
+            if local_weights.size != snapshot.weights.size:
+                return False
+            self.state.add_update(client_id, local_weights.ravel(), num_samples, snapshot.version)
+            return True
+        
+        with self._lock:
+            try:
+                self._get_pending_weights().append(local_weights, num_samples)
+            except (TypeError, ValueError):
+                return False
+            
+            self._record_client_metadata(client_id, num_samples)
+            self._update_received()
         return True
     
-    def aggregate_updates(self):
+    def receive_sparse_update(self, client_id, indices, values, num_samples, base_version):
+        """Receive a sparse delta: the client's weights are the global model
+        of base_version plus values at indices (top-k or thresholded).
+
+        The delta is scatter-added into a dense running sum, so the cost
+        scales with len(indices), not the model size. Only deltas against
+        the current version can be averaged; older ones are rejected, and
+        so are deltas against a version whose round is being aggregated
+        (the next round is applied to the version it produces).
+        
+        With a shared state, a delta is checked against the latest version
+        published by any process and averaged against its own base model,
+        even if another process closes the round before it is claimed.
+        
+        Deltas are only accepted under the fedavg rule without differential
+        privacy: the robust rules compare and DP clips whole updates, and
+        deltas are summed on arrival.
+        """
+        if self.aggregation_rule != 'fedavg' or self.dp_clip_norm is not None:
+            rule = 'differentially private fedavg' if self.aggregation_rule == 'fedavg' else self.aggregation_rule
+            return {
+                'success': False,
+                'stale': False,
+                'message': f'Sparse deltas cannot be aggregated with the {rule} rule, send dense weights'
+            }
+        try:
+            num_samples = _sample_count(num_samples)
+        except ValueError as e:
+            return {'success': False, 'stale': False, 'message': f'Invalid update data: {e}'}
+        if self.state is not None:
+            snapshot = self._refresh_published(force=True)
+            if base_version != snapshot.version:
+                return {
+                    'success': False,
+                    'stale': True,
+                    'message': f'Delta is against version {base_version}, current version is {snapshot.version}'
+                }
+            try:
+                indices, values = validate_sparse_delta(indices, values, snapshot.weights.size)
+            except (TypeError, ValueError) as e:
+                return {'success': False, 'stale': False, 'message': f'Invalid sparse delta: {e}'}
+            self.state.add_sparse(client_id, indices, values, num_samples, base_version)
+            return {'success': True, 'stale': False, 'message': 'Update received'}
+        
+        self.get_snapshot()
+        
+        with self._lock:
+            if base_version != self.global_model_version:
+                return {
+                    'success': False,
+                    'stale': True,
+                    'message': f'Delta is against version {base_version}, current version is {self.global_model_version}'
+                }
+            if self._round_closing:
+                return {
+                    'success': False,
+                    'stale': True,
+                    'message': f'Version {base_version} is being aggregated, fetch the new model and retry'
+                }
+            
+            try:
+                self._get_pending_deltas().append(indices, values, num_samples)
+            except (TypeError, ValueError) as e:
+                return {'success': False, 'stale': False, 'message': f'Invalid sparse delta: {e}'}
+            
+            self._record_client_metadata(client_id, num_samples, sparse=True, nonzeros=len(indices))
+            self._update_received()
+        return {'success': True, 'stale': False, 'message': 'Update received'}
+    
+    def receive_partial_aggregate(self, region, weighted_sum, num_samples, num_updates, partial_id=None):
+        """Merge a regional aggregator's partial FedAvg sum into the open round.
+
+        weighted_sum is sum(n_i * w_i) over the region's num_updates
+        clients and num_samples is sum(n_i), so the root's average over
+        all regions is the same FedAvg as if every client had posted here,
+        at the cost of one model-sized addition per region. The updates
+        count towards min_updates individually. A partial_id already
+        merged is acknowledged without merging it again ('duplicate'):
+        regions resend a partial whose response they did not get.
+        """
+        if self.aggregation_rule != 'fedavg' or self.dp_clip_norm is not None or self.async_buffer_size is not None:
+            return {'success': False, 'message': 'Regional partial sums need synchronous fedavg rounds without DP'}
+        if self.state is not None:
+            return {'success': False, 'message': f'Regional partial sums need the memory state backend, not {self.state.name!r}'}
+        snapshot = self.get_snapshot()
+        try:
+            num_samples, num_updates = _sample_count(num_samples), int(num_updates)
+            if num_updates <= 0:
+                raise ValueError('update count must be positive')
+            if not isinstance(weighted_sum, np.ndarray):
+                weighted_sum = np.asarray(weighted_sum, dtype=np.float64)
+            if not np.isfinite(weighted_sum).all():
+                raise ValueError('weighted sum contains NaN or infinity')
+        except (TypeError, ValueError) as e:
+            return {'success': False, 'message': f'Invalid partial aggregate: {e}'}
+        
+        with self._lock:
+            if partial_id is not None and partial_id in self._merged_partials:
+                return {'success': True, 'duplicate': True,
+                        'message': f'Partial {partial_id} from {region} was already merged'}
+            if self.pending_partials is None:
+                self.pending_partials = StreamingAccumulator(snapshot.weights.size)
+            try:
+                self.pending_partials.merge(weighted_sum.ravel(), num_samples, num_updates)
+            except (TypeError, ValueError) as e:
+                return {'success': False, 'message': f'Invalid partial aggregate: {e}'}
+            if partial_id is not None:
+                self._merged_partials[partial_id] = region
+                if len(self._merged_partials) > MERGED_PARTIAL_IDS:
+                    del self._merged_partials[next(iter(self._merged_partials))]
+            self._record_client_metadata(region, num_samples, region=region, updates=num_updates)
+            self._update_received()
+        return {'success': True, 'duplicate': False, 'message': f'Merged {num_updates} updates from {region}'}
+    
+    def receive_async_update(self, client_id, num_samples, base_version, local_weights=None, sparse_delta=None):
+        """Receive an update in asynchronous mode: dense local_weights or a
+        sparse_delta (indices, values), trained from model base_version.
+
+        The update's delta to its base model is weighted by
+        staleness_weight(current version - base_version) and folded into
+        the buffer right away; nothing waits for a round. Updates more
+        than max_staleness versions behind, or whose base model is no
+        longer kept, are rejected as stale (fetch the model and retrain).
+        'ready' in the result says the buffer holds async_buffer_size
+        updates and the model can advance.
+        """
+        self.get_snapshot()
+        try:
+            base_version = int(base_version)
+            num_samples = _sample_count(num_samples)
+            if local_weights is not None and not isinstance(local_weights, np.ndarray):
+                local_weights = np.asarray(local_weights, dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            return {'success': False, 'stale': False, 'message': f'Invalid update data: {e}'}
+        
+        with self._lock:
+            published = self._published
+            staleness = published.version - base_version
+            base_weights = published.weights if staleness == 0 else self._history.get(base_version)
+            if staleness < 0 or staleness > self.max_staleness or base_weights is None:
+                self.stale_updates_rejected += 1
+                return {
+                    'success': False,
+                    'stale': True,
+                    'message': f'Update is against version {base_version}, current version is {published.version} '
+                               f'(at most {self.max_staleness} versions behind are accepted)'
+                }
+            
+            store = self._get_pending_async()
+            try:
+                if sparse_delta is not None:
+                    store.append_sparse(*sparse_delta, num_samples, staleness, self.staleness_exponent)
+                else:
+                    store.append(local_weights.ravel(), base_weights.ravel(), num_samples, staleness,
+                                 self.staleness_exponent)
+            except (TypeError, ValueError) as e:
+                return {'success': False, 'stale': False, 'message': f'Invalid update data: {e}'}
+            
+            self._record_client_metadata(client_id, num_samples, base_version=base_version, staleness=staleness)
+            self._update_received()
+            ready = len(store) >= self.async_buffer_size
+        return {'success': True, 'stale': False, 'staleness': staleness, 'ready': ready, 'message': 'Update received'}
+    
+    def aggregate_updates(self, min_updates=None, persist=None):
         """
         Perform federated averaging (FedAvg) on pending updates
         Weights updates by number of samples from each client
+        
+        The open round is swapped out under the lock and averaged without
+        it, so receive_* keeps filling a fresh round meanwhile. If given,
+        persist(version, weights, updates_aggregated) runs before the new
+        model is published (e.g. to write the GlobalModel row); if it
+        raises, nothing is published and the next call retries the same
+        result instead of closing another round. After a DP round it also
+        gets privacy=: the epsilon spent and the accountant's totals, for
+        restore_privacy() after a restart. min_updates overrides
+        min_updates_for_aggregation (AggregationScheduler's time trigger).
+        
+        With a shared state, the round is claimed from the backend
+        instead; on any failure the claim is given back so the updates
+        stay in the open round.
+        """
+        if self.state is not None:
+            with self._aggregation_lock:
+                result = self._aggregate_shared(
+                    self.min_updates_for_aggregation if min_updates is None else min_updates, persist)
+            return {key: value for key, value in result.items() if key != 'weights'}
+        
+        with self._aggregation_lock:
+            if self._unpublished is None:
+                closed = self._close_round(self.min_updates_for_aggregation if min_updates is None else min_updates)
+                if not closed['success']:
+                    return closed
+                self._unpublished = closed
+            
+            result = self._unpublished
+            if persist is not None:
+                # DP rounds also hand over the privacy spent, so a restart can restore_privacy()
+                extra = {'privacy': self._privacy_record(result)} if 'accountant' in result else {}
+                persist(result['new_version'], result['weights'], result['updates_aggregated'], **extra)
+            self._publish(result)
+        
+        return {key: value for key, value in result.items()
+                if key not in ('weights', 'stores', 'async_store', 'accountant')}
+    
+    def start_secure_round(self, participants, round_id=None, neighbours=None):
+        """Open a secure aggregation round for a fixed set of clients.
+
+        Each participant submits mask_update(...) of its weights (see
+        ml_models/secure_aggregation.py); the orchestrator never sees a
+        client's weights, only the running sum, which unmasks itself once
+        every participant has submitted or been recovered. In-process only:
+        the masked sum is not kept in a shared state backend.
+        
+        Every pair of participants shares a mask, or with neighbours=k
+        only the pairs of a random k-neighbour ring, returned as 'pairs'
+        for the clients to agree seeds on.
+        """
+        if self.state is not None:
+            raise ValueError(f'Secure rounds need the memory state backend, not {self.state.name!r}')
+        participants = list(dict.fromkeys(participants))
+        if len(participants) < 2:
+            raise ValueError('A secure round needs at least 2 participants')
+        if neighbours is not None and (isinstance(neighbours, bool) or not isinstance(neighbours, int)
+                                       or neighbours < 2):
+            raise ValueError('neighbours must be an integer of at least 2')
+        snapshot = self.get_snapshot()
+        with self._lock:
+            if self.secure_round is not None:
+                raise ValueError(f'Secure round {self.secure_round.round_id} is still open')
+            self.secure_round = SecureAggregator(participants, snapshot.weights.size, round_id=round_id,
+                                                 neighbours=neighbours)
+            status = self.secure_round.status()
+        status.update({'model_version': snapshot.version, 'num_params': snapshot.weights.size,
+                       'scale_bits': self.secure_round.scale_bits, 'neighbours': neighbours})
+        if neighbours is not None:
+            status['pairs'] = [list(pair) for pair in self.secure_round.pairs]
+        return status
+    
+    def receive_masked_update(self, client_id, masked):
+        """Fold one participant's masked vector into the secure round's sum"""
+        with self._lock:
+            secure_round = self.secure_round
+            if secure_round is None:
+                return {'success': False, 'message': 'No secure round is open'}
+            try:
+                secure_round.add(client_id, masked)
+            except (TypeError, ValueError, OverflowError) as e:
+                return {'success': False, 'message': f'Invalid masked update: {e}'}
+            return {'success': True, 'message': 'Masked update received', 'missing': len(secure_round.missing())}
+    
+    def recover_secure_dropouts(self, revealed):
+        """Remove the masks of participants that dropped out, from the
+        seeds the survivors revealed: {(survivor, dropped): seed}"""
+        with self._lock:
+            secure_round = self.secure_round
+            if secure_round is None:
+                return {'success': False, 'message': 'No secure round is open'}
+            try:
+                secure_round.recover(revealed)
+            except ValueError as e:
+                return {'success': False, 'message': str(e)}
+            return {'success': True, 'message': f'Recovered {len(secure_round.dropped)} dropped clients',
+                    'missing': len(secure_round.missing())}
+    
+    def aggregate_secure_round(self, persist=None):
+        """Unmask the secure round's sum and publish it as the next version.
+
+        Fails while participants are missing (submit or recover them
+        first). persist runs before publishing, as in aggregate_updates; if
+        it raises, the round stays open and can be aggregated again.
+        """
+        with self._aggregation_lock:
+            with self._lock:
+                secure_round = self.secure_round
+            if secure_round is None:
+                return {'success': False, 'message': 'No secure round is open'}
+            try:
+                weights, total_samples = secure_round.finalize()
+            except ValueError as e:
+                return {'success': False, 'message': str(e)}
+            
+            published = self.get_snapshot()
+            new_version = published.version + 1
+            weights = weights.reshape(published.weights.shape)
+            count = len(secure_round.received)
+            if persist is not None:
+                persist(new_version, weights, count)
+            with self._lock:
+                self._remember(self._published)
+                self._replace_published(new_version, weights)
+                self.secure_round = None
+        
+        total_samples = float(round(total_samples, 6))
+        return {
+            'success': True,
+            'new_version': new_version,
+            'updates_aggregated': count,
+            'updates_dropped': len(secure_round.dropped),
+            'round_id': secure_round.round_id,
+            'total_samples': int(total_samples) if total_samples.is_integer() else total_samples,
+            'message': f'Successfully aggregated {count} masked updates'
+        }
+    
+    def _close_round(self, min_updates):
+        """Detach the open round's stores and average them (FedAvg)"""
+        if self.async_buffer_size is not None:
+            return self._close_async_round(min_updates)
+        rule = self.aggregation_rule
+        min_updates = max(min_updates, minimum_updates(rule, self.byzantine_clients))
+        with self._lock:
+            pending_count = self._pending_count()
+            if pending_count < min_updates:
+                return {
+                    'success': False,
+                    'message': f'Need at least {min_updates} updates, have {pending_count}'
+                }
+            
+            dense_samples = self.pending_weights.total_samples() if self.pending_weights is not None else 0.0
+            delta_samples = self.pending_deltas.total_samples() if self.pending_deltas is not None else 0.0
+            partial_samples = self.pending_partials.total_samples() if self.pending_partials is not None else 0.0
+            total_samples = dense_samples + delta_samples + partial_samples
+            if total_samples.is_integer():
+                total_samples = int(total_samples)
+            
+            if total_samples == 0:
+                return {
+                    'success': False,
+                    'message': 'Total samples is zero'
+                }
+            
+            stores = (self.pending_weights, self.pending_deltas)
+            partials_store = self.pending_partials
+            published = self._published
+            self.pending_weights = None
+            self.pending_deltas = None
+            self.pending_partials = None
+            self.pending_updates = []
+            self.round_started_at = None
+            self._round_closing = True
+        
+        weights_store, deltas_store = stores
+        base_weights = published.weights
+        new_weights = np.zeros(base_weights.size)
+        excluded = 0
+        privacy = None
+        if dense_samples:
+            # Buffered: one (clients,) x (clients, params) product over the
+            # stacked updates; streaming: the running sum divided by the samples
+            if self.dp_clip_norm is not None:
+                dense_weights, privacy = self._privatize(weights_store, base_weights)
+            else:
+                dense_weights, excluded = self._combine_dense(weights_store, rule)
+            new_weights += dense_weights * (dense_samples / total_samples)
+        if delta_samples:
+            # Each delta client holds global + delta: sum n_i * (W + d_i) / N
+            new_weights += (delta_samples * base_weights.ravel() + deltas_store.delta_sum) / total_samples
+        if partial_samples:
+            # Regions already summed n_i * w_i over their clients
+            new_weights += partials_store.weighted_sum / total_samples
+        
+        result = {
+            'success': True,
+            'new_version': published.version + 1,
+            'updates_aggregated': pending_count,
+            'updates_excluded': excluded,
+            'aggregation_rule': rule,
+            'total_samples': total_samples,
+            'message': f'Successfully aggregated {pending_count} updates',
+            'weights': new_weights.reshape(base_weights.shape),
+            'stores': stores
+        }
+        if privacy is not None:
+            # Charged to a copy that _publish adopts once the noised model is
+            # released, so a retried publish is not counted twice
+            accountant = self.privacy_accountant.copy()
+            accountant.step(privacy['noise_multiplier'], privacy['sample_rate'])
+            privacy['epsilon'], _ = accountant.epsilon(self.dp_delta)
+            result['privacy'] = privacy
+            result['accountant'] = accountant
+        return result
+    
+    def _close_async_round(self, min_updates):
+        """Detach the staleness buffer and apply its step to the current model (FedBuff)"""
+        with self._lock:
+            store = self.pending_async
+            pending_count = len(store) if store is not None else 0
+            if pending_count < min_updates:
+                return {
+                    'success': False,
+                    'message': f'Need at least {min_updates} updates, have {pending_count}'
+                }
+            total_samples = store.total_samples()
+            if total_samples == 0:
+                return {
+                    'success': False,
+                    'message': 'Total samples is zero'
+                }
+            
+            published = self._published
+            self.pending_async = None
+            self.pending_updates = []
+            self.round_started_at = None
+            self._round_closing = True
+        
+        new_weights = published.weights.ravel() + self.server_learning_rate * store.server_step()
+        return {
+            'success': True,
+            'new_version': published.version + 1,
+            'updates_aggregated': pending_count,
+            'updates_excluded': 0,
+            'aggregation_rule': self.aggregation_rule,
+            'mean_staleness': store.mean_staleness(),
+            'total_samples': int(total_samples) if total_samples.is_integer() else total_samples,
+            'message': f'Successfully applied {pending_count} asynchronous updates',
+            'weights': new_weights.reshape(published.weights.shape),
+            'stores': (None, None),
+            'async_store': store
+        }
+    
+    def _privatize(self, store, base_weights):
+        """DP-FedAvg over a buffered round: the unweighted mean of the
+        clipped deltas plus Gaussian noise, added to the base model.
+
+        Sample counts are ignored, as in the robust rules: a client's
+        influence has to be bounded by the clip norm alone. Clipping is
+        blocked norms then one matvec, and the noise one draw of the model's
+        size, so the stage costs about one extra pass over the updates.
         """
-        if len(self.pending_updates) < self.min_updates_for_aggregation:
+        count = store.count
+        clip_norm, noise_multiplier = self.dp_clip_norm, self.dp_noise_multiplier
+        delta_sum, clipped = clipped_delta_sum(store.rows[:count], base_weights, clip_norm)
+        delta_sum += gaussian_noise(delta_sum.size, noise_multiplier * clip_norm, self._noise_rng)
+        privacy = {
+            'clip_norm': clip_norm,
+            'noise_multiplier': noise_multiplier,
+            'noise_std': noise_multiplier * clip_norm / count,
+            'sample_rate': self.dp_sample_rate,
+            'updates_clipped': clipped
+        }
+        return base_weights.ravel() + delta_sum / count, privacy
+    
+    def _combine_dense(self, store, rule):
+        """Aggregate a dense update store under rule; returns (weights, updates excluded)"""
+        if rule == 'fedavg':
+            return store.weighted_average(), 0
+        return aggregate(rule, store.rows[:store.count], store.sample_counts[:store.count],
+                         trim_ratio=self.trim_ratio, num_byzantine=self.byzantine_clients,
+                         multi_krum_size=self.multi_krum_size)
+    
+    def _aggregate_shared(self, min_updates, persist):
+        """Claim the shared open round, average it and publish the next version"""
+        state = self.state
+        min_updates = max(min_updates, minimum_updates(self.aggregation_rule, self.byzantine_clients))
+        with state.round_lock():
+            published = self._refresh_published(force=True)
+            claim, pending_count = state.claim_round(min_updates)
+            if claim is None:
+                return {
+                    'success': False,
+                    'message': f'Need at least {min_updates} updates, have {pending_count}'
+                }
+            
+            try:
+                self._round_closing = True
+                result = self._average_claim(claim, published)
+                if not result['success']:
+                    state.restore_claim(claim)
+                    return result
+                if persist is not None and not state.records_models:
+                    persist(result['new_version'], result['weights'], result['updates_aggregated'])
+                state.publish(claim, result['new_version'], result['weights'], result['updates_aggregated'])
+            except RoundConflict as e:
+                # Another process closed an overlapping round; its version wins
+                state.restore_claim(claim)
+                self._refreshed_at = None
+                return {'success': False, 'conflict': True, 'message': str(e)}
+            except BaseException:
+                state.restore_claim(claim)
+                raise
+            finally:
+                self._round_closing = False
+        
+        with self._lock:
+            if result['new_version'] > self._published.version:
+                self._replace_published(result['new_version'], result['weights'])
+        return result
+    
+    def _average_claim(self, claim, published):
+        """FedAvg over a claimed shared round; sparse deltas count against their own base"""
+        size = published.weights.size
+        rule = self.aggregation_rule
+        dense = StreamingAccumulator(size) if rule == 'fedavg' else UpdateBuffer(size)
+        deltas = {}
+        dropped = 0
+        for payload, num_samples, base_version in self.state.iter_claimed(claim):
+            try:
+                if base_version is None:
+                    dense.append(payload, num_samples)
+                else:
+                    if base_version not in deltas:
+                        deltas[base_version] = SparseDeltaAccumulator(size)
+                    deltas[base_version].append(*payload, num_samples)
+            except ValueError:
+                # Submitted for a model of another shape
+                dropped += 1
+        
+        total_samples = dense.total_samples()
+        count = len(dense)
+        if count and count < minimum_updates(rule, self.byzantine_clients):
             return {
                 'success': False,
-                'message': f'Need at least {self.min_updates_for_aggregation} updates, have {len(self.pending_updates)}'
+                'message': f'The {rule} rule needs at least {minimum_updates(rule, self.byzantine_clients)} updates, have {count}'
             }
-        
-        total_samples = sum(update['num_samples'] for update in self.pending_updates)
+        excluded = 0
+        if rule == 'fedavg':
+            numerator = dense.weighted_sum.copy()
+        else:
+            dense_weights, excluded = self._combine_dense(dense, rule) if count else (np.zeros(size), 0)
+            numerator = dense_weights * total_samples
+        for base_version, store in deltas.items():
+            base = published.weights if base_version == published.version else self.state.load_weights(base_version)
+            if base is None or base.size != size:
+                # Base model pruned from the store: the delta cannot be applied
+                dropped += len(store)
+                continue
+            numerator += store.total_samples() * base.ravel() + store.delta_sum
+            total_samples += store.total_samples()
+            count += len(store)
         
         if total_samples == 0:
             return {
                 'success': False,
                 'message': 'Total samples is zero'
             }
-        
-        new_weights = np.zeros_like(self.global_weights)
-        
-        for update in self.pending_updates:
-            weight = update['num_samples'] / total_samples
-            new_weights += weight * np.array(update['weights'])
-        
-        self.global_weights = new_weights
-        self.global_model_version += 1
-        
-        aggregated_count = len(self.pending_updates)
-        self.pending_updates = []
+        if total_samples.is_integer():
+            total_samples = int(total_samples)
         
         return {
             'success': True,
-            'new_version': self.global_model_version,
-            'updates_aggregated': aggregated_count,
+            'new_version': published.version + 1,
+            'updates_aggregated': count,
+            'updates_dropped': dropped,
+            'updates_excluded': excluded,
+            'aggregation_rule': rule,
             'total_samples': total_samples,
-            'message': f'Successfully aggregated {aggregated_count} updates'
+            'message': f'Successfully aggregated {count} updates',
+            'weights': (numerator / total_samples).reshape(published.weights.shape)
         }
     
+    def _publish(self, result):
+        """Swap in the new weights and version together, recycle the round's stores"""
+        with self._lock:
+            self._remember(self._published)
+            self._replace_published(result['new_version'], result['weights'])
+            self._unpublished = None
+            self._round_closing = False
+            if 'accountant' in result:
+                self.privacy_accountant = result['accountant']
+                self.privacy_ledger[result['new_version']] = result['privacy']['epsilon']
+            
+            weights_store, deltas_store = result['stores']
+            if weights_store is not None:
+                weights_store.clear()
+                # Settings changed during the round: the next round starts with a new store
+                self._spare_weights = weights_store if self._matches_settings(weights_store) else None
+            if deltas_store is not None:
+                deltas_store.clear()
+                self._spare_deltas = deltas_store
+            if 'async_store' in result:
+                result['async_store'].clear()
+                self._spare_async = result['async_store']
+    
+    def _remember(self, snapshot):
+        """Keep a version being replaced while async updates may still be based on it"""
+        if self.async_buffer_size is None or snapshot.weights is None:
+            self._history = {}
+            return
+        self._history[snapshot.version] = snapshot.weights
+        for version in [version for version in self._history if version < snapshot.version - self.max_staleness + 1]:
+            del self._history[version]
+    
+    def get_global_weights(self):
+        """Return (version, read-only weights array) without serializing the weights"""
+        snapshot = self.get_snapshot()
+        return snapshot.version, snapshot.weights
+    
     def get_global_model(self):
         """Return current global model for clients"""
-        if self.global_weights is None:
-            self.initialize_global_model()
+        version, weights = self.get_global_weights()
         
         return {
-            'version': self.global_model_version,
-            'weights': self.global_weights.tolist(),
+            'version': version,
+            'weights': weights.tolist(),
             'timestamp': datetime.utcnow().isoformat(),
-            'pending_updates': len(self.pending_updates)
+            'pending_updates': self._pending_count() if self.state is None else self.round_status()['pending_updates']
         }
-    
-    def simulate_local_training(self, client_data, epochs=5, learning_rate=0.01):
+
+    def get_global_model_json(self, snapshot=None):
+        """(version, chunks): get_global_model() serialized as JSON, a list of bytes
+        to send in order (a WSGI response body).
+
+        The weights are serialized once per published snapshot
+        (payload_cache) and returned without copying; only the small
+        fields around them are built per call.
         """
-        Simulate local model training on client device
-        Returns updated local weights
+        snapshot = snapshot or self.get_snapshot()
+        weights_json = self.payload_cache.get(snapshot, ('json',),
+                                              lambda: json.dumps(snapshot.weights.tolist()).encode())
+        fields = json.dumps({
+            'pending_updates': self._pending_count() if self.state is None else self.round_status()['pending_updates'],
+            'timestamp': datetime.utcnow().isoformat(),
+            'version': snapshot.version
+        }, separators=(',', ':'))
+        return snapshot.version, [fields[:-1].encode() + b',"weights":', weights_json, b'}\n']
+
+    def get_global_model_binary(self, serialize, key, snapshot=None):
+        """(version, body): serialize(version, weights), cached per published snapshot and key.
+
+        key must identify the encoding (e.g. its dtype and compression);
+        if serialize raises, nothing is cached.
         """
-        if self.global_weights is None:
-            self.initialize_global_model()
-        
-        local_weights = self.global_weights.copy()
-        
-        num_samples = len(client_data)
-        
-        for epoch in range(epochs):
-            gradient = np.random.randn(*local_weights.shape) * 0.1
-            local_weights = local_weights - learning_rate * gradient
-        
+        snapshot = snapshot or self.get_snapshot()
+        body = self.payload_cache.get(snapshot, ('binary',) + tuple(key),
+                                      lambda: serialize(snapshot.version, snapshot.weights))
+        return snapshot.version, body
+
+    def wait_for_version(self, since_version, timeout):
+        """Block until the published version is not since_version (normally: a newer one
+        was published), or timeout seconds pass; returns the published ModelSnapshot.
+
+        With a shared state backend other processes publish, so the shared
+        model is re-checked every refresh_interval while waiting.
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            snapshot = self.get_snapshot()
+            remaining = deadline - time.monotonic()
+            if snapshot.version != since_version or remaining <= 0:
+                return snapshot
+            with self._published_changed:
+                if self._published is snapshot:
+                    if self.state is not None:
+                        remaining = min(remaining, max(self.refresh_interval, 0.05))
+                    self._published_changed.wait(remaining)
+
+    def simulate_local_training(self, client_data, epochs=100, learning_rate=0.05, **options):
+        """
+        Train the fraud logistic regression on one client's bookings,
+        starting from the published global model, as the client's device
+        would. client_data is (features in FEATURE_NAMES order or
+        feature columns, labels 1 = flagged), e.g. from
+        models.fraud_rescoring.client_training_data; see
+        ml_models/local_training.py for the options. The returned
+        local_weights and num_samples go straight to receive_local_update.
+        """
+        features, labels = client_data
+        return train_logistic_regression(self.get_snapshot().weights, features, labels, epochs=epochs,
+                                         learning_rate=learning_rate, **options)
+    
+    def get_stats(self):
+        """Return orchestrator statistics (lock-free, so counts may trail concurrent submissions)"""
+        if self.state is not None:
+            status = self.state.round_status()
+            pending_count = status['pending_updates']
+            pending_sparse = status['pending_sparse_updates']
+        else:
+            pending_count = self._pending_count()
+            pending_deltas = self.pending_deltas
+            pending_sparse = len(pending_deltas) if pending_deltas is not None else 0
+        pending_partials = self.pending_partials
+        min_updates = max(self.min_updates_for_aggregation,
+                          minimum_updates(self.aggregation_rule, self.byzantine_clients))
         return {
-            'local_weights': local_weights.tolist(),
-            'num_samples': num_samples,
-            'training_loss': np.random.uniform(0.1, 0.5)
+            'global_model_version': self.get_snapshot().version if self.state is not None else self.global_model_version,
+            'state_backend': self.state.name if self.state is not None else 'memory',
+            'pending_updates': pending_count,
+            'pending_sparse_updates': pending_sparse,
+            'pending_regional_updates': len(pending_partials) if pending_partials is not None else 0,
+            'aggregation_mode': self.aggregation_mode,
+            'aggregation_rule': self.aggregation_rule,
+            'accumulation_dtype': self.accumulation_dtype,
+            'min_updates_needed': min_updates,
+            'can_aggregate': pending_count >= min_updates,
+            'aggregating': self._round_closing,
+            'secure_round': self.secure_round.status() if self.secure_round is not None else None,
+            'differential_privacy': self.privacy_stats(),
+            'asynchronous': self.async_stats(),
+            'model_payload_cache': self.payload_cache.get_stats()
         }
     
-    def get_stats(self):
-        """Return orchestrator statistics"""
+    def async_stats(self):
+        """Asynchronous mode settings and buffer state (None in synchronous mode)"""
+        if self.async_buffer_size is None:
+            return None
+        store = self.pending_async
+        return {
+            'buffer_size': self.async_buffer_size,
+            'max_staleness': self.max_staleness,
+            'staleness_exponent': self.staleness_exponent,
+            'server_learning_rate': self.server_learning_rate,
+            'buffered_updates': len(store) if store is not None else 0,
+            'mean_staleness': store.mean_staleness() if store is not None else 0.0,
+            'stale_updates_rejected': self.stale_updates_rejected
+        }
+    
+    def _privacy_record(self, result):
+        """What persist stores for a DP round: its epsilon and the accountant after it"""
+        return dict(result['accountant'].state(), epsilon=result['privacy']['epsilon'], delta=self.dp_delta)
+    
+    def restore_privacy(self, state, ledger):
+        """Resume DP accounting after a restart: state is RDPAccountant.state()
+        of the last DP round, ledger the epsilon after each {version: epsilon}"""
+        accountant = RDPAccountant.from_state(state)
+        with self._lock:
+            self.privacy_accountant = accountant
+            self.privacy_ledger = dict(ledger)
+    
+    def privacy_stats(self):
+        """DP settings and the privacy spent so far (None when DP is off and no DP round was published)"""
+        accountant = self.privacy_accountant
+        if self.dp_clip_norm is None and accountant.steps == 0:
+            return None
+        epsilon, order = accountant.epsilon(self.dp_delta)
+        ledger = self.privacy_ledger
+        recent = sorted(ledger)[-10:]
         return {
-            'global_model_version': self.global_model_version,
-            'pending_updates': len(self.pending_updates),
-            'min_updates_needed': self.min_updates_for_aggregation,
-            'can_aggregate': len(self.pending_updates) >= self.min_updates_for_aggregation
+            'enabled': self.dp_clip_norm is not None,
+            'clip_norm': self.dp_clip_norm,
+            'noise_multiplier': self.dp_noise_multiplier,
+            'sample_rate': self.dp_sample_rate,
+            'delta': self.dp_delta,
+            'rounds': accountant.steps,
+            'epsilon': epsilon,
+            'rdp_order': order,
+            'epsilon_by_version': {version: ledger[version] for version in recent}
         }
 
 federated_orchestrator = FederatedOrchestrator()
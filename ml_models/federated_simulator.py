@@ -0,0 +1,161 @@
+import os
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from ml_models.local_training import train_logistic_regression
+from models.fraud_features import booking_feature_columns
+
+# How simulated clients are trained: 'serial' trains them one after the
+# other through FederatedOrchestrator.simulate_local_training, 'process'
+# splits them into chunks trained in a process pool
+SIMULATION_EXECUTORS = ('serial', 'process')
+
+
+def synthetic_bookings(num_samples, rng):
+    """(feature columns, labels) for num_samples synthetic bookings of one client.
+
+    Features come from booking_feature_columns, as for real bookings;
+    labels follow a fixed logistic rule (price deviation, customer
+    cancellation rate, short notice), so training has something to find.
+    """
+    rates = rng.uniform(30, 90, num_samples)
+    customer_totals = rng.integers(0, 50, num_samples)
+    columns = booking_feature_columns(
+        prices=rates * rng.lognormal(0.3, 0.5, num_samples),
+        hourly_rates=rates,
+        hours_to_booking=rng.exponential(48, num_samples),
+        customer_totals=customer_totals,
+        customer_cancelled=rng.binomial(customer_totals, rng.beta(1, 5, num_samples)),
+        plumber_totals=rng.integers(0, 200, num_samples),
+        plumber_cancelled=rng.integers(0, 20, num_samples)
+    )
+    logits = (-3.0 + 1.5 * columns['price_deviation_from_avg'] + 3.0 * columns['customer_cancellation_rate']
+              - 0.3 * np.log1p(columns['time_to_booking_hours']))
+    labels = (rng.random(num_samples) < 1.0 / (1.0 + np.exp(-logits))).astype(np.float64)
+    return columns, labels
+
+
+def _train_chunk(global_weights, datasets, seeds, epochs, learning_rate):
+    # Process pool entry point: local weights of a chunk of clients, stacked.
+    # Forked workers inherit the parent's tracemalloc, which only measures the parent
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return np.stack([train_logistic_regression(global_weights, columns, labels, epochs=epochs,
+                                               learning_rate=learning_rate, seed=seed)['local_weights']
+                     for (columns, labels), seed in zip(datasets, seeds)])
+
+
+class FederatedSimulation:
+    """
+    Drives rounds of simulated clients through a FederatedOrchestrator.
+
+    Every client owns a fixed set of synthetic bookings (between
+    min_samples and max_samples). Every round trains each client's
+    logistic regression (train_logistic_regression) from the current
+    global model on its bookings, feeds the result through
+    receive_local_update and closes the round with aggregate_updates, so
+    the numbers reflect real local training and the real submission and
+    FedAvg path. Runs are reproducible for a given seed. run() returns
+    one record per round: training, submit and aggregation time and,
+    with track_memory, the pending store size and the round's peak
+    traced allocation (numpy registers its buffers with tracemalloc).
+    """
+
+    def __init__(self, orchestrator, num_clients, executor='serial', workers=None, chunk_size=256,
+                 epochs=20, learning_rate=0.05, min_samples=10, max_samples=500, seed=0, track_memory=True):
+        if executor not in SIMULATION_EXECUTORS:
+            raise ValueError(f'Unknown executor {executor!r}, expected one of {SIMULATION_EXECUTORS}')
+        self.orchestrator = orchestrator
+        self.num_clients = int(num_clients)
+        self.executor = executor
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, int(chunk_size))
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.track_memory = track_memory
+
+        rng = np.random.default_rng(seed)
+        self.sample_counts = rng.integers(min_samples, max_samples + 1, self.num_clients)
+        self.datasets = [synthetic_bookings(int(count), rng) for count in self.sample_counts]
+        self.rounds_run = 0
+        self._pool = None
+
+    def _trained_chunks(self, global_weights):
+        """Yield (first client index, local weights) per chunk of clients"""
+        # A fresh training seed per client and round
+        seeds = self.rounds_run * self.num_clients + np.arange(self.num_clients)
+        if self.executor == 'serial':
+            for client in range(self.num_clients):
+                result = self.orchestrator.simulate_local_training(
+                    self.datasets[client], epochs=self.epochs, learning_rate=self.learning_rate,
+                    seed=int(seeds[client]))
+                yield client, np.asarray(result['local_weights'])[None]
+            return
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        starts = range(0, self.num_clients, self.chunk_size)
+        futures = [self._pool.submit(_train_chunk, global_weights, self.datasets[start:start + self.chunk_size],
+                                     seeds[start:start + self.chunk_size].tolist(), self.epochs, self.learning_rate)
+                   for start in starts]
+        for start, future in zip(starts, futures):
+            yield start, future.result()
+
+    def run_round(self):
+        """Train, submit and aggregate one round; returns its record"""
+        orchestrator = self.orchestrator
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+
+        global_weights = np.array(orchestrator.get_snapshot().weights)
+        train_s = submit_s = 0.0
+        started = time.perf_counter()
+        for start, local_weights in self._trained_chunks(global_weights):
+            chunk_started = time.perf_counter()
+            train_s += chunk_started - started
+            for offset, weights in enumerate(local_weights):
+                client = start + offset
+                if not orchestrator.receive_local_update(client, weights, int(self.sample_counts[client])):
+                    raise ValueError(f'Simulated client {client} was rejected')
+            started = time.perf_counter()
+            submit_s += started - chunk_started
+
+        pending_bytes = orchestrator.pending_weights.nbytes() if orchestrator.pending_weights is not None else 0
+        started = time.perf_counter()
+        result = orchestrator.aggregate_updates(min_updates=1)
+        aggregate_s = time.perf_counter() - started
+        if not result['success']:
+            raise RuntimeError(f"Simulated round did not aggregate: {result['message']}")
+        self.rounds_run += 1
+
+        record = {
+            'version': result['new_version'],
+            'clients': result['updates_aggregated'],
+            'train_s': train_s,
+            'submit_s': submit_s,
+            'aggregate_ms': aggregate_s * 1000,
+            'round_s': train_s + submit_s + aggregate_s,
+            'pending_mb': pending_bytes / 1e6
+        }
+        if self.track_memory:
+            record['peak_mb'] = (tracemalloc.get_traced_memory()[1] - traced_before) / 1e6
+        return record
+
+    def run(self, rounds):
+        """Run rounds; returns the per-round records"""
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            return [self.run_round() for _ in range(rounds)]
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -4,6 +4,24 @@ from sklearn.preprocessing import StandardScaler
 import joblib
 import os
 from datetime import datetime
+from ml_models.compiled_forest import CompiledForest
+from ml_models.model_artifacts import write_artifact, publish_version, read_artifact, current_version
+
+# Model input columns in order, with the default used when a booking omits one
+FEATURE_COLUMNS = [
+    ('price', 0),
+    ('customer_total_bookings', 0),
+    ('plumber_total_bookings', 0),
+    ('customer_cancellation_rate', 0),
+    ('plumber_cancellation_rate', 0),
+    ('time_to_booking_hours', 24),
+    ('price_deviation_from_avg', 0)
+]
+FEATURE_NAMES = [name for name, _ in FEATURE_COLUMNS]
+
+# 'sklearn' scores with IsolationForest.score_samples; 'compiled' walks the
+# flattened tree arrays of a CompiledForest with pure numpy
+INFERENCE_ENGINES = ('sklearn', 'compiled')
 
 class FraudDetector:
     def __init__(self):
@@ -14,6 +32,10 @@ class FraudDetector:
         )
         self.scaler = StandardScaler()
         self.is_trained = False
+        self.inference_engine = 'sklearn'
+        self.compiled_forest = None
+        # Artifact version loaded with load_artifact (None for in-process or pickled models)
+        self.model_version = None
         
         # Initialize with demo metrics
         self.accuracy = 0.87
@@ -49,6 +71,34 @@ class FraudDetector:
         
         return np.array(features).reshape(1, -1)
     
+    def extract_features_batch(self, bookings):
+        """Build an (n, 7) float feature matrix for many bookings.
+
+        Accepts a list of booking dicts, a columnar dict mapping feature
+        names to equal-length sequences, or an (n, 7) array already in
+        FEATURE_COLUMNS order. Missing values become NaN.
+        """
+        if isinstance(bookings, dict):
+            n = len(next(iter(bookings.values()))) if bookings else 0
+            return np.column_stack([
+                np.asarray(bookings[name], dtype=float) if name in bookings else np.full(n, default, dtype=float)
+                for name, default in FEATURE_COLUMNS
+            ]).reshape(n, len(FEATURE_COLUMNS))
+        if isinstance(bookings, np.ndarray):
+            return np.asarray(bookings, dtype=float).reshape(-1, len(FEATURE_COLUMNS))
+        return np.array(
+            [[booking.get(name, default) for name, default in FEATURE_COLUMNS] for booking in bookings],
+            dtype=float
+        ).reshape(len(bookings), len(FEATURE_COLUMNS))
+    
+    def _booking_rows(self, bookings, features):
+        """Per-row dicts used for descriptions, preserving the caller's values"""
+        if isinstance(bookings, dict):
+            return [{name: column[i] for name, column in bookings.items()} for i in range(len(features))]
+        if isinstance(bookings, np.ndarray):
+            return [dict(zip(FEATURE_NAMES, row.tolist())) for row in features]
+        return bookings
+    
     def detect_anomaly(self, booking_data):
         """Detect if booking shows fraudulent patterns"""
         features = self.extract_features(booking_data)
@@ -60,28 +110,102 @@ class FraudDetector:
             return self._rule_based_detection(booking_data)
         
         try:
-            features_scaled = self.scaler.transform(features)
-            prediction = self.isolation_forest.predict(features_scaled)
-            anomaly_score = self.isolation_forest.score_samples(features_scaled)[0]
+            scores, offset, model_version = self._score_samples(features)
+            anomaly_score = scores[0]
             
             risk_score = max(0, min(100, (1 - anomaly_score) * 100))
             
-            is_fraud = prediction[0] == -1
+            # Same rule as IsolationForest.predict(), without a second traversal
+            is_fraud = bool(anomaly_score - offset < 0)
             fraud_type = self._determine_fraud_type(booking_data, risk_score)
             
             return {
                 'is_fraud': is_fraud,
-                'risk_score': round(risk_score, 2),
+                'risk_score': round(float(risk_score), 2),
                 'fraud_type': fraud_type,
-                'description': self._get_fraud_description(fraud_type, booking_data)
+                'description': self._get_fraud_description(fraud_type, booking_data),
+                'model_version': model_version
             }
         except Exception as e:
-            return {
-                'is_fraud': False,
-                'risk_score': 0.0,
-                'fraud_type': 'error',
-                'description': f'Error in detection: {str(e)}'
-            }
+            return self._error_result(str(e))
+    
+    def detect_anomalies_batch(self, bookings):
+        """Score many bookings in one vectorized pass.
+
+        Returns one result dict per booking, in input order, identical to
+        what detect_anomaly returns for that booking on its own. The
+        IsolationForest is traversed once: the inlier/outlier prediction is
+        derived from score_samples instead of a second predict() call.
+        """
+        features = self.extract_features_batch(bookings)
+        rows = self._booking_rows(bookings, features)
+        
+        # If the ML model is not trained yet, fall back to a
+        # lightweight, rule-based detector so core fraud types
+        # (including price manipulation) still work.
+        if not self.is_trained:
+            return self._rule_based_detection_batch(features, rows)
+        
+        results = [None] * len(features)
+        valid = np.isfinite(features).all(axis=1)
+        for i in np.flatnonzero(~valid):
+            results[i] = self._error_result('Input contains NaN or infinity')
+        
+        try:
+            if valid.any():
+                scores, offset, model_version = self._score_samples(features[valid])
+                risk_scores = np.clip((1 - scores) * 100, 0, 100)
+                # IsolationForest.predict() flags rows whose decision_function is negative
+                is_fraud = (scores - offset) < 0
+                fraud_types = self._determine_fraud_types(features[valid], risk_scores)
+                
+                for i, flag, risk_score, fraud_type in zip(
+                        np.flatnonzero(valid).tolist(), is_fraud.tolist(), risk_scores.tolist(), fraud_types):
+                    results[i] = {
+                        'is_fraud': flag,
+                        'risk_score': round(risk_score, 2),
+                        'fraud_type': fraud_type,
+                        'description': self._get_fraud_description(fraud_type, rows[i]),
+                        'model_version': model_version
+                    }
+        except Exception as e:
+            return [self._error_result(str(e)) for _ in range(len(features))]
+        
+        return results
+    
+    def set_inference_engine(self, engine):
+        """Select how trained-model scores are computed (see INFERENCE_ENGINES)"""
+        if engine not in INFERENCE_ENGINES:
+            raise ValueError(f'Unknown inference engine {engine!r}, expected one of {INFERENCE_ENGINES}')
+        if engine == 'sklearn' and self.model_version is not None:
+            raise ValueError('Models loaded from an artifact can only use the compiled engine')
+        self.inference_engine = engine
+        if engine == 'compiled' and self.is_trained and self.compiled_forest is None:
+            self.compile()
+    
+    def compile(self):
+        """Flatten the trained IsolationForest into a CompiledForest"""
+        self.compiled_forest = CompiledForest.from_isolation_forest(self.isolation_forest, scaler=self.scaler)
+        return self.compiled_forest
+    
+    def _score_samples(self, features):
+        """IsolationForest anomaly scores for finite feature rows, plus the
+        decision offset and artifact version of the model that produced them"""
+        # Read the compiled model once so a concurrent load_artifact swap
+        # cannot mix scores of one version with the offset of another
+        compiled = self.compiled_forest
+        if self.inference_engine == 'compiled' and compiled is not None:
+            return compiled.score_features(features), compiled.offset, compiled.version
+        features_scaled = self.scaler.transform(features)
+        return self.isolation_forest.score_samples(features_scaled), self.isolation_forest.offset_, None
+    
+    def _error_result(self, message):
+        return {
+            'is_fraud': False,
+            'risk_score': 0.0,
+            'fraud_type': 'error',
+            'description': f'Error in detection: {message}'
+        }
     
     def _rule_based_detection(self, booking_data):
         """Simple heuristic-based detection used when model isn't trained.
@@ -131,6 +255,49 @@ class FraudDetector:
             'description': self._get_fraud_description(fraud_type, booking_data)
         }
     
+    def _rule_based_detection_batch(self, features, rows):
+        """Vectorized _rule_based_detection over an (n, 7) feature matrix"""
+        def column(name, default):
+            # Mirrors booking_data.get(name, default) or default
+            values = features[:, FEATURE_NAMES.index(name)]
+            return np.where(np.isnan(values) | (values == 0), default, values)
+        
+        price_dev = column('price_deviation_from_avg', 0)
+        customer_cancel_rate = column('customer_cancellation_rate', 0)
+        plumber_cancel_rate = column('plumber_cancellation_rate', 0)
+        time_to_booking = column('time_to_booking_hours', 24)
+        
+        conditions = [
+            price_dev >= 3,
+            price_dev >= 2,
+            customer_cancel_rate > 0.5,
+            time_to_booking < 1,
+            plumber_cancel_rate > 0.5
+        ]
+        fraud_types = np.select(conditions, [
+            'price_manipulation', 'price_manipulation', 'fake_booking', 'rush_booking_scam', 'suspicious_pattern'
+        ], default='none')
+        risk_scores = np.select(conditions, [80.0, 55.0, 65.0, 60.0, 50.0], default=10.0)
+        is_fraud = (fraud_types != 'none') & (risk_scores >= 30)
+        
+        return [{
+            'is_fraud': flag,
+            'risk_score': round(risk_score, 2),
+            'fraud_type': fraud_type,
+            'description': self._get_fraud_description(fraud_type, row)
+        } for flag, risk_score, fraud_type, row in zip(
+            is_fraud.tolist(), risk_scores.tolist(), fraud_types.tolist(), rows)]
+    
+    def _determine_fraud_types(self, features, risk_scores):
+        """Vectorized _determine_fraud_type over an (n, 7) feature matrix"""
+        fraud_types = np.select([
+            risk_scores < 30,
+            features[:, FEATURE_NAMES.index('price_deviation_from_avg')] > 2,
+            features[:, FEATURE_NAMES.index('customer_cancellation_rate')] > 0.5,
+            features[:, FEATURE_NAMES.index('time_to_booking_hours')] < 1
+        ], ['none', 'price_manipulation', 'fake_booking', 'rush_booking_scam'], default='suspicious_pattern')
+        return fraud_types.tolist()
+    
     def _determine_fraud_type(self, booking_data, risk_score):
         """Determine the type of fraud based on features"""
         if risk_score < 30:
@@ -165,6 +332,8 @@ class FraudDetector:
         features_scaled = self.scaler.fit_transform(training_data)
         self.isolation_forest.fit(features_scaled)
         self.is_trained = True
+        self.compiled_forest = self.compile() if self.inference_engine == 'compiled' else None
+        self.model_version = None
         
         # Calculate evaluation metrics if labels provided
         if true_labels is not None and len(true_labels) == len(training_data):
@@ -197,6 +366,18 @@ class FraudDetector:
         
         return True
     
+    def _metric_values(self):
+        return {
+            'accuracy': float(self.accuracy),
+            'precision': float(self.precision),
+            'recall': float(self.recall),
+            'f1_score': float(self.f1_score),
+            'true_positives': int(self.true_positives),
+            'false_positives': int(self.false_positives),
+            'true_negatives': int(self.true_negatives),
+            'false_negatives': int(self.false_negatives)
+        }
+    
     def get_metrics(self):
         """Get model performance metrics"""
         if not self.is_trained:
@@ -231,7 +412,60 @@ class FraudDetector:
             self.isolation_forest = model_data['isolation_forest']
             self.scaler = model_data['scaler']
             self.is_trained = model_data['is_trained']
+            self.compiled_forest = self.compile() if self.inference_engine == 'compiled' else None
+            self.model_version = None
             return True
         return False
+    
+    def save_artifact(self, root='ml_models/artifacts', publish=True):
+        """Write the trained model as a new versioned artifact under root.
+
+        Stores the scaler and flattened trees as raw .npy arrays (see
+        ml_models/model_artifacts.py) and, with publish set, atomically
+        makes it the CURRENT version. Returns the version, or None if the
+        model is not trained.
+        """
+        if not self.is_trained:
+            return None
+        compiled = self.compiled_forest or CompiledForest.from_isolation_forest(self.isolation_forest,
+                                                                                scaler=self.scaler)
+        arrays, forest_metadata = compiled.to_arrays()
+        version = write_artifact(root, arrays, {
+            'model': 'isolation_forest',
+            'feature_names': FEATURE_NAMES,
+            'forest': forest_metadata,
+            'metrics': self._metric_values()
+        })
+        if publish:
+            publish_version(root, version)
+        return version
+    
+    def load_artifact(self, root='ml_models/artifacts', version=None):
+        """Memory-map a published artifact (CURRENT by default) and serve from it.
+
+        The arrays stay on disk and are paged in on demand, so loading is
+        near-instant and gunicorn workers share one copy via the page
+        cache. The new model replaces the old one with a single reference
+        swap, so calls already scoring finish on the previous version.
+        Returns False if nothing has been published.
+        """
+        if version is None:
+            version = current_version(root)
+            if version is None:
+                return False
+        header, arrays = read_artifact(root, version)
+        metadata = header['metadata']
+        if metadata.get('feature_names') != FEATURE_NAMES:
+            raise ValueError(f'Model version {version} was trained on different features')
+        
+        compiled = CompiledForest.from_arrays(arrays, metadata['forest'], version=header['version'])
+        for name, value in metadata.get('metrics', {}).items():
+            setattr(self, name, value)
+        # Artifacts carry no sklearn estimator, so they always run compiled
+        self.compiled_forest = compiled
+        self.inference_engine = 'compiled'
+        self.is_trained = True
+        self.model_version = header['version']
+        return True
 
 fraud_detector = FraudDetector()
@@ -0,0 +1,119 @@
+import numpy as np
+from ml_models.fraud_detector import FEATURE_NAMES
+
+# Federated fraud model: logistic regression over the seven booking fraud
+# features, as the first len(FEATURE_NAMES) global weights plus a bias.
+# Any further global weights are carried through training unchanged.
+FRAUD_MODEL_PARAMS = len(FEATURE_NAMES) + 1
+
+# Heavy-tailed, non-negative features compressed with log1p so one
+# learning rate suits every column; the rates and the capped price
+# deviation are already O(1)
+_LOG_COLUMNS = [FEATURE_NAMES.index(name) for name in
+                ('price', 'customer_total_bookings', 'plumber_total_bookings', 'time_to_booking_hours')]
+
+
+def transform_features(features):
+    """(samples, 7) feature matrix in FEATURE_NAMES order -> model inputs.
+
+    A fixed transform rather than per-client standardization, so every
+    client's weights mean the same thing when they are averaged. Also
+    accepts a columnar dict (booking_feature_columns).
+    """
+    if isinstance(features, dict):
+        features = np.column_stack([np.asarray(features[name], dtype=np.float64) for name in FEATURE_NAMES])
+    features = np.array(features, dtype=np.float64, ndmin=2)
+    if features.shape[1] != len(FEATURE_NAMES):
+        raise ValueError(f'Expected {len(FEATURE_NAMES)} features per sample, got {features.shape[1]}')
+    features = np.nan_to_num(features, nan=0.0, posinf=0.0, neginf=0.0)
+    features[:, _LOG_COLUMNS] = np.log1p(np.maximum(features[:, _LOG_COLUMNS], 0.0))
+    return features
+
+
+def _loss(coef, bias, inputs, labels, l2):
+    """Mean binary cross-entropy (numerically stable form) plus the L2 penalty"""
+    logits = inputs @ coef + bias
+    return float(np.mean(np.logaddexp(0.0, logits) - labels * logits) + 0.5 * l2 * coef @ coef)
+
+
+def train_logistic_regression(global_weights, features, labels, epochs=100, batch_size=32, learning_rate=0.05,
+                              l2=1e-4, validation_fraction=0.2, patience=5, min_delta=1e-4, seed=0):
+    """Mini-batch SGD on one client's bookings, starting from the global model.
+
+    Each step is one vectorized gradient over a (batch_size, 7) block.
+    The same seed, weights and data always give the same result: the
+    generator seeded with `seed` drives the validation split and the
+    per-epoch shuffles. Training stops early once the validation loss
+    (training loss when the client has too few samples to hold any out)
+    has not improved by min_delta for `patience` epochs, and the best
+    epoch's weights are returned.
+
+    Returns local_weights (an array the size of global_weights, for
+    receive_local_update), num_samples and training_loss, plus
+    validation_loss, epochs_run and stopped_early.
+    """
+    global_weights = np.asarray(global_weights, dtype=np.float64)
+    if global_weights.size < FRAUD_MODEL_PARAMS:
+        raise ValueError(f'The global model has {global_weights.size} weights, the fraud model needs '
+                         f'{FRAUD_MODEL_PARAMS}')
+    inputs = transform_features(features)
+    labels = np.asarray(labels, dtype=np.float64).ravel()
+    if len(labels) != len(inputs):
+        raise ValueError(f'{len(inputs)} samples but {len(labels)} labels')
+    if len(inputs) == 0:
+        raise ValueError('No training samples')
+
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(inputs))
+    num_validation = int(len(inputs) * validation_fraction) if len(inputs) >= 10 else 0
+    validation, train = order[:num_validation], order[num_validation:]
+    train_inputs, train_labels = inputs[train], labels[train]
+    check_inputs, check_labels = (inputs[validation], labels[validation]) if num_validation else (train_inputs,
+                                                                                                  train_labels)
+
+    flat = global_weights.ravel()
+    coef = flat[:len(FEATURE_NAMES)].copy()
+    bias = float(flat[len(FEATURE_NAMES)])
+    best = (_loss(coef, bias, check_inputs, check_labels, l2), coef.copy(), bias)
+    epochs_run = 0
+    stale_epochs = 0
+    batch_size = max(1, min(int(batch_size), len(train_inputs)))
+
+    for epoch in range(epochs):
+        shuffled = rng.permutation(len(train_inputs))
+        for start in range(0, len(shuffled), batch_size):
+            batch = shuffled[start:start + batch_size]
+            x = train_inputs[batch]
+            # d(loss)/d(logit) = sigmoid(logit) - label; the stable sigmoid via tanh
+            error = 0.5 * (1.0 + np.tanh(0.5 * (x @ coef + bias))) - train_labels[batch]
+            coef -= learning_rate * (x.T @ error / len(batch) + l2 * coef)
+            bias -= learning_rate * float(error.mean())
+        epochs_run = epoch + 1
+
+        loss = _loss(coef, bias, check_inputs, check_labels, l2)
+        if loss < best[0] - min_delta:
+            best = (loss, coef.copy(), bias)
+            stale_epochs = 0
+        else:
+            stale_epochs += 1
+            if stale_epochs >= patience:
+                break
+
+    local_weights = flat.copy()
+    local_weights[:len(FEATURE_NAMES)] = best[1]
+    local_weights[len(FEATURE_NAMES)] = best[2]
+    return {
+        'local_weights': local_weights.reshape(global_weights.shape),
+        'num_samples': len(inputs),
+        'training_loss': _loss(best[1], best[2], train_inputs, train_labels, l2),
+        'validation_loss': best[0] if num_validation else None,
+        'epochs_run': epochs_run,
+        'stopped_early': epochs_run < epochs
+    }
+
+
+def predict_fraud_probability(weights, features):
+    """Fraud probability per sample under the federated logistic model"""
+    flat = np.asarray(weights, dtype=np.float64).ravel()
+    logits = transform_features(features) @ flat[:len(FEATURE_NAMES)] + flat[len(FEATURE_NAMES)]
+    return 0.5 * (1.0 + np.tanh(0.5 * logits))
@@ -0,0 +1,126 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from ml_models.fraud_detector import fraud_detector
+
+class MicroBatcher:
+    """
+    Coalesces concurrent fraud checks into batched model calls.
+
+    Request threads enqueue their booking features and wait on a future;
+    a single worker thread drains the queue every max_wait_ms (or as soon
+    as max_batch_size rows are waiting), scores them with one
+    detect_anomalies_batch call and completes each future. When disabled,
+    saturated or unhealthy it falls back to a synchronous detect_anomaly.
+    """
+
+    def __init__(self, detector, enabled=False, max_batch_size=64, max_wait_ms=2.0,
+                 max_queue_size=10000, result_timeout=1.0):
+        self.detector = detector
+        self.enabled = enabled
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queue_size = max_queue_size
+        self.result_timeout = result_timeout
+
+        self._queue = None
+        self._worker = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+
+        self.batches_scored = 0
+        self.rows_scored = 0
+        self.sync_fallbacks = 0
+
+    def configure(self, enabled=None, max_batch_size=None, max_wait_ms=None, result_timeout=None):
+        """Update settings; takes effect for the next batch"""
+        if enabled is not None:
+            self.enabled = enabled
+        if max_batch_size is not None:
+            self.max_batch_size = max(1, int(max_batch_size))
+        if max_wait_ms is not None:
+            self.max_wait_ms = max(0.0, float(max_wait_ms))
+        if result_timeout is not None:
+            self.result_timeout = float(result_timeout)
+
+    def detect_anomaly(self, booking_data):
+        """Drop-in replacement for detector.detect_anomaly"""
+        if not self.enabled:
+            return self.detector.detect_anomaly(booking_data)
+
+        future = Future()
+        try:
+            self._ensure_worker().put_nowait((booking_data, future))
+        except queue.Full:
+            return self._fallback(booking_data)
+
+        try:
+            return future.result(timeout=self.result_timeout)
+        except Exception:
+            # Worker stalled or the batch failed; never fail the booking over it
+            future.cancel()
+            return self._fallback(booking_data)
+
+    def _fallback(self, booking_data):
+        self.sync_fallbacks += 1
+        return self.detector.detect_anomaly(booking_data)
+
+    def _ensure_worker(self):
+        """Start the worker lazily, and again in each forked gunicorn worker"""
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return self._queue
+        with self._lock:
+            if self._worker is None or self._worker_pid != pid or not self._worker.is_alive():
+                self._queue = queue.Queue(maxsize=self.max_queue_size)
+                self._worker = threading.Thread(target=self._run, args=(self._queue,),
+                                                name='fraud-micro-batcher', daemon=True)
+                self._worker_pid = pid
+                self._worker.start()
+        return self._queue
+
+    def _collect_batch(self, pending):
+        """Block for the first request, then gather more until full or max_wait_ms elapses"""
+        batch = [pending.get()]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, pending):
+        while True:
+            batch = self._collect_batch(pending)
+            # Skip requests whose caller already gave up and fell back
+            batch = [(data, future) for data, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.detector.detect_anomalies_batch([data for data, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            self.batches_scored += 1
+            self.rows_scored += len(batch)
+
+    def get_stats(self):
+        """Return batching statistics"""
+        return {
+            'enabled': self.enabled,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'batches_scored': self.batches_scored,
+            'rows_scored': self.rows_scored,
+            'avg_batch_size': round(self.rows_scored / self.batches_scored, 2) if self.batches_scored else 0.0,
+            'sync_fallbacks': self.sync_fallbacks
+        }
+
+fraud_micro_batcher = MicroBatcher(fraud_detector)
@@ -0,0 +1,164 @@
+import json
+import os
+import shutil
+from datetime import datetime
+import numpy as np
+
+# On-disk layout of a model directory:
+#
+#   <root>/CURRENT             name of the active version directory
+#   <root>/v000003/header.json format, version, metadata and array manifest
+#   <root>/v000003/<name>.npy  one raw .npy file per array
+#
+# Version directories are immutable once published. A new version is
+# written under a temporary name and renamed into place, then CURRENT is
+# replaced atomically, so readers only ever see complete artifacts.
+ARTIFACT_FORMAT = 'serve-at-ease-fraud-model'
+FORMAT_VERSION = 1
+HEADER_FILE = 'header.json'
+CURRENT_FILE = 'CURRENT'
+
+
+def version_dir_name(version):
+    return f'v{version:06d}'
+
+
+def list_versions(root):
+    """Published version numbers under root, oldest first"""
+    if not os.path.isdir(root):
+        return []
+    versions = []
+    for name in os.listdir(root):
+        if name.startswith('v') and name[1:].isdigit() and os.path.isdir(os.path.join(root, name)):
+            versions.append(int(name[1:]))
+    return sorted(versions)
+
+
+def current_version(root):
+    """Version CURRENT points at, or None if nothing has been published"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return int(name[1:]) if name.startswith('v') and name[1:].isdigit() else None
+
+
+def _fsync_dir(path):
+    # Directory fsync makes the rename durable; not supported on Windows
+    if hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def write_artifact(root, arrays, metadata):
+    """Write arrays plus metadata as the next version under root.
+
+    Every array is saved as a plain .npy file (no pickle) next to a JSON
+    header recording its dtype and shape. The directory only appears
+    under its final name once complete. Returns the new version number;
+    call publish_version to make it current.
+    """
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = os.path.join(root, f'.tmp-{os.getpid()}-{datetime.utcnow():%Y%m%d%H%M%S%f}')
+    os.makedirs(tmp_dir)
+    try:
+        manifest = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            filename = f'{name}.npy'
+            with open(os.path.join(tmp_dir, filename), 'wb') as f:
+                np.save(f, array, allow_pickle=False)
+                f.flush()
+                os.fsync(f.fileno())
+            manifest[name] = {'file': filename, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+        # Another publisher may claim a version number first; take the next one
+        version = (list_versions(root) or [0])[-1] + 1
+        while True:
+            header = {
+                'format': ARTIFACT_FORMAT,
+                'format_version': FORMAT_VERSION,
+                'version': version,
+                'created_at': datetime.utcnow().isoformat(),
+                'metadata': metadata,
+                'arrays': manifest
+            }
+            with open(os.path.join(tmp_dir, HEADER_FILE), 'w') as f:
+                json.dump(header, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                os.rename(tmp_dir, os.path.join(root, version_dir_name(version)))
+                break
+            except OSError:
+                if not os.path.exists(os.path.join(root, version_dir_name(version))):
+                    raise
+                version += 1
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _fsync_dir(root)
+    return version
+
+
+def publish_version(root, version):
+    """Point CURRENT at an already written version, atomically"""
+    if not os.path.isdir(os.path.join(root, version_dir_name(version))):
+        raise ValueError(f'Model version {version} does not exist under {root}')
+    tmp_path = os.path.join(root, f'{CURRENT_FILE}.tmp-{os.getpid()}')
+    with open(tmp_path, 'w') as f:
+        f.write(version_dir_name(version) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+    _fsync_dir(root)
+
+
+def read_artifact(root, version=None, mmap=True):
+    """Open a version (CURRENT by default) and return (header, arrays).
+
+    With mmap set, arrays are read-only np.memmap views of the .npy files:
+    opening is near-instant and every process mapping the same version
+    shares its pages through the OS page cache.
+    """
+    if version is None:
+        version = current_version(root)
+        if version is None:
+            raise FileNotFoundError(f'No published model under {root}')
+
+    version_dir = os.path.join(root, version_dir_name(version))
+    with open(os.path.join(version_dir, HEADER_FILE)) as f:
+        header = json.load(f)
+    if header.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f'{version_dir} is not a fraud model artifact')
+    if header.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact format version {header.get('format_version')}")
+
+    arrays = {}
+    for name, entry in header['arrays'].items():
+        array = np.load(os.path.join(version_dir, entry['file']), mmap_mode='r' if mmap else None,
+                        allow_pickle=False)
+        if array.dtype.str != entry['dtype'] or list(array.shape) != entry['shape']:
+            raise ValueError(f"Array {name!r} in {version_dir} does not match its header")
+        arrays[name] = array
+    return header, arrays
+
+
+def prune_versions(root, keep=3):
+    """Delete all but the newest keep versions, never removing CURRENT.
+
+    Processes that still map a removed version keep reading it safely;
+    the files are only freed once the last mapping is closed.
+    """
+    active = current_version(root)
+    removed = []
+    for version in list_versions(root)[:-keep or None]:
+        if version != active:
+            shutil.rmtree(os.path.join(root, version_dir_name(version)))
+            removed.append(version)
+    return removed
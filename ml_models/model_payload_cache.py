@@ -0,0 +1,77 @@
+import threading
+
+
+class _Entry:
+    __slots__ = ('ready', 'payload')
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.payload = None
+
+
+class ModelPayloadCache:
+    """
+    Serialized forms of the published global model (JSON weights, binary
+    bodies per dtype/compression), each built once per ModelSnapshot.
+
+    Entries belong to one snapshot: a get() for another snapshot (a new
+    version was published, or the model was restored) drops them, so
+    nothing has to be invalidated by hand. Concurrent misses for the same
+    key wait for the first one's build instead of serializing the model
+    again, which matters right after a publish when every polling client
+    misses at once. Failed builds (e.g. an unknown dtype) are not cached.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, snapshot, key, build):
+        """The payload of snapshot for key, calling build() on a miss"""
+        with self._lock:
+            if snapshot is not self._snapshot:
+                self._snapshot = snapshot
+                self._entries = {}
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry()
+                self.misses += 1
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+
+        if not owner:
+            entry.ready.wait()
+            if entry.payload is not None:
+                return entry.payload
+            return build()
+
+        try:
+            entry.payload = build()
+        except BaseException:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            raise
+        finally:
+            entry.ready.set()
+        return entry.payload
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+            self._entries = {}
+
+    def get_stats(self):
+        entries = self._entries
+        return {
+            'version': self._snapshot.version if self._snapshot is not None else None,
+            'entries': len(entries),
+            'bytes': sum(len(entry.payload) for entry in list(entries.values()) if entry.payload is not None),
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from ml_models.fraud_detector import fraud_detector
+from ml_models.model_artifacts import current_version, CURRENT_FILE
+
+class ModelRegistry:
+    """
+    Keeps a detector serving the CURRENT published model artifact.
+
+    A background thread polls the model directory's CURRENT pointer every
+    poll_interval seconds. When it names a new version, the artifact is
+    memory-mapped and swapped into the detector off the request path
+    (see FraudDetector.load_artifact); requests already scoring finish on
+    the previous version. Every gunicorn worker runs its own watcher, so
+    all workers converge on a newly published version within one poll
+    interval, without a restart.
+    """
+
+    def __init__(self, detector, model_dir='ml_models/artifacts', poll_interval=5.0, enabled=False):
+        self.detector = detector
+        self.model_dir = model_dir
+        self.poll_interval = poll_interval
+        self.enabled = enabled
+
+        self._watcher = None
+        self._watcher_pid = None
+        self._watcher_lock = threading.Lock()
+        # Separate lock so starting the watcher never waits on a reload
+        self._reload_lock = threading.Lock()
+        self._failed_version = None
+
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error = None
+        self.last_checked_at = None
+        self.last_reload_at = None
+        self.last_publish_lag_ms = None
+        # Most recent load durations, for the latency figures in get_stats
+        self.reload_latencies_ms = deque(maxlen=100)
+
+    def configure(self, model_dir=None, poll_interval=None, enabled=None):
+        """Update settings; the watcher picks them up on its next poll"""
+        if model_dir is not None:
+            self.model_dir = model_dir
+        if poll_interval is not None:
+            self.poll_interval = max(0.1, float(poll_interval))
+        if enabled is not None:
+            self.enabled = enabled
+
+    def check_for_update(self):
+        """Load the CURRENT version if it differs from the one being served.
+
+        Returns True when a new version was swapped in. A version that
+        failed to load is not retried until CURRENT changes again.
+        """
+        with self._reload_lock:
+            self.last_checked_at = datetime.utcnow()
+            version = current_version(self.model_dir)
+            if version is None or version == self.detector.model_version or version == self._failed_version:
+                return False
+
+            started = time.perf_counter()
+            try:
+                self.detector.load_artifact(self.model_dir, version)
+            except Exception as e:
+                self.failed_reloads += 1
+                self._failed_version = version
+                self.last_error = f'version {version}: {e}'
+                print(f"ERROR: Could not load fraud model version {version}: {e}")
+                return False
+
+            self.reload_latencies_ms.append((time.perf_counter() - started) * 1000)
+            self.reloads += 1
+            self._failed_version = None
+            self.last_reload_at = datetime.utcnow()
+            # Time from the publish step to this process serving the version
+            try:
+                published_at = os.path.getmtime(os.path.join(self.model_dir, CURRENT_FILE))
+                self.last_publish_lag_ms = max(0.0, (time.time() - published_at) * 1000)
+            except OSError:
+                self.last_publish_lag_ms = None
+            return True
+
+    def ensure_watching(self):
+        """Start the watcher lazily, and again in each forked gunicorn worker"""
+        pid = os.getpid()
+        if not self.enabled or (self._watcher is not None and self._watcher_pid == pid and self._watcher.is_alive()):
+            return
+        with self._watcher_lock:
+            if self._watcher is None or self._watcher_pid != pid or not self._watcher.is_alive():
+                self._watcher = threading.Thread(target=self._run, name='fraud-model-watcher', daemon=True)
+                self._watcher_pid = pid
+                self._watcher.start()
+
+    def _run(self):
+        while self.enabled:
+            time.sleep(self.poll_interval)
+            try:
+                self.check_for_update()
+            except Exception as e:
+                # Never let a bad poll (e.g. unreadable directory) kill the watcher
+                self.last_error = str(e)
+
+    def get_stats(self):
+        """Return the active version and reload statistics"""
+        latencies = list(self.reload_latencies_ms)
+        return {
+            'enabled': self.enabled,
+            'model_dir': self.model_dir,
+            'poll_interval': self.poll_interval,
+            'active_version': self.detector.model_version,
+            'published_version': current_version(self.model_dir),
+            'inference_engine': self.detector.inference_engine,
+            'reloads': self.reloads,
+            'failed_reloads': self.failed_reloads,
+            'last_error': self.last_error,
+            'last_checked_at': self.last_checked_at.isoformat() if self.last_checked_at else None,
+            'last_reload_at': self.last_reload_at.isoformat() if self.last_reload_at else None,
+            'last_reload_ms': round(latencies[-1], 3) if latencies else None,
+            'avg_reload_ms': round(sum(latencies) / len(latencies), 3) if latencies else None,
+            'max_reload_ms': round(max(latencies), 3) if latencies else None,
+            'last_publish_lag_ms': round(self.last_publish_lag_ms, 1) if self.last_publish_lag_ms is not None else None
+        }
+
+fraud_model_registry = ModelRegistry(fraud_detector)
@@ -0,0 +1,339 @@
+import itertools
+import os
+import shutil
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from ml_models.model_artifacts import current_version, version_dir_name, CURRENT_FILE
+from models.database import LocalModelUpdate, GlobalModel
+from models.weight_storage import (pack_weights, pack_sparse_delta, unpack_weights, unpack_sparse_delta,
+                                   is_sparse_blob)
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the memory and sql backends
+    fcntl = None
+
+# Where FederatedOrchestrator keeps the open round and the published model:
+# 'memory' is process-local (the orchestrator's own stores); 'file' and
+# 'sql' are shared, so every worker process (and, for 'sql' or a shared
+# filesystem, every node) contributes to the same round
+STATE_BACKENDS = ('memory', 'file', 'sql')
+
+
+class RoundConflict(RuntimeError):
+    """Another process published the version or closed the round first"""
+
+
+def create_state(backend, state_dir=None, engine=None):
+    """Shared state object for a backend name (None for 'memory')"""
+    if backend == 'memory':
+        return None
+    if backend == 'file':
+        return FileOrchestratorState(state_dir)
+    if backend == 'sql':
+        return SQLOrchestratorState(engine)
+    raise ValueError(f'Unknown federated state backend {backend!r}, expected one of {STATE_BACKENDS}')
+
+
+class FileOrchestratorState:
+    """
+    Round state in a directory shared by every worker process on a host
+    (or every node, on a shared filesystem).
+
+    Each accepted update is its own file in pending/ (.npy for dense
+    weights, .npz for a sparse delta), written to tmp/ and renamed in,
+    with the sample count and base version in its name so counting the
+    round never opens a file. Closing a round takes an exclusive lock
+    file and renames pending/ to a claim directory: an update renamed in
+    before that belongs to the round, anything later lands in the fresh
+    pending/. Published models are models/vNNNNNN.npy plus a CURRENT
+    pointer replaced atomically, as for the fraud model artifacts.
+    Files in pending/ whose name cannot be read back are moved to
+    rejected/ rather than stalling every round.
+    """
+
+    name = 'file'
+    shared = True
+    records_updates = False
+    records_models = False
+
+    def __init__(self, root, keep_versions=10):
+        if fcntl is None:
+            raise RuntimeError('The file state backend needs POSIX file locks (fcntl)')
+        self.root = root
+        self.keep_versions = keep_versions
+        self.pending_dir = os.path.join(root, 'pending')
+        self.models_dir = os.path.join(root, 'models')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        self.rejected_dir = os.path.join(root, 'rejected')
+        for path in (self.pending_dir, self.models_dir, self.tmp_dir, self.rejected_dir):
+            os.makedirs(path, exist_ok=True)
+        self._sequence = itertools.count()
+
+    def _add(self, name, write):
+        tmp_path = os.path.join(self.tmp_dir, name)
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        while True:
+            try:
+                os.replace(tmp_path, os.path.join(self.pending_dir, name))
+                return
+            except FileNotFoundError:
+                # pending/ is being swapped out by a round close; recreate it
+                os.makedirs(self.pending_dir, exist_ok=True)
+
+    def _name(self, num_samples):
+        # Positional (shortest round-trip digits), so the count never puts a sign or exponent in the name
+        num_samples = float(num_samples)
+        if not 0 < num_samples < float('inf'):
+            raise ValueError(f'Sample count must be positive, got {num_samples}')
+        samples = np.format_float_positional(num_samples, trim='-')
+        return f'{time.time_ns():020d}-{os.getpid()}-{next(self._sequence)}-{samples}'
+
+    @staticmethod
+    def _parse(name):
+        """(arrival ns, samples, base version or None) from a pending file name, or None if malformed"""
+        stem, ext = os.path.splitext(name)
+        parts = stem.split('-')
+        try:
+            if len(parts) != (5 if ext == '.npz' else 4) or ext not in ('.npy', '.npz'):
+                return None
+            base_version = int(parts[4][1:]) if ext == '.npz' else None
+            samples = float(parts[3])
+            samples = int(samples) if samples.is_integer() else samples
+            if not samples > 0:
+                return None
+            return int(parts[0]), samples, base_version
+        except (ValueError, OverflowError):
+            return None
+
+    def add_update(self, client_id, weights, num_samples, version):
+        self._add(self._name(num_samples) + '.npy',
+                  lambda f: np.save(f, np.asarray(weights, dtype=np.float64), allow_pickle=False))
+
+    def add_sparse(self, client_id, indices, values, num_samples, base_version):
+        self._add(f'{self._name(num_samples)}-b{base_version}.npz',
+                  lambda f: np.savez(f, indices=np.asarray(indices, dtype=np.int64), values=values))
+
+    def _pending_names(self, path=None):
+        """Sorted update file names in path (default pending/); unparseable ones are moved to rejected/"""
+        path = path or self.pending_dir
+        try:
+            names = sorted(name for name in os.listdir(path) if not name.startswith('.'))
+        except FileNotFoundError:
+            return []
+        valid = []
+        for name in names:
+            if self._parse(name) is not None:
+                valid.append(name)
+                continue
+            try:
+                os.replace(os.path.join(path, name), os.path.join(self.rejected_dir, name))
+            except FileNotFoundError:
+                pass  # another process moved it first
+        return valid
+
+    def round_status(self):
+        parsed = [self._parse(name) for name in self._pending_names()]
+        return {
+            'pending_updates': len(parsed),
+            'pending_sparse_updates': sum(1 for _, _, base in parsed if base is not None),
+            'pending_samples': sum(samples for _, samples, _ in parsed),
+            'round_age_seconds': (time.time_ns() - parsed[0][0]) / 1e9 if parsed else 0.0
+        }
+
+    @contextmanager
+    def round_lock(self):
+        """Exclusive across processes and threads (one open file per holder)"""
+        with open(os.path.join(self.root, 'round.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def claim_round(self, min_updates):
+        """Atomically take the open round; returns (claim or None, pending count).
+
+        Must hold round_lock. Claims left behind by a process that died
+        mid-aggregation are returned to pending/ first.
+        """
+        for name in os.listdir(self.root):
+            if name.startswith('claim-'):
+                self.restore_claim(os.path.join(self.root, name))
+
+        pending_count = len(self._pending_names())
+        if pending_count < min_updates:
+            return None, pending_count
+        claim = os.path.join(self.root, f'claim-{time.time_ns()}')
+        os.rename(self.pending_dir, claim)
+        os.makedirs(self.pending_dir, exist_ok=True)
+        return claim, len(self._pending_names(claim))
+
+    def iter_claimed(self, claim):
+        """Yield (weights or (indices, values), num_samples, base version or None)"""
+        for name in self._pending_names(claim):
+            _, num_samples, base_version = self._parse(name)
+            path = os.path.join(claim, name)
+            if base_version is None:
+                yield np.load(path, allow_pickle=False), num_samples, None
+            else:
+                with np.load(path, allow_pickle=False) as archive:
+                    yield (archive['indices'], archive['values']), num_samples, base_version
+
+    def restore_claim(self, claim):
+        """Put a claimed round's updates back into pending/"""
+        os.makedirs(self.pending_dir, exist_ok=True)
+        for name in self._pending_names(claim):
+            os.replace(os.path.join(claim, name), os.path.join(self.pending_dir, name))
+        shutil.rmtree(claim, ignore_errors=True)
+
+    def published_version(self):
+        return current_version(self.root)
+
+    def load_weights(self, version):
+        try:
+            return np.load(os.path.join(self.models_dir, version_dir_name(version) + '.npy'), allow_pickle=False)
+        except FileNotFoundError:
+            return None
+
+    def publish(self, claim, version, weights, updates_aggregated):
+        """Write version, point CURRENT at it and drop the claimed updates (under round_lock)"""
+        if self.published_version() is not None and version <= self.published_version():
+            raise RoundConflict(f'Version {version} is already published')
+        model_path = os.path.join(self.models_dir, version_dir_name(version) + '.npy')
+        tmp_path = os.path.join(self.tmp_dir, f'{version_dir_name(version)}-{os.getpid()}.npy')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(weights, dtype=np.float64), allow_pickle=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, model_path)
+
+        tmp_path = os.path.join(self.tmp_dir, f'{CURRENT_FILE}-{os.getpid()}')
+        with open(tmp_path, 'w') as f:
+            f.write(version_dir_name(version) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+
+        if claim is not None:
+            shutil.rmtree(claim, ignore_errors=True)
+        # Readers that already loaded an older version keep their copy
+        for name in sorted(os.listdir(self.models_dir))[:-self.keep_versions]:
+            os.remove(os.path.join(self.models_dir, name))
+
+
+class SQLOrchestratorState:
+    """
+    Round state in the application database.
+
+    The open round is every local_model_updates row with aggregated =
+    false (add_update writes the row, so the submit route does not; rows
+    of the memory backend are NULL, see detach_memory_updates), and
+    the published model is the GlobalModel row with the highest version.
+    Publishing marks the round's rows aggregated and inserts the next
+    GlobalModel row in one transaction; the UPDATE only matches rows
+    still unaggregated and the version column is unique, so when two
+    processes close overlapping rounds, exactly one commits and the
+    other rolls back with RoundConflict.
+    """
+
+    name = 'sql'
+    shared = True
+    records_updates = True
+    records_models = True
+
+    # Rows fetched (and ids marked) per statement while closing a round
+    batch_size = 256
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.updates = LocalModelUpdate.__table__
+        self.models = GlobalModel.__table__
+
+    def _insert_update(self, client_id, version, payload, num_samples):
+        with self.engine.begin() as conn:
+            conn.execute(self.updates.insert().values(
+                user_id=client_id, model_version=version, update_data=payload,
+                data_samples_count=int(num_samples), submitted_at=datetime.utcnow(), aggregated=False))
+
+    def add_update(self, client_id, weights, num_samples, version):
+        self._insert_update(client_id, version, pack_weights(weights), num_samples)
+
+    def add_sparse(self, client_id, indices, values, num_samples, base_version):
+        self._insert_update(client_id, base_version, pack_sparse_delta(indices, values), num_samples)
+
+    def round_status(self):
+        updates = self.updates
+        with self.engine.connect() as conn:
+            count, samples, first_at = conn.execute(
+                select(func.count(updates.c.id), func.coalesce(func.sum(updates.c.data_samples_count), 0),
+                       func.min(updates.c.submitted_at)).where(updates.c.aggregated == False)).one()
+        return {
+            'pending_updates': count,
+            # Telling sparse rows apart needs their payloads
+            'pending_sparse_updates': None,
+            'pending_samples': samples,
+            'round_age_seconds': (datetime.utcnow() - first_at).total_seconds() if first_at else 0.0
+        }
+
+    def round_lock(self):
+        # Closing is arbitrated by the publish transaction instead
+        return nullcontext()
+
+    def claim_round(self, min_updates):
+        with self.engine.connect() as conn:
+            ids = conn.execute(select(self.updates.c.id).where(self.updates.c.aggregated == False)
+                               .order_by(self.updates.c.id)).scalars().all()
+        if len(ids) < min_updates:
+            return None, len(ids)
+        return ids, len(ids)
+
+    def iter_claimed(self, claim):
+        updates = self.updates
+        for start in range(0, len(claim), self.batch_size):
+            with self.engine.connect() as conn:
+                rows = conn.execute(select(updates.c.update_data, updates.c.data_samples_count,
+                                           updates.c.model_version)
+                                    .where(updates.c.id.in_(claim[start:start + self.batch_size]))).all()
+            for payload, num_samples, version in rows:
+                if is_sparse_blob(payload):
+                    yield unpack_sparse_delta(payload), num_samples, version
+                else:
+                    yield unpack_weights(payload), num_samples, None
+
+    def restore_claim(self, claim):
+        # Nothing was changed until the publish transaction commits
+        pass
+
+    def published_version(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(self.models.c.version))).scalar()
+
+    def load_weights(self, version):
+        with self.engine.connect() as conn:
+            payload = conn.execute(select(self.models.c.model_data)
+                                   .where(self.models.c.version == version)).scalar()
+        return unpack_weights(payload) if payload is not None else None
+
+    def publish(self, claim, version, weights, updates_aggregated):
+        updates = self.updates
+        try:
+            with self.engine.begin() as conn:
+                for start in range(0, len(claim or ()), self.batch_size):
+                    batch = claim[start:start + self.batch_size]
+                    marked = conn.execute(updates.update()
+                                          .where(updates.c.id.in_(batch), updates.c.aggregated == False)
+                                          .values(aggregated=True)).rowcount
+                    if marked != len(batch):
+                        raise RoundConflict('Another worker aggregated part of this round first')
+                conn.execute(self.models.insert().values(
+                    version=version, model_data=pack_weights(weights), updates_aggregated=updates_aggregated,
+                    created_at=datetime.utcnow(), is_active=True))
+        except (IntegrityError, OperationalError) as e:
+            # Duplicate version, or (SQLite) a write that lost the race
+            raise RoundConflict(f'Could not publish version {version}: {e}') from e
@@ -0,0 +1,185 @@
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import numpy as np
+from ml_models.federated_orchestrator import _sample_count
+from ml_models.update_buffer import StreamingAccumulator
+from ml_models.weight_codec import WEIGHTS_MIMETYPE, encode_weights
+
+# Root endpoint regional aggregators forward their partial sums to
+REGIONAL_SUBMIT_PATH = '/api/federated/regional/submit'
+
+
+class PartialRejected(RuntimeError):
+    """The root refused the partial for good (a 4xx answer); sending it again would not help"""
+
+
+class RegionalAggregator:
+    """
+    Edge tier of hierarchical FedAvg: pre-aggregates one region's client
+    updates into a partial sum and forwards only that to the root.
+
+    Each update is folded into a StreamingAccumulator on arrival, so the
+    region holds one model's worth of memory. flush() hands the root
+    (sum(n_i * w_i), sum(n_i), number of updates); the root merges the
+    partials of all regions into the exact FedAvg of every client
+    (FederatedOrchestrator.receive_partial_aggregate). forward(partial)
+    does the sending. Every partial carries an id the root de-duplicates
+    on: if forward raises, the root may still have merged it (e.g. the
+    response timed out), so the same partial is resent unchanged, under
+    the same id, before any newer updates. A PartialRejected partial is
+    dropped and counted instead, since the root would refuse it again.
+    """
+
+    def __init__(self, region, forward=None, flush_updates=50, flush_seconds=30.0):
+        self.region = region
+        self.forward = forward
+        self.flush_updates = max(1, int(flush_updates))
+        self.flush_seconds = flush_seconds
+        self.pending = None
+        self.opened_at = None
+        # Partial whose forward failed, resent as is by the next flush
+        self.unsent = None
+        self.failed_at = None
+        self._lock = threading.Lock()
+        # One flush at a time, so retried partials keep their order
+        self._flush_lock = threading.Lock()
+
+        self.updates_received = 0
+        self.partials_forwarded = 0
+        self.updates_forwarded = 0
+        self.failed_flushes = 0
+        self.partials_rejected = 0
+        self.updates_rejected = 0
+        self.last_error = None
+
+    def receive_local_update(self, client_id, local_weights, num_samples):
+        """Fold one client's weights into the region's partial sum.
+
+        Returns False if they are not finite numbers, num_samples is not a
+        positive finite number, or they are not the size of the updates
+        already pending (the first update of a partial sets it).
+        """
+        try:
+            if not isinstance(local_weights, np.ndarray):
+                local_weights = np.asarray(local_weights, dtype=np.float64)
+            num_samples = _sample_count(num_samples)
+        except (TypeError, ValueError):
+            return False
+        if local_weights.size == 0 or not np.isfinite(local_weights).all():
+            return False
+        with self._lock:
+            if self.pending is None:
+                self.pending = StreamingAccumulator(local_weights.size)
+                self.opened_at = time.monotonic()
+            try:
+                self.pending.append(local_weights.ravel(), num_samples)
+            except (TypeError, ValueError):
+                return False
+            self.updates_received += 1
+        return True
+
+    def due(self):
+        """True once flush_updates updates are pending or the oldest has waited
+        flush_seconds. After a failed flush, only once flush_seconds have
+        passed since, whatever is pending: the next flush resends that partial"""
+        if self.unsent is not None:
+            return time.monotonic() - self.failed_at >= self.flush_seconds
+        pending, opened_at = self.pending, self.opened_at
+        if pending is None or len(pending) == 0:
+            return False
+        return len(pending) >= self.flush_updates or time.monotonic() - opened_at >= self.flush_seconds
+
+    def take_partial(self):
+        """Detach the open partial: {'id', 'region', 'weighted_sum', 'samples', 'updates'}, or None"""
+        with self._lock:
+            pending = self.pending
+            self.pending = None
+            self.opened_at = None
+        if pending is None or len(pending) == 0:
+            return None
+        return {'id': uuid.uuid4().hex, 'region': self.region, 'weighted_sum': pending.weighted_sum,
+                'samples': pending.total_samples(), 'updates': len(pending)}
+
+    def flush(self):
+        """Forward one partial: the one a failed flush left, else the open one.
+        Returns forward's result, or None if nothing was pending"""
+        with self._flush_lock:
+            partial = self.unsent or self.take_partial()
+            if partial is None:
+                return None
+            try:
+                result = self.forward(partial)
+            except PartialRejected as e:
+                self.unsent = None
+                self.partials_rejected += 1
+                self.updates_rejected += partial['updates']
+                self.last_error = str(e)
+                raise
+            except Exception as e:
+                self.unsent = partial
+                self.failed_at = time.monotonic()
+                self.failed_flushes += 1
+                self.last_error = str(e)
+                raise
+            self.unsent = None
+            self.partials_forwarded += 1
+            self.updates_forwarded += partial['updates']
+            return result
+
+    def get_stats(self):
+        pending, unsent = self.pending, self.unsent
+        return {
+            'region': self.region,
+            'pending_updates': len(pending) if pending is not None else 0,
+            'pending_samples': pending.total_samples() if pending is not None else 0.0,
+            'unsent_updates': unsent['updates'] if unsent is not None else 0,
+            'updates_received': self.updates_received,
+            'partials_forwarded': self.partials_forwarded,
+            'updates_forwarded': self.updates_forwarded,
+            'failed_flushes': self.failed_flushes,
+            'partials_rejected': self.partials_rejected,
+            'updates_rejected': self.updates_rejected,
+            'last_error': self.last_error,
+            'flush_updates': self.flush_updates,
+            'flush_seconds': self.flush_seconds
+        }
+
+
+def encode_partial(partial):
+    """(body, headers) of a partial sum for the root's regional endpoint (lossless float64)"""
+    body = encode_weights(partial['weighted_sum'], dtype='float64')
+    headers = {
+        'Content-Type': WEIGHTS_MIMETYPE,
+        'X-Partial-Id': partial['id'],
+        'X-Region': partial['region'],
+        'X-Num-Samples': repr(float(partial['samples'])),
+        'X-Num-Updates': str(partial['updates'])
+    }
+    return body, headers
+
+
+def http_forwarder(root_url, token, timeout=30.0):
+    """forward callable POSTing partials to the root, authenticated by the shared region token.
+
+    4xx answers (other than 408 and 429) raise PartialRejected; anything
+    else that fails (5xx, connection errors, timeouts) is worth retrying.
+    """
+    url = root_url.rstrip('/') + REGIONAL_SUBMIT_PATH
+
+    def forward(partial):
+        body, headers = encode_partial(partial)
+        headers['X-Region-Token'] = token
+        request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            message = f'Root rejected the partial from {partial["region"]}: {e.code} {e.read()[:200]!r}'
+            if 400 <= e.code < 500 and e.code not in (408, 429):
+                raise PartialRejected(message) from e
+            raise RuntimeError(message) from e
+
+    return forward
@@ -0,0 +1,140 @@
+import numpy as np
+
+# How FederatedOrchestrator combines a round's dense updates:
+# 'fedavg' is the sample-weighted mean; the others bound what a few
+# poisoned clients can do to the global model:
+# - 'median': coordinate-wise median
+# - 'trimmed_mean': coordinate-wise mean after dropping the trim_ratio
+#   largest and smallest values of every coordinate
+# - 'krum': the single update closest to its n - f - 2 nearest neighbours
+# - 'multi_krum': sample-weighted mean of the m best Krum-scored updates
+AGGREGATION_RULES = ('fedavg', 'median', 'trimmed_mean', 'krum', 'multi_krum')
+
+# Working-set budget for the blocked kernels (column blocks of the
+# coordinate-wise rules, row blocks of the Krum distance matrix)
+BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def _column_blocks(num_rows, num_params, block_bytes):
+    step = max(1, block_bytes // (8 * max(1, num_rows)))
+    for start in range(0, num_params, step):
+        yield slice(start, min(num_params, start + step))
+
+
+def coordinate_median(rows, block_bytes=BLOCK_BYTES):
+    """Median of every column of a (clients, params) matrix.
+
+    Runs over column blocks, so the partitioned float64 copy numpy makes
+    stays within block_bytes whatever the update matrix's size or dtype.
+    """
+    num_rows, num_params = rows.shape
+    result = np.empty(num_params)
+    for block in _column_blocks(num_rows, num_params, block_bytes):
+        result[block] = np.median(rows[:, block].astype(np.float64), axis=0, overwrite_input=True)
+    return result
+
+
+def trim_count(num_rows, trim_ratio):
+    """Values dropped at each end of every coordinate by trimmed_mean"""
+    return min(int(num_rows * trim_ratio), (num_rows - 1) // 2)
+
+
+def trimmed_mean(rows, trim_ratio=0.1, block_bytes=BLOCK_BYTES):
+    """Coordinate-wise mean without the trim_count largest and smallest values.
+
+    One np.partition per column block places the kept values in the
+    middle rows without sorting them.
+    """
+    num_rows, num_params = rows.shape
+    trim = trim_count(num_rows, trim_ratio)
+    if trim == 0:
+        return rows.mean(axis=0, dtype=np.float64)
+    result = np.empty(num_params)
+    for block in _column_blocks(num_rows, num_params, block_bytes):
+        values = rows[:, block].astype(np.float64)
+        values.partition((trim, num_rows - trim - 1), axis=0)
+        result[block] = values[trim:num_rows - trim].mean(axis=0)
+    return result
+
+
+def krum_minimum_updates(num_byzantine):
+    """Krum needs n > 2f + 2 updates to tolerate f Byzantine clients"""
+    return 2 * num_byzantine + 3
+
+
+def krum_scores(rows, num_byzantine, block_bytes=BLOCK_BYTES):
+    """Krum score of every update: the sum of its squared distances to its
+    n - f - 2 nearest other updates.
+
+    Distances come from the Gram identity |a - b|^2 = |a|^2 + |b|^2 - 2 a.b,
+    one block of rows at a time: each block is one (block, params) x
+    (params, clients) product, and only its rows' scores are kept, so the
+    full (clients, clients) distance matrix never exists. float32 update
+    matrices are converted once, since the identity cancels badly in
+    single precision for nearby updates.
+    """
+    num_rows = len(rows)
+    neighbours = num_rows - num_byzantine - 2
+    if neighbours < 1:
+        raise ValueError(f'Krum with {num_byzantine} Byzantine clients needs at least '
+                         f'{krum_minimum_updates(num_byzantine)} updates, got {num_rows}')
+    data = rows if rows.dtype == np.float64 else rows.astype(np.float64)
+    norms = np.einsum('ij,ij->i', data, data)
+    block_rows = max(1, min(num_rows, block_bytes // (8 * num_rows)))
+    scores = np.empty(num_rows)
+    for start in range(0, num_rows, block_rows):
+        stop = min(num_rows, start + block_rows)
+        distances = data[start:stop] @ data.T
+        distances *= -2.0
+        distances += norms[start:stop, None]
+        distances += norms[None, :]
+        np.maximum(distances, 0.0, out=distances)
+        # Exclude each update's distance to itself
+        distances[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        nearest = np.partition(distances, neighbours - 1, axis=1)[:, :neighbours]
+        scores[start:stop] = nearest.sum(axis=1)
+    return scores
+
+
+def krum_select(rows, num_byzantine, num_selected=1, block_bytes=BLOCK_BYTES):
+    """Indices of the num_selected lowest Krum scores (ascending by score)"""
+    scores = krum_scores(rows, num_byzantine, block_bytes)
+    num_selected = max(1, min(int(num_selected), len(rows)))
+    selected = np.argpartition(scores, num_selected - 1)[:num_selected]
+    return selected[np.argsort(scores[selected], kind='stable')]
+
+
+def minimum_updates(rule, num_byzantine=1):
+    """Fewest updates a round needs under an aggregation rule"""
+    if rule in ('krum', 'multi_krum'):
+        return krum_minimum_updates(num_byzantine)
+    return 1
+
+
+def aggregate(rule, rows, sample_counts, trim_ratio=0.1, num_byzantine=1, multi_krum_size=None,
+              block_bytes=BLOCK_BYTES):
+    """Combine a (clients, params) update matrix under an aggregation rule.
+
+    Returns (weights as float64, number of updates Krum left out). The
+    coordinate-wise rules ignore sample counts: weighting by a count the
+    client reports itself would hand the poisoner the lever the rule
+    takes away. Multi-Krum averages the selected updates by samples;
+    multi_krum_size defaults to n - f.
+    """
+    if rule not in AGGREGATION_RULES:
+        raise ValueError(f'Unknown aggregation rule {rule!r}, expected one of {AGGREGATION_RULES}')
+    sample_counts = np.asarray(sample_counts, dtype=np.float64)
+    num_rows = len(rows)
+    if rule == 'fedavg':
+        return (sample_counts @ rows) / sample_counts.sum(), 0
+    if rule == 'median':
+        return coordinate_median(rows, block_bytes), 0
+    if rule == 'trimmed_mean':
+        return trimmed_mean(rows, trim_ratio, block_bytes), 0
+
+    num_selected = 1 if rule == 'krum' else (multi_krum_size or num_rows - num_byzantine)
+    selected = krum_select(rows, num_byzantine, num_selected, block_bytes)
+    # Zero coefficients for the rest instead of copying the selected rows out
+    coefficients = np.zeros(num_rows)
+    coefficients[selected] = sample_counts[selected]
+    return (coefficients @ rows) / coefficients.sum(), num_rows - len(selected)
@@ -0,0 +1,217 @@
+import secrets
+import numpy as np
+
+# Fixed-point fraction bits for masked updates. Values live in the ring of
+# integers mod 2^64 (numpy uint64 arithmetic wraps), so masks cancel
+# exactly; the decoded sum sum(n_i * w_i) must stay below 2^(63 - bits)
+# in magnitude (about 5.5e11 for 24 bits).
+SCALE_BITS = 24
+
+# Columns generated per step, bounding the temporary mask stream buffers
+MASK_CHUNK = 1 << 16
+
+# Largest plausible decoded sample total per client. Masks left in the sum
+# decode to a uniformly random value of up to about 5.5e11, which this
+# bound rejects with overwhelming probability
+MAX_SAMPLES_PER_CLIENT = 10 ** 7
+
+
+def mask_graph(client_ids, neighbours=None, entropy=None):
+    """The pairs of clients that share a mask: every pair, or with
+    neighbours=k each client and k peers on a randomly ordered ring
+    (the SecAgg+ sparse graph), making masking O(k) streams per client
+    instead of O(n). Returns a sorted list of (a, b) tuples.
+    """
+    client_ids = list(client_ids)
+    if neighbours is None or neighbours >= len(client_ids) - 1:
+        return [(a, b) for i, a in enumerate(client_ids) for b in client_ids[i + 1:]]
+    rng = np.random.default_rng(entropy)
+    ring = [client_ids[i] for i in rng.permutation(len(client_ids))]
+    half = max(1, int(neighbours) // 2)
+    pairs = {frozenset((ring[i], ring[(i + offset) % len(ring)]))
+             for i in range(len(ring)) for offset in range(1, half + 1)}
+    return [tuple(sorted(pair)) for pair in sorted(pairs, key=sorted)]
+
+
+def agree_pair_seeds(client_ids, neighbours=None, entropy=None, pairs=None):
+    """Pairwise mask seeds for a round: {client: {peer: 128-bit seed}}.
+
+    Stands in for the pairwise key agreement clients run among themselves
+    (e.g. X25519 + HKDF); the orchestrator never sees these seeds. pairs
+    is the round's mask graph (SecureAggregator.pairs, as announced when
+    the round opened); without it, mask_graph(client_ids, neighbours).
+    """
+    client_ids = list(client_ids)
+    rng = np.random.default_rng(entropy)
+    seeds = {client: {} for client in client_ids}
+    if pairs is None:
+        pairs = mask_graph(client_ids, neighbours, rng)
+    for a, b in pairs:
+        seed = int(rng.integers(0, 2**63)) << 64 | int(rng.integers(0, 2**63))
+        seeds[a][b] = seeds[b][a] = seed
+    return seeds
+
+
+def _mask_stream(seed, size):
+    """Yield (slice, uint64 block) of the Philox stream keyed by seed"""
+    generator = np.random.Philox(key=seed)
+    for start in range(0, size, MASK_CHUNK):
+        stop = min(size, start + MASK_CHUNK)
+        yield slice(start, stop), generator.random_raw(stop - start)
+
+
+def pairwise_mask(client_id, pair_seeds, size):
+    """Sum of client_id's pairwise masks: +stream(s_ij) for each peer j
+    ordered after it, -stream(s_ij) for each peer before it, mod 2^64.
+
+    Philox is counter-based: keyed directly by the pair seed, each
+    stream is a vectorized block computation with no state to share, and
+    both peers (or the orchestrator during dropout recovery) regenerate
+    it identically. Summed over every pair, the masks cancel.
+    """
+    mask = np.zeros(size, dtype=np.uint64)
+    for peer, seed in pair_seeds.items():
+        add = client_id < peer
+        for block, stream in _mask_stream(seed, size):
+            if add:
+                mask[block] += stream
+            else:
+                mask[block] -= stream
+    return mask
+
+
+def encode(values, scale_bits=SCALE_BITS):
+    """Float vector -> fixed-point uint64 (two's complement)"""
+    scaled = np.rint(np.asarray(values, dtype=np.float64) * float(1 << scale_bits))
+    return scaled.astype(np.int64).view(np.uint64)
+
+
+def decode(values, scale_bits=SCALE_BITS):
+    """Fixed-point uint64 -> float vector"""
+    return values.view(np.int64) / float(1 << scale_bits)
+
+
+def mask_update(client_id, weights, num_samples, pair_seeds, scale_bits=SCALE_BITS):
+    """Client side: the masked vector to submit.
+
+    Encodes num_samples * weights followed by num_samples (so the sample
+    total is only revealed in aggregate) and adds the client's pairwise
+    masks. Alone it is uniformly random.
+    """
+    weights = np.asarray(weights, dtype=np.float64).ravel()
+    payload = encode(np.append(weights * num_samples, num_samples), scale_bits)
+    payload += pairwise_mask(client_id, pair_seeds, len(payload))
+    return payload
+
+
+class SecureAggregator:
+    """
+    Server side of one pairwise-masked round.
+
+    Holds only the running uint64 sum of the masked vectors. If every
+    participant submits, the masks cancel and finalize() decodes the
+    FedAvg average. If some drop out, their masks with the survivors do
+    not cancel. Survivors then reveal their seeds with each dropped peer
+    (never with each other), and recover() regenerates and removes
+    exactly those streams. The mask graph (pairs) is fixed when the round
+    opens, so recover() knows which seeds a dropout needs.
+    """
+
+    def __init__(self, participants, num_params, scale_bits=SCALE_BITS, round_id=None, neighbours=None):
+        self.participants = list(participants)
+        self.num_params = int(num_params)
+        self.scale_bits = scale_bits
+        self.round_id = round_id or secrets.token_hex(8)
+        self.neighbours = neighbours
+        self.pairs = mask_graph(self.participants, neighbours)
+        self.peers = {client: set() for client in self.participants}
+        for a, b in self.pairs:
+            self.peers[a].add(b)
+            self.peers[b].add(a)
+        self.masked_sum = np.zeros(self.num_params + 1, dtype=np.uint64)
+        self.received = set()
+        self.dropped = set()
+
+    def add(self, client_id, masked):
+        """Fold one masked vector into the sum; raises ValueError if it cannot belong to the round"""
+        if client_id not in self.participants:
+            raise ValueError(f'Client {client_id} is not a participant of round {self.round_id}')
+        if client_id in self.received:
+            raise ValueError(f'Client {client_id} already submitted to round {self.round_id}')
+        if client_id in self.dropped:
+            raise ValueError(f'Client {client_id} was already recovered as dropped')
+        if not isinstance(masked, np.ndarray):
+            # JSON clients send Python ints below 2^64; converted directly,
+            # since np.asarray would go through float64 for mixed magnitudes
+            masked = np.array(masked, dtype=np.uint64)
+        elif masked.dtype != np.uint64:
+            raise ValueError(f'Masked updates are uint64, got {masked.dtype}')
+        if masked.shape != self.masked_sum.shape:
+            raise ValueError(f'Expected {len(self.masked_sum)} masked values, got {masked.size}')
+        self.masked_sum += masked
+        self.received.add(client_id)
+
+    def missing(self):
+        return [client for client in self.participants if client not in self.received and client not in self.dropped]
+
+    def recover(self, revealed):
+        """Remove dropped clients' masks.
+
+        revealed maps (survivor, dropped client) -> their pair seed, and
+        must hold one for every survivor paired with each dropped client:
+        a mask left in the sum would turn the result into noise. Nothing
+        is changed if a seed is missing, or a dropped client has a peer
+        that has neither submitted nor dropped out yet (its mask with the
+        dropped client would arrive later).
+        """
+        dropped = {pair[1] for pair in revealed}
+        if dropped & self.received:
+            raise ValueError('Seeds can only be revealed for clients that did not submit')
+        if dropped & self.dropped or not dropped <= set(self.peers):
+            raise ValueError('Seeds can only be revealed for participants not yet recovered')
+        for survivor, dropped_client in revealed:
+            if survivor not in self.received:
+                raise ValueError(f'Client {survivor} did not submit, its seeds cannot be used for recovery')
+            if survivor not in self.peers[dropped_client]:
+                raise ValueError(f'Clients {survivor} and {dropped_client} do not share a mask')
+        for dropped_client in dropped:
+            waiting = self.peers[dropped_client] - self.received - self.dropped - dropped
+            if waiting:
+                raise ValueError(f'{len(waiting)} peers of client {dropped_client} have neither submitted '
+                                 f'nor dropped out')
+            unrevealed = [survivor for survivor in self.peers[dropped_client] & self.received
+                          if (survivor, dropped_client) not in revealed]
+            if unrevealed:
+                raise ValueError(f'Missing the seeds of {len(unrevealed)} survivors paired with client '
+                                 f'{dropped_client}')
+        for (survivor, dropped_client), seed in revealed.items():
+            # The survivor's vector holds its mask with the dropped peer; subtract it
+            add = survivor < dropped_client
+            for block, stream in _mask_stream(seed, len(self.masked_sum)):
+                if add:
+                    self.masked_sum[block] -= stream
+                else:
+                    self.masked_sum[block] += stream
+        self.dropped |= dropped
+
+    def finalize(self):
+        """(sample-weighted average weights, total samples) once no client is missing"""
+        missing = self.missing()
+        if missing:
+            raise ValueError(f'{len(missing)} participants have neither submitted nor been recovered')
+        totals = decode(self.masked_sum, self.scale_bits)
+        total_samples = totals[-1]
+        if total_samples <= 0:
+            raise ValueError('Total samples is zero')
+        if total_samples > MAX_SAMPLES_PER_CLIENT * max(1, len(self.received)):
+            raise ValueError(f'Unmasked sample total {total_samples:.3g} is implausible; masks were left in the sum')
+        return totals[:-1] / total_samples, total_samples
+
+    def status(self):
+        return {
+            'round_id': self.round_id,
+            'participants': len(self.participants),
+            'received': len(self.received),
+            'dropped': len(self.dropped),
+            'missing': self.missing()
+        }
@@ -0,0 +1,65 @@
+import numpy as np
+
+def top_k_delta(delta, k):
+    """Indices (ascending) and values of the k largest-magnitude entries"""
+    delta = np.asarray(delta, dtype=np.float64).ravel()
+    k = min(int(k), delta.size)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    indices = np.argpartition(np.abs(delta), delta.size - k)[delta.size - k:]
+    indices.sort()
+    return indices, delta[indices]
+
+def threshold_delta(delta, threshold):
+    """Indices and values of entries whose magnitude is at least threshold"""
+    delta = np.asarray(delta, dtype=np.float64).ravel()
+    indices = np.flatnonzero(np.abs(delta) >= threshold)
+    return indices, delta[indices]
+
+class DeltaCompressor:
+    """
+    Client-side sparsifier for federated updates.
+
+    Turns locally trained weights into a sparse delta against the global
+    model they started from, keeping either the top k entries or those
+    above a threshold. With error_feedback, the part of each client's
+    delta that was not sent is remembered as a residual and added to
+    that client's next delta, so small but persistent changes are
+    eventually transmitted instead of being dropped every round.
+    """
+
+    def __init__(self, k=None, threshold=None, error_feedback=False):
+        if (k is None) == (threshold is None):
+            raise ValueError('Set exactly one of k or threshold')
+        self.k = k
+        self.threshold = threshold
+        self.error_feedback = error_feedback
+        self.residuals = {}
+
+    def compress(self, client_id, local_weights, base_weights):
+        """Return (indices, values) to submit for this client's update"""
+        delta = np.asarray(local_weights, dtype=np.float64).ravel() - np.asarray(base_weights, dtype=np.float64).ravel()
+        if self.error_feedback and client_id in self.residuals:
+            delta += self.residuals[client_id]
+
+        if self.k is not None:
+            indices, values = top_k_delta(delta, self.k)
+        else:
+            indices, values = threshold_delta(delta, self.threshold)
+
+        if self.error_feedback:
+            delta[indices] = 0.0
+            self.residuals[client_id] = delta
+        return indices, values
+
+    def residual_norm(self, client_id):
+        """L2 norm of what this client has not transmitted yet"""
+        residual = self.residuals.get(client_id)
+        return float(np.linalg.norm(residual)) if residual is not None else 0.0
+
+    def reset(self, client_id=None):
+        """Drop residuals for one client, or all of them"""
+        if client_id is None:
+            self.residuals = {}
+        else:
+            self.residuals.pop(client_id, None)
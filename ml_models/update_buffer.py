@@ -0,0 +1,207 @@
+import numpy as np
+
+# Accumulation precisions for FedAvg: float64 matches the original
+# per-client loop; float32 halves buffer memory and uses single-precision BLAS
+ACCUMULATION_DTYPES = ('float64', 'float32')
+
+# 'buffered' stacks every pending update in an UpdateBuffer and averages at
+# aggregation time; 'streaming' folds each one into a StreamingAccumulator
+# as it arrives, so memory stays at one model's worth
+AGGREGATION_MODES = ('buffered', 'streaming')
+
+class UpdateBuffer:
+    """
+    Preallocated, growable (clients x parameters) matrix of pending updates.
+
+    Each incoming update is copied into the next free row (a JSON float
+    list is converted to an array by the caller first, outside the
+    orchestrator's lock, so the locked part is only this row copy), and
+    its sample count into a parallel vector. Capacity doubles when full
+    and is kept across rounds, so steady-state rounds allocate nothing.
+    weighted_average() is then a single BLAS matrix-vector product.
+    """
+
+    def __init__(self, num_params, dtype='float64', initial_capacity=16):
+        if dtype not in ACCUMULATION_DTYPES:
+            raise ValueError(f'Unknown accumulation dtype {dtype!r}, expected one of {ACCUMULATION_DTYPES}')
+        self.num_params = int(num_params)
+        self.dtype = np.dtype(dtype)
+        self.rows = np.empty((max(1, initial_capacity), self.num_params), dtype=self.dtype)
+        self.sample_counts = np.empty(len(self.rows), dtype=np.float64)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self.rows)
+
+    def _grow(self, min_capacity):
+        capacity = max(min_capacity, 2 * self.capacity)
+        rows = np.empty((capacity, self.num_params), dtype=self.dtype)
+        rows[:self.count] = self.rows[:self.count]
+        sample_counts = np.empty(capacity, dtype=np.float64)
+        sample_counts[:self.count] = self.sample_counts[:self.count]
+        self.rows, self.sample_counts = rows, sample_counts
+
+    def append(self, weights, num_samples):
+        """Copy one client's weights into the next row; returns its row index.
+
+        Raises ValueError if the update does not have num_params values.
+        """
+        if len(weights) != self.num_params:
+            raise ValueError(f'Expected {self.num_params} weights, got {len(weights)}')
+        if self.count == self.capacity:
+            self._grow(self.count + 1)
+        row = self.count
+        self.rows[row] = weights
+        self.sample_counts[row] = num_samples
+        self.count += 1
+        return row
+
+    def total_samples(self):
+        return float(self.sample_counts[:self.count].sum())
+
+    def weighted_average(self):
+        """Sample-weighted mean of the stored rows (FedAvg), as float64"""
+        coefficients = (self.sample_counts[:self.count] / self.total_samples()).astype(self.dtype)
+        return (coefficients @ self.rows[:self.count]).astype(np.float64)
+
+    def clear(self):
+        """Forget all rows but keep the allocation for the next round"""
+        self.count = 0
+
+    def nbytes(self):
+        return self.rows.nbytes + self.sample_counts.nbytes
+
+class StreamingAccumulator:
+    """
+    Online FedAvg: a running sample-weighted sum of updates plus the
+    sample total, with the same interface as UpdateBuffer.
+
+    Each update is folded in on arrival, so memory is O(num_params)
+    however many clients report, and weighted_average() is a single
+    division. The sum is always kept in float64: at one model's worth of
+    memory, float32 would save little and lose precision with every
+    client added.
+    """
+
+    def __init__(self, num_params, dtype='float64'):
+        if dtype not in ACCUMULATION_DTYPES:
+            raise ValueError(f'Unknown accumulation dtype {dtype!r}, expected one of {ACCUMULATION_DTYPES}')
+        self.num_params = int(num_params)
+        self.dtype = np.dtype(dtype)
+        self.weighted_sum = np.zeros(self.num_params)
+        # Each update is converted here first, so a bad one never touches the sum
+        self._scratch = np.empty(self.num_params)
+        self.samples = 0.0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, weights, num_samples):
+        """Fold one client's weights into the running sum; returns its index.
+
+        Raises ValueError if the update does not have num_params values.
+        """
+        if len(weights) != self.num_params:
+            raise ValueError(f'Expected {self.num_params} weights, got {len(weights)}')
+        self._scratch[:] = weights
+        num_samples = float(num_samples)
+        self._scratch *= num_samples
+        self.weighted_sum += self._scratch
+        self.samples += num_samples
+        self.count += 1
+        return self.count - 1
+
+    def merge(self, weighted_sum, samples, count):
+        """Add another accumulator's sum(n_i * w_i), sum(n_i) and update count
+        (a regional partial aggregate), so the merged average is exact.
+
+        Raises ValueError if the sum does not have num_params values.
+        """
+        if len(weighted_sum) != self.num_params:
+            raise ValueError(f'Expected {self.num_params} weights, got {len(weighted_sum)}')
+        self._scratch[:] = weighted_sum
+        self.weighted_sum += self._scratch
+        self.samples += float(samples)
+        self.count += int(count)
+
+    def total_samples(self):
+        return self.samples
+
+    def weighted_average(self):
+        """Sample-weighted mean of everything folded in (FedAvg), as float64"""
+        return self.weighted_sum / self.samples
+
+    def clear(self):
+        self.weighted_sum.fill(0.0)
+        self.samples = 0.0
+        self.count = 0
+
+    def nbytes(self):
+        return self.weighted_sum.nbytes + self._scratch.nbytes
+
+def validate_sparse_delta(indices, values, num_params):
+    """Return (indices, float64 values) as arrays, or raise ValueError for
+    non-integer or out-of-range indices or an index/value length mismatch"""
+    indices = np.asarray(indices)
+    values = np.asarray(values, dtype=np.float64)
+    if indices.ndim != 1 or values.shape != indices.shape:
+        raise ValueError('A sparse delta needs one value per index')
+    if indices.size:
+        if not np.issubdtype(indices.dtype, np.integer):
+            raise ValueError('Sparse delta indices must be integers')
+        if indices.min() < 0 or indices.max() >= num_params:
+            raise ValueError(f'Sparse delta indices must be in [0, {num_params})')
+    return indices, values
+
+class SparseDeltaAccumulator:
+    """
+    Sample-weighted sum of sparse deltas against the current global model.
+
+    A delta update means the client's weights are the global model plus
+    values at indices. Each one is scatter-added into a dense float64
+    running sum, so receiving it costs O(changed parameters), not
+    O(model size). At aggregation, the deltas contribute
+    samples * global_weights + delta_sum to the FedAvg numerator.
+    """
+
+    def __init__(self, num_params):
+        self.num_params = int(num_params)
+        self.delta_sum = np.zeros(self.num_params)
+        self.samples = 0.0
+        self.count = 0
+        self.nonzeros = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, indices, values, num_samples):
+        """Scatter-add one client's delta; returns its index.
+
+        Repeated indices add up. Raises ValueError for non-integer or
+        out-of-range indices, or an index/value length mismatch.
+        """
+        indices, values = validate_sparse_delta(indices, values, self.num_params)
+        num_samples = float(num_samples)
+        if indices.size:
+            np.add.at(self.delta_sum, indices, values * num_samples)
+        self.samples += num_samples
+        self.count += 1
+        self.nonzeros += indices.size
+        return self.count - 1
+
+    def total_samples(self):
+        return self.samples
+
+    def clear(self):
+        self.delta_sum.fill(0.0)
+        self.samples = 0.0
+        self.count = 0
+        self.nonzeros = 0
+
+    def nbytes(self):
+        return self.delta_sum.nbytes
@@ -0,0 +1,158 @@
+import struct
+import zlib
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+# Binary weight payload used by /api/federated/submit-update and
+# /api/federated/global-model (Content-Type WEIGHTS_MIMETYPE):
+#
+#   magic       4s   b'SAEW'
+#   format      B    FORMAT_VERSION
+#   dtype       B    index into WIRE_DTYPES
+#   compression B    index into COMPRESSIONS
+#   flags       B    FLAG_SPARSE for a sparse delta, else 0
+#   version     I    global model version the weights belong to (the base
+#                    version for a sparse delta)
+#   count       Q    number of weights (non-zeros for a sparse delta)
+#   scale       f    int8 dequantization scale (1.0 otherwise)
+#
+# followed by the little-endian values, compressed as a whole if requested.
+# A sparse delta carries count uint32 indices first, then count values.
+WEIGHTS_MIMETYPE = 'application/x-sae-weights'
+MAGIC = b'SAEW'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sBBBBIQf')
+FLAG_SPARSE = 1
+
+# 'int8' is symmetric per-tensor quantization: value = q * scale;
+# 'float64' is lossless (regional partial sums, see ml_models/regional_aggregator.py)
+WIRE_DTYPES = ('float32', 'float16', 'int8', 'float64')
+COMPRESSIONS = ('none', 'deflate', 'zstd')
+
+_NUMPY_DTYPES = {'float32': np.dtype('<f4'), 'float16': np.dtype('<f2'), 'int8': np.dtype('i1'),
+                 'float64': np.dtype('<f8')}
+
+
+def available_compressions():
+    """Compressions usable in this process (zstd needs the zstandard package)"""
+    return tuple(name for name in COMPRESSIONS if name != 'zstd' or zstandard is not None)
+
+
+def _quantize(values, dtype):
+    """Cast float64 values to the wire dtype; returns (array, int8 scale)"""
+    if dtype == 'int8':
+        peak = float(np.abs(values).max()) if values.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        return np.clip(np.rint(values / scale), -127, 127).astype(np.int8), scale
+    return values.astype(_NUMPY_DTYPES[dtype]), 1.0
+
+
+def _pack(payload, dtype, compression, flags, version, count, scale, level):
+    if dtype not in WIRE_DTYPES:
+        raise ValueError(f'Unknown weight dtype {dtype!r}, expected one of {WIRE_DTYPES}')
+    if compression not in available_compressions():
+        raise ValueError(f'Compression {compression!r} is not available, expected one of {available_compressions()}')
+    if compression == 'deflate':
+        payload = zlib.compress(payload, 6 if level is None else level)
+    elif compression == 'zstd':
+        payload = zstandard.ZstdCompressor(level=3 if level is None else level).compress(payload)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, WIRE_DTYPES.index(dtype), COMPRESSIONS.index(compression), flags,
+                         int(version), count, scale)
+    return header + payload
+
+
+def encode_weights(weights, dtype='float32', compression='none', version=0, level=None):
+    """Serialize a weight vector to the binary wire format.
+
+    Raises ValueError for an unknown or unavailable dtype/compression.
+    """
+    if dtype not in WIRE_DTYPES:
+        raise ValueError(f'Unknown weight dtype {dtype!r}, expected one of {WIRE_DTYPES}')
+    values, scale = _quantize(np.asarray(weights, dtype=np.float64).ravel(), dtype)
+    return _pack(values.tobytes(), dtype, compression, 0, version, values.size, scale, level)
+
+
+def encode_sparse_delta(indices, values, base_version, dtype='float32', compression='none', level=None):
+    """Serialize a sparse delta (changed indices and their deltas) against base_version"""
+    if dtype not in WIRE_DTYPES:
+        raise ValueError(f'Unknown weight dtype {dtype!r}, expected one of {WIRE_DTYPES}')
+    indices = np.asarray(indices, dtype='<u4').ravel()
+    values, scale = _quantize(np.asarray(values, dtype=np.float64).ravel(), dtype)
+    if len(indices) != len(values):
+        raise ValueError('A sparse delta needs one value per index')
+    return _pack(indices.tobytes() + values.tobytes(), dtype, compression, FLAG_SPARSE, base_version,
+                 values.size, scale, level)
+
+
+def is_sparse_payload(data):
+    """True if data is a binary payload holding a sparse delta"""
+    return len(data) >= HEADER.size and bytes(data[:4]) == MAGIC and data[7] & FLAG_SPARSE != 0
+
+
+def _decode(data):
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise ValueError('Weight payload is shorter than its header')
+    magic, format_version, dtype_index, compression_index, flags, version, count, scale = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError('Not a weight payload')
+    if format_version != FORMAT_VERSION:
+        raise ValueError(f'Unsupported weight payload format {format_version}')
+    if dtype_index >= len(WIRE_DTYPES) or compression_index >= len(COMPRESSIONS):
+        raise ValueError('Unknown weight dtype or compression in header')
+
+    dtype = WIRE_DTYPES[dtype_index]
+    compression = COMPRESSIONS[compression_index]
+    sparse = bool(flags & FLAG_SPARSE)
+    numpy_dtype = _NUMPY_DTYPES[dtype]
+    index_bytes = count * 4 if sparse else 0
+    expected_bytes = index_bytes + count * numpy_dtype.itemsize
+    payload = view[HEADER.size:]
+    if compression == 'zstd' and zstandard is None:
+        raise ValueError('zstd payloads need the zstandard package')
+    try:
+        # Never inflate past what the header promises (decompression bombs)
+        if compression == 'deflate':
+            payload = zlib.decompressobj().decompress(payload, expected_bytes + 1)
+        elif compression == 'zstd':
+            payload = zstandard.ZstdDecompressor().decompress(payload, max_output_size=expected_bytes + 1)
+    except Exception as e:
+        raise ValueError(f'Corrupt {compression} weight payload: {e}') from e
+
+    if len(payload) != expected_bytes:
+        raise ValueError(f'Weight payload holds {len(payload)} bytes, header says {count} {dtype} values')
+    indices = np.frombuffer(payload, dtype='<u4', count=count) if sparse else None
+    values = np.frombuffer(payload, dtype=numpy_dtype, count=count, offset=index_bytes)
+    if dtype == 'int8':
+        values = values.astype(np.float32) * np.float32(scale)
+
+    header = {'dtype': dtype, 'compression': compression, 'sparse': sparse, 'version': version, 'count': count,
+              'scale': scale}
+    return indices, values, header
+
+
+def decode_weights(data):
+    """Parse a dense binary weight payload; returns (weights, header dict).
+
+    Uncompressed float32/float16 payloads are returned as read-only
+    np.frombuffer views over data (float16 as-is; callers that need
+    float64 convert once when storing). Raises ValueError on a malformed
+    or truncated payload.
+    """
+    indices, weights, header = _decode(data)
+    if header['sparse']:
+        raise ValueError('Expected dense weights, got a sparse delta')
+    return weights, header
+
+
+def decode_sparse_delta(data):
+    """Parse a sparse delta payload; returns (indices, values, header dict)
+    with header['version'] the base version the delta applies to"""
+    indices, values, header = _decode(data)
+    if not header['sparse']:
+        raise ValueError('Expected a sparse delta, got dense weights')
+    return indices, values, header
@@ -0,0 +1,146 @@
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from models.database import db, Booking, BookingCounter
+from models.dashboard_stats import count_if
+
+COUNTER_FIELDS = ('total_bookings', 'cancelled_bookings', 'completed_bookings', 'rating_sum', 'rating_count')
+
+# Counter column bumped when a booking enters each status
+STATUS_COUNTER_FIELDS = {
+    'cancelled': 'cancelled_bookings',
+    'completed': 'completed_bookings'
+}
+
+
+def _get_or_create_counter(user_id=None, plumber_id=None):
+    """Fetch the counter row for a customer or plumber, creating it if missing.
+
+    Two first bookings of the same entity can both miss the row; the one
+    whose insert hits the unique constraint rolls back only its savepoint
+    and uses the row the other created. That re-select locks the row:
+    under MySQL's REPEATABLE READ a plain SELECT would still read the
+    snapshot taken before the other insert committed.
+    """
+    query = BookingCounter.query.filter_by(user_id=user_id, plumber_id=plumber_id)
+    counter = query.first()
+    if counter is None:
+        counter = BookingCounter(user_id=user_id, plumber_id=plumber_id)
+        for field in COUNTER_FIELDS:
+            setattr(counter, field, 0)
+        try:
+            with db.session.begin_nested():
+                db.session.add(counter)
+        except IntegrityError:
+            counter = query.with_for_update().one()
+    return counter
+
+
+def _increment(booking, increments):
+    """Apply increments to the booking's customer and plumber counters.
+
+    Uses column = column + n so concurrent transitions never overwrite
+    each other. Changes are left in the session for the caller's commit.
+    """
+    for key in ({'user_id': booking.customer_id}, {'plumber_id': booking.plumber_id}):
+        counter = _get_or_create_counter(**key)
+        for field, amount in increments.items():
+            setattr(counter, field, getattr(BookingCounter, field) + amount)
+
+
+def record_booking_created(booking):
+    """Count a new booking against its customer and plumber"""
+    increments = {'total_bookings': 1}
+    field = STATUS_COUNTER_FIELDS.get(booking.status)
+    if field:
+        increments[field] = 1
+    _increment(booking, increments)
+
+
+def record_status_change(booking, old_status, new_status):
+    """Move a booking between status buckets (accept/reject/complete/cancel)"""
+    increments = {}
+    if STATUS_COUNTER_FIELDS.get(old_status):
+        increments[STATUS_COUNTER_FIELDS[old_status]] = -1
+    if STATUS_COUNTER_FIELDS.get(new_status):
+        field = STATUS_COUNTER_FIELDS[new_status]
+        increments[field] = increments.get(field, 0) + 1
+    increments = {field: amount for field, amount in increments.items() if amount}
+    if increments:
+        _increment(booking, increments)
+
+
+def record_review(booking, rating):
+    """Add a newly submitted rating to the running rating sums"""
+    _increment(booking, {'rating_sum': rating, 'rating_count': 1})
+
+
+def get_booking_counts(customer_id, plumber_id):
+    """Read the customer and plumber counters with one indexed query.
+
+    Returns (customer_counts, plumber_counts) as plain dicts; entities
+    without a counter row yet report zeros.
+    """
+    rows = BookingCounter.query.filter(or_(
+        BookingCounter.user_id == customer_id,
+        BookingCounter.plumber_id == plumber_id
+    )).all()
+
+    customer_counts = dict.fromkeys(COUNTER_FIELDS, 0)
+    plumber_counts = dict.fromkeys(COUNTER_FIELDS, 0)
+    for row in rows:
+        target = customer_counts if row.user_id == customer_id else plumber_counts
+        target.update({field: getattr(row, field) for field in COUNTER_FIELDS})
+    return customer_counts, plumber_counts
+
+
+def _aggregate_from_bookings(key_column):
+    """Recompute counters for every entity from the bookings table"""
+    rows = db.session.query(
+        key_column,
+        func.count(Booking.id),
+        count_if(Booking.status == 'cancelled'),
+        count_if(Booking.status == 'completed'),
+        func.coalesce(func.sum(Booking.rating), 0),
+        func.count(Booking.rating)
+    ).group_by(key_column).all()
+    return {row[0]: dict(zip(COUNTER_FIELDS, row[1:])) for row in rows}
+
+
+def rebuild_booking_counters(dry_run=False):
+    """Reconcile booking_counters against bookings.
+
+    Recomputes every counter with grouped aggregates, rewrites rows that
+    drifted (or only reports them when dry_run is set) and returns a list
+    of mismatches as (key, entity_id, stored, expected) tuples.
+    """
+    mismatches = []
+    for key, column in (('user_id', Booking.customer_id), ('plumber_id', Booking.plumber_id)):
+        expected = _aggregate_from_bookings(column)
+        stored = {getattr(row, key): row for row in BookingCounter.query.filter(
+            getattr(BookingCounter, key).isnot(None)).all()}
+
+        for entity_id in set(expected) | set(stored):
+            want = expected.get(entity_id, dict.fromkeys(COUNTER_FIELDS, 0))
+            row = stored.get(entity_id)
+            have = {field: getattr(row, field) for field in COUNTER_FIELDS} if row else None
+            if have == want:
+                continue
+            mismatches.append((key, entity_id, have, want))
+            if dry_run:
+                continue
+            if row is None:
+                row = BookingCounter(**{key: entity_id})
+                db.session.add(row)
+            for field, value in want.items():
+                setattr(row, field, value)
+
+    if not dry_run:
+        db.session.commit()
+    return mismatches
+
+
+def backfill_booking_counters_if_empty():
+    """Populate booking_counters on first start against an existing database"""
+    if BookingCounter.query.first() is None and Booking.query.first() is not None:
+        print("Booking counters empty - rebuilding from bookings...")
+        rebuild_booking_counters()
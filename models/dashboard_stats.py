@@ -0,0 +1,165 @@
+from sqlalchemy import case, func
+from sqlalchemy.orm import joinedload
+from models.database import db, User, Plumber, Booking, TrustScore, FraudAlert, GlobalModel
+
+BOOKING_STATUSES = ('pending', 'accepted', 'completed', 'cancelled')
+RATING_VALUES = (5, 4, 3, 2, 1)
+
+
+def count_if(condition):
+    """SUM(CASE WHEN condition THEN 1 ELSE 0 END) - a conditional COUNT"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def get_entity_totals():
+    """Return user and plumber totals in a single round trip"""
+    users = db.session.query(func.count(User.id)).scalar_subquery()
+    plumbers = db.session.query(func.count(Plumber.id)).scalar_subquery()
+    total_users, total_plumbers = db.session.query(users, plumbers).one()
+    return {'total_users': total_users, 'total_plumbers': total_plumbers}
+
+
+def get_booking_summary():
+    """Total, per-status and per-rating booking counts in one scan"""
+    columns = [func.count(Booking.id)]
+    columns += [count_if(Booking.status == status) for status in BOOKING_STATUSES]
+    columns += [count_if(Booking.rating == rating) for rating in RATING_VALUES]
+    row = db.session.query(*columns).one()
+
+    status_values = row[1:1 + len(BOOKING_STATUSES)]
+    rating_values = row[1 + len(BOOKING_STATUSES):]
+    return {
+        'total_bookings': row[0],
+        'status_counts': dict(zip(BOOKING_STATUSES, status_values)),
+        'rating_counts': {str(r): c for r, c in zip(RATING_VALUES, rating_values)}
+    }
+
+
+def get_fraud_risk_counts():
+    """Fraud risk distribution for the dashboard chart.
+
+    Bucket edges are inclusive (BETWEEN semantics) exactly as the
+    original per-bucket count() queries, so a score of 50 or 70 is
+    counted in both neighbouring buckets.
+    """
+    risk = FraudAlert.risk_score
+    row = db.session.query(
+        count_if(risk < 30),
+        count_if(risk.between(30, 50)),
+        count_if(risk.between(50, 70)),
+        count_if(risk >= 70)
+    ).one()
+    return dict(zip(('no_risk', 'low', 'medium', 'high'), row))
+
+
+def _booking_aggregate(key_column):
+    """Per-entity booking aggregate subquery grouped by key_column"""
+    return (
+        db.session.query(
+            key_column.label('entity_id'),
+            func.count(Booking.id).label('total'),
+            count_if(Booking.status == 'completed').label('completed'),
+            func.coalesce(func.sum(Booking.rating), 0).label('rating_sum'),
+            func.count(Booking.rating).label('rating_count')
+        )
+        .group_by(key_column)
+        .subquery()
+    )
+
+
+def get_plumber_stats():
+    """Per-plumber booking, rating and trust figures via one grouped join"""
+    agg = _booking_aggregate(Booking.plumber_id)
+    rows = (
+        db.session.query(
+            Plumber,
+            agg.c.total, agg.c.completed, agg.c.rating_sum, agg.c.rating_count,
+            TrustScore.id, TrustScore.overall_score
+        )
+        .options(joinedload(Plumber.user))
+        .outerjoin(agg, agg.c.entity_id == Plumber.id)
+        .outerjoin(TrustScore, TrustScore.plumber_id == Plumber.id)
+        .order_by(Plumber.id)
+        .all()
+    )
+
+    plumber_stats = []
+    for plumber, total, completed, rating_sum, rating_count, trust_id, trust_score in rows:
+        rating_count = rating_count or 0
+        avg_rating = rating_sum / rating_count if rating_count else 0
+        plumber_stats.append({
+            'plumber': plumber,
+            'total_bookings': total or 0,
+            'completed_bookings': completed or 0,
+            'avg_rating': round(avg_rating, 2),
+            'review_count': rating_count,
+            'trust_score': trust_score if trust_id is not None else 50
+        })
+    return plumber_stats
+
+
+def get_customer_stats():
+    """Per-customer booking and trust figures via one grouped join"""
+    agg = _booking_aggregate(Booking.customer_id)
+    rows = (
+        db.session.query(User, agg.c.total, agg.c.completed, TrustScore.id, TrustScore.overall_score)
+        .outerjoin(agg, agg.c.entity_id == User.id)
+        .outerjoin(TrustScore, TrustScore.user_id == User.id)
+        .filter(User.role == 'customer')
+        .order_by(User.id)
+        .all()
+    )
+
+    return [{
+        'customer': customer,
+        'total_bookings': total or 0,
+        'completed_bookings': completed or 0,
+        'trust_score': trust_score if trust_id is not None else 50
+    } for customer, total, completed, trust_id, trust_score in rows]
+
+
+def get_admin_dashboard_stats():
+    """Collect every database-backed figure rendered by admin_dashboard.html.
+
+    Runs a fixed number of queries regardless of how many users,
+    plumbers or bookings exist. Relationships the template walks
+    (customer/plumber names) are eager-loaded to avoid lazy loads
+    per row while rendering.
+    """
+    plumber_with_user = joinedload(Booking.plumber).joinedload(Plumber.user)
+
+    stats = get_entity_totals()
+    summary = get_booking_summary()
+    stats['total_bookings'] = summary['total_bookings']
+    stats['completed_bookings'] = summary['status_counts']['completed']
+    stats['pending_bookings'] = summary['status_counts']['pending']
+    stats['status_counts'] = summary['status_counts']
+    stats['rating_counts'] = summary['rating_counts']
+    stats['fraud_risk_counts'] = get_fraud_risk_counts()
+
+    stats['fraud_alerts'] = (
+        FraudAlert.query
+        .options(joinedload(FraudAlert.user), joinedload(FraudAlert.plumber).joinedload(Plumber.user))
+        .filter_by(status='pending')
+        .order_by(FraudAlert.flagged_at.desc())
+        .all()
+    )
+    stats['recent_bookings'] = (
+        Booking.query
+        .options(joinedload(Booking.customer), plumber_with_user)
+        .order_by(Booking.created_at.desc())
+        .limit(10)
+        .all()
+    )
+    stats['all_reviews'] = (
+        Booking.query
+        .options(joinedload(Booking.customer), plumber_with_user)
+        .filter(Booking.rating.isnot(None))
+        .order_by(Booking.created_at.desc())
+        .all()
+    )
+
+    stats['plumber_stats'] = get_plumber_stats()
+    stats['customer_stats'] = get_customer_stats()
+    stats['global_model'] = GlobalModel.query.filter_by(is_active=True).first()
+    return stats
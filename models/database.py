@@ -1,12 +1,21 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.dialects import mysql
 from datetime import datetime
 import json
+from models.weight_storage import (pack_weights, pack_sparse_delta, unpack_weights, unpack_sparse_delta,
+                                   is_sparse_blob)
 
 db = SQLAlchemy()
 
+# Weight payloads (models/weight_storage.py); MySQL's plain BLOB stops at 64 KB
+WeightBlob = db.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql', 'mariadb')
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_role', 'role'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(150), unique=True, nullable=False)
@@ -44,6 +53,15 @@ class Plumber(db.Model):
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    __table_args__ = (
+        db.Index('ix_bookings_customer_status', 'customer_id', 'status'),
+        db.Index('ix_bookings_plumber_status', 'plumber_id', 'status'),
+        db.Index('ix_bookings_plumber_rating', 'plumber_id', 'rating'),
+        db.Index('ix_bookings_customer_created', 'customer_id', 'created_at'),
+        db.Index('ix_bookings_plumber_created', 'plumber_id', 'created_at'),
+        db.Index('ix_bookings_rating_created', 'rating', 'created_at'),
+        db.Index('ix_bookings_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -60,6 +78,27 @@ class Booking(db.Model):
     def __repr__(self):
         return f'<Booking {self.id} - {self.status}>'
 
+class BookingCounter(db.Model):
+    """Running booking totals per customer (user_id) or plumber (plumber_id).
+
+    Maintained incrementally on every booking status transition so fraud
+    features can be read from one row instead of counting bookings.
+    """
+    __tablename__ = 'booking_counters'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True)
+    plumber_id = db.Column(db.Integer, db.ForeignKey('plumbers.id'), unique=True)
+    total_bookings = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_bookings = db.Column(db.Integer, nullable=False, default=0)
+    completed_bookings = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<BookingCounter {self.id} - Total: {self.total_bookings}>'
+
 class TrustScore(db.Model):
     __tablename__ = 'trust_scores'
     
@@ -80,6 +119,13 @@ class TrustScore(db.Model):
 
 class FraudAlert(db.Model):
     __tablename__ = 'fraud_alerts'
+    __table_args__ = (
+        db.Index('ix_fraud_alerts_user_id', 'user_id'),
+        db.Index('ix_fraud_alerts_plumber_id', 'plumber_id'),
+        db.Index('ix_fraud_alerts_booking_id', 'booking_id'),
+        db.Index('ix_fraud_alerts_status_flagged', 'status', 'flagged_at'),
+        db.Index('ix_fraud_alerts_risk_score', 'risk_score'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -100,29 +146,95 @@ class FraudAlert(db.Model):
 
 class LocalModelUpdate(db.Model):
     __tablename__ = 'local_model_updates'
+    __table_args__ = (
+        # The open round of the sql federated state backend
+        db.Index('ix_local_model_updates_aggregated', 'aggregated'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     plumber_id = db.Column(db.Integer, db.ForeignKey('plumbers.id'))
     model_version = db.Column(db.Integer, nullable=False)
-    update_data = db.Column(db.Text, nullable=False)
+    # Deferred: listing queries never load the payload, only .weights etc. do
+    update_data = db.deferred(db.Column(WeightBlob, nullable=False))
     data_samples_count = db.Column(db.Integer, default=0)
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
-    aggregated = db.Column(db.Boolean, default=False)
+    # sql state backend: false while in its open round, true once aggregated.
+    # NULL for rows written by the memory backend, whose round is in memory
+    aggregated = db.Column(db.Boolean)
+    
+    @property
+    def is_sparse(self):
+        return is_sparse_blob(self.update_data)
+    
+    @property
+    def weights(self):
+        return unpack_weights(self.update_data)
+    
+    @weights.setter
+    def weights(self, weights):
+        self.update_data = pack_weights(weights)
+    
+    @property
+    def sparse_delta(self):
+        """(indices, values) of a delta against model_version"""
+        return unpack_sparse_delta(self.update_data)
+    
+    @sparse_delta.setter
+    def sparse_delta(self, delta):
+        self.update_data = pack_sparse_delta(*delta)
     
     def __repr__(self):
         return f'<LocalModelUpdate {self.id} - Version: {self.model_version}>'
 
 class GlobalModel(db.Model):
     __tablename__ = 'global_models'
+    __table_args__ = (
+        db.Index('ix_global_models_is_active', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     version = db.Column(db.Integer, unique=True, nullable=False)
-    model_data = db.Column(db.Text, nullable=False)
+    model_data = db.deferred(db.Column(WeightBlob, nullable=False))
     accuracy = db.Column(db.Float)
     updates_aggregated = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     
+    @property
+    def weights(self):
+        return unpack_weights(self.model_data)
+    
+    @weights.setter
+    def weights(self, weights):
+        self.model_data = pack_weights(weights)
+    
     def __repr__(self):
         return f'<GlobalModel Version: {self.version} - Accuracy: {self.accuracy}>'
+
+class PrivacyLedger(db.Model):
+    # Privacy spent by each DP-FedAvg round, written with the GlobalModel
+    # row of the version it published, so accounting survives a restart
+    __tablename__ = 'privacy_ledger'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, unique=True, nullable=False)
+    epsilon = db.Column(db.Float, nullable=False)
+    delta = db.Column(db.Float, nullable=False)
+    steps = db.Column(db.Integer, nullable=False)
+    # JSON: the accountant's Renyi orders and total RDP at each after this round
+    rdp_state = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def accountant_state(self):
+        """RDPAccountant.state() after this round"""
+        return dict(json.loads(self.rdp_state), steps=self.steps)
+    
+    @accountant_state.setter
+    def accountant_state(self, state):
+        self.rdp_state = json.dumps({'orders': list(state['orders']), 'rdp': list(state['rdp'])})
+        self.steps = state['steps']
+    
+    def __repr__(self):
+        return f'<PrivacyLedger Version: {self.version} - Epsilon: {self.epsilon}>'
@@ -0,0 +1,72 @@
+import numpy as np
+
+
+def price_deviation(price, hourly_rate):
+    """Price deviation from the plumber's typical hourly rate.
+
+    This drives price manipulation detection in the fraud engine:
+    3.0 at >= 3x the rate, 2.0 at >= 2x, otherwise the small positive
+    excess over the rate.
+    """
+    baseline_price = hourly_rate or 0.0
+    if baseline_price <= 0 or price is None:
+        return 0.0
+    ratio = float(price) / float(baseline_price)
+    if ratio >= 3.0:
+        return 3.0
+    if ratio >= 2.0:
+        return 2.0
+    # small positive number when price modestly above typical rate
+    return max(0.0, ratio - 1.0)
+
+
+def booking_features(price, hourly_rate, scheduled_date, reference_time, customer_counts, plumber_counts):
+    """Assemble the seven fraud features create_booking feeds the detector.
+
+    customer_counts / plumber_counts are booking counter dicts (see
+    models.booking_counters.get_booking_counts); time to booking is
+    measured from reference_time.
+    """
+    customer_total = customer_counts['total_bookings']
+    plumber_total = plumber_counts['total_bookings']
+    return {
+        'price': price,
+        'customer_total_bookings': customer_total,
+        'plumber_total_bookings': plumber_total,
+        'customer_cancellation_rate': (customer_counts['cancelled_bookings'] / customer_total) if customer_total else 0.0,
+        'plumber_cancellation_rate': (plumber_counts['cancelled_bookings'] / plumber_total) if plumber_total else 0.0,
+        'time_to_booking_hours': max(0.0, (scheduled_date - reference_time).total_seconds() / 3600.0),
+        'price_deviation_from_avg': price_deviation(price, hourly_rate)
+    }
+
+
+def booking_feature_columns(prices, hourly_rates, hours_to_booking,
+                            customer_totals, customer_cancelled, plumber_totals, plumber_cancelled):
+    """Columnar, vectorized booking_features for many bookings at once.
+
+    All arguments are equal-length sequences (None allowed for price and
+    hourly rate). Returns a dict of float arrays accepted by
+    FraudDetector.detect_anomalies_batch.
+    """
+    prices = np.asarray(prices, dtype=float)
+    rates = np.nan_to_num(np.asarray(hourly_rates, dtype=float), nan=0.0)
+    customer_totals = np.asarray(customer_totals, dtype=float)
+    plumber_totals = np.asarray(plumber_totals, dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = prices / rates
+        customer_rate = np.where(customer_totals > 0, np.asarray(customer_cancelled, dtype=float) / customer_totals, 0.0)
+        plumber_rate = np.where(plumber_totals > 0, np.asarray(plumber_cancelled, dtype=float) / plumber_totals, 0.0)
+
+    deviation = np.where(ratio >= 3.0, 3.0, np.where(ratio >= 2.0, 2.0, np.maximum(0.0, ratio - 1.0)))
+    deviation = np.where((rates > 0) & ~np.isnan(prices), deviation, 0.0)
+
+    return {
+        'price': prices,
+        'customer_total_bookings': customer_totals,
+        'plumber_total_bookings': plumber_totals,
+        'customer_cancellation_rate': customer_rate,
+        'plumber_cancellation_rate': plumber_rate,
+        'time_to_booking_hours': np.maximum(0.0, np.asarray(hours_to_booking, dtype=float)),
+        'price_deviation_from_avg': deviation
+    }
@@ -0,0 +1,222 @@
+"""Re-scoring stored bookings with the current fraud model (rescore_bookings.py).
+
+Limitation: the customer and plumber counts fed to the model are read
+from booking_counters as they are now, not as they were when each
+booking was made; create_booking saw the counts of that moment. The
+counters keep no history (cancellations in particular are not dated),
+so older bookings are scored against their customer's and plumber's
+later record.
+"""
+import json
+import os
+import time
+from datetime import datetime
+import numpy as np
+from sqlalchemy import or_
+from models.database import db, Booking, Plumber, BookingCounter, FraudAlert
+from models.fraud_features import booking_feature_columns
+from ml_models.fraud_detector import fraud_detector
+
+# Alert types produced by the detector; other alerts on a booking
+# (e.g. excessive_rejections) are never overwritten by a re-score.
+MODEL_ALERT_TYPES = ('price_manipulation', 'fake_booking', 'rush_booking_scam', 'suspicious_pattern')
+
+# Same bar create_booking uses before raising an alert
+ALERT_RISK_THRESHOLD = 60
+
+
+def load_checkpoint(path):
+    """Return the saved checkpoint dict, or a fresh one if none exists"""
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'last_booking_id': 0, 'rows_processed': 0, 'alerts_inserted': 0, 'alerts_updated': 0,
+            'alerts_resolved': 0}
+
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint atomically so a crash never leaves it half written"""
+    if not path:
+        return
+    checkpoint['updated_at'] = datetime.utcnow().isoformat()
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def iter_booking_chunks(chunk_size, after_id=0):
+    """Yield lists of booking rows in primary-key order, chunk_size at a time.
+
+    Each chunk is a keyset (id > last seen id) range read on the primary
+    key, so memory stays bounded by chunk_size, every chunk can be
+    committed independently, and a run can resume from any booking id.
+    """
+    last_id = after_id
+    while True:
+        rows = (
+            db.session.query(
+                Booking.id, Booking.customer_id, Booking.plumber_id, Booking.price,
+                Booking.scheduled_date, Booking.created_at, Plumber.hourly_rate
+            )
+            .join(Plumber, Plumber.id == Booking.plumber_id)
+            .filter(Booking.id > last_id)
+            .order_by(Booking.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def _counter_lookup(column, ids):
+    """Map entity id -> (total, cancelled) for the given counter key column"""
+    rows = db.session.query(
+        column, BookingCounter.total_bookings, BookingCounter.cancelled_bookings
+    ).filter(column.in_(ids)).all()
+    return {row[0]: (row[1], row[2]) for row in rows}
+
+
+def chunk_feature_columns(rows):
+    """The seven create_booking features for booking rows, as columns.
+
+    Counts come from booking_counters; time to booking is measured from
+    when the booking was created, as create_booking saw it.
+    """
+    customers = _counter_lookup(BookingCounter.user_id, {row.customer_id for row in rows})
+    plumbers = _counter_lookup(BookingCounter.plumber_id, {row.plumber_id for row in rows})
+
+    return booking_feature_columns(
+        prices=[row.price for row in rows],
+        hourly_rates=[row.hourly_rate for row in rows],
+        hours_to_booking=[(row.scheduled_date - row.created_at).total_seconds() / 3600.0 if row.created_at else 24.0
+                          for row in rows],
+        customer_totals=[customers.get(row.customer_id, (0, 0))[0] for row in rows],
+        customer_cancelled=[customers.get(row.customer_id, (0, 0))[1] for row in rows],
+        plumber_totals=[plumbers.get(row.plumber_id, (0, 0))[0] for row in rows],
+        plumber_cancelled=[plumbers.get(row.plumber_id, (0, 0))[1] for row in rows]
+    )
+
+
+def client_training_data(user_id, limit=None):
+    """Features and fraud labels of the bookings a user took part in.
+
+    Local training data of one federated client (customer or plumber):
+    (feature columns, labels), where a booking is labelled 1 if a
+    FraudAlert was raised for it. Newest bookings first when limited.
+    """
+    flagged = db.session.query(FraudAlert.id).filter(FraudAlert.booking_id == Booking.id).exists()
+    query = (
+        db.session.query(
+            Booking.id, Booking.customer_id, Booking.plumber_id, Booking.price,
+            Booking.scheduled_date, Booking.created_at, Plumber.hourly_rate, flagged.label('flagged')
+        )
+        .join(Plumber, Plumber.id == Booking.plumber_id)
+        .filter(or_(Booking.customer_id == user_id, Plumber.user_id == user_id))
+        .order_by(Booking.id.desc())
+    )
+    rows = query.limit(limit).all() if limit else query.all()
+    return chunk_feature_columns(rows), np.array([row.flagged for row in rows], dtype=np.float64)
+
+
+def score_chunk(rows, detector=None):
+    """Build the seven create_booking features for a chunk and score it in one call"""
+    detector = detector or fraud_detector
+    return detector.detect_anomalies_batch(chunk_feature_columns(rows))
+
+
+def write_alerts(rows, results):
+    """Bring the model's FraudAlert rows for a chunk in line with its new scores.
+
+    A flagged booking keeps one pending model alert: its newest pending
+    one of the same type (else its newest pending one) is updated in
+    place, or a new one is inserted. The booking's other pending model
+    alerts, and those of bookings no longer flagged, are resolved.
+    Alerts already handled (not pending) are left untouched. Expects
+    rows in id order.
+
+    Returns (inserted, updated, resolved).
+    """
+    if not rows:
+        return 0, 0, 0
+    flagged = {row.id: (row, result) for row, result in zip(rows, results)
+               if result['is_fraud'] and result['risk_score'] > ALERT_RISK_THRESHOLD}
+
+    # The chunk is an id range, so one range read on ix_fraud_alerts_booking_id; newest first
+    chunk_ids = {row.id for row in rows}
+    existing = {}
+    for alert_id, booking_id, alert_type in (
+            db.session.query(FraudAlert.id, FraudAlert.booking_id, FraudAlert.alert_type)
+            .filter(FraudAlert.booking_id.between(rows[0].id, rows[-1].id),
+                    FraudAlert.alert_type.in_(MODEL_ALERT_TYPES), FraudAlert.status == 'pending')
+            .order_by(FraudAlert.id.desc())):
+        if booking_id in chunk_ids:
+            existing.setdefault(booking_id, []).append((alert_id, alert_type))
+
+    now = datetime.utcnow()
+    inserts, updates, resolves = [], [], []
+    for booking_id in (row.id for row in rows):
+        alerts = existing.get(booking_id, [])
+        kept = None
+        if booking_id in flagged:
+            row, result = flagged[booking_id]
+            values = {
+                'alert_type': result['fraud_type'],
+                'risk_score': result['risk_score'],
+                'description': result['description']
+            }
+            kept = next((alert for alert in alerts if alert[1] == result['fraud_type']), alerts[0] if alerts else None)
+            if kept is None:
+                inserts.append(dict(values, user_id=row.customer_id, plumber_id=row.plumber_id,
+                                    booking_id=booking_id, status='pending', flagged_at=now))
+            else:
+                updates.append(dict(values, id=kept[0]))
+        resolves.extend({'id': alert[0], 'status': 'resolved', 'resolved_at': now}
+                        for alert in alerts if alert is not kept)
+
+    if inserts:
+        db.session.bulk_insert_mappings(FraudAlert, inserts)
+    if updates:
+        db.session.bulk_update_mappings(FraudAlert, updates)
+    if resolves:
+        db.session.bulk_update_mappings(FraudAlert, resolves)
+    return len(inserts), len(updates), len(resolves)
+
+
+def rescore_bookings(chunk_size=5000, checkpoint_path=None, detector=None, log=print):
+    """Re-score every booking after checkpoint_path's last id, one chunk at a time.
+
+    Each chunk is read, scored with a single vectorized detector call,
+    its alerts written and the transaction committed before the checkpoint
+    advances, so an interrupted run resumes without skipping or repeating
+    work. Returns the final checkpoint dict including rows_per_second.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    start_rows = checkpoint['rows_processed']
+    started = time.perf_counter()
+
+    for rows in iter_booking_chunks(chunk_size, after_id=checkpoint['last_booking_id']):
+        results = score_chunk(rows, detector)
+        inserted, updated, resolved = write_alerts(rows, results)
+        db.session.commit()
+        # Drop identity-map state so long runs stay flat in memory
+        db.session.expunge_all()
+
+        checkpoint['last_booking_id'] = rows[-1].id
+        checkpoint['rows_processed'] += len(rows)
+        checkpoint['alerts_inserted'] += inserted
+        checkpoint['alerts_updated'] += updated
+        checkpoint['alerts_resolved'] = checkpoint.get('alerts_resolved', 0) + resolved
+        save_checkpoint(checkpoint_path, checkpoint)
+
+        elapsed = time.perf_counter() - started
+        rate = (checkpoint['rows_processed'] - start_rows) / elapsed if elapsed else 0.0
+        log(f"  up to booking {checkpoint['last_booking_id']}: {checkpoint['rows_processed']} rows, "
+            f"{checkpoint['alerts_inserted']} alerts inserted, {checkpoint['alerts_updated']} updated, "
+            f"{checkpoint['alerts_resolved']} resolved ({rate:,.0f} rows/sec)")
+
+    elapsed = time.perf_counter() - started
+    checkpoint['rows_per_second'] = (checkpoint['rows_processed'] - start_rows) / elapsed if elapsed else 0.0
+    return checkpoint
@@ -0,0 +1,127 @@
+from sqlalchemy import Text, bindparam, func, inspect, select, text as sql_text
+from models.database import db, LocalModelUpdate
+from models.weight_storage import is_legacy_json, json_to_blob
+
+
+def ensure_indexes(engine=None):
+    """Create any index declared on the models that the database lacks.
+
+    db.create_all() only creates indexes together with new tables, so
+    databases created before an index was declared never receive it.
+    Index.create(checkfirst=True) emits the dialect-specific DDL, which
+    covers SQLite, MySQL and PostgreSQL alike. Returns the names of the
+    indexes that were created.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            index.create(bind=engine, checkfirst=True)
+            created.append(index.name)
+    return created
+
+
+# Weight payload columns that held JSON text before they became binary
+WEIGHT_BLOB_COLUMNS = (('local_model_updates', 'update_data'), ('global_models', 'model_data'))
+
+
+def ensure_weight_blob_columns(engine=None):
+    """Switch legacy TEXT weight columns to binary ones.
+
+    MySQL and PostgreSQL reject binary payloads in a TEXT column, so those
+    are altered in place (LONGBLOB / BYTEA), keeping the existing JSON
+    bytes for convert_json_weights() to rewrite. SQLite stores blobs in
+    any column and needs no DDL. Returns the 'table.column' names altered.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    altered = []
+    for table_name, column_name in WEIGHT_BLOB_COLUMNS:
+        if table_name not in existing_tables:
+            continue
+        columns = {column['name']: column for column in inspector.get_columns(table_name)}
+        column = columns.get(column_name)
+        if column is None or not isinstance(column['type'], Text):
+            continue
+        if engine.dialect.name in ('mysql', 'mariadb'):
+            statement = f'ALTER TABLE `{table_name}` MODIFY `{column_name}` LONGBLOB NOT NULL'
+        elif engine.dialect.name == 'postgresql':
+            statement = (f'ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE BYTEA '
+                         f"USING convert_to({column_name}, 'UTF8')")
+        else:
+            continue
+        with engine.begin() as conn:
+            conn.execute(sql_text(statement))
+        altered.append(f'{table_name}.{column_name}')
+    return altered
+
+
+def convert_json_weights(engine=None, batch_size=200):
+    """Rewrite weight rows that still hold JSON text as binary payloads.
+
+    Only the first byte of each row is scanned to find JSON ('[' or '{');
+    matching rows are then loaded, converted (models/weight_storage.py)
+    and updated batch_size at a time, one transaction per batch, so an
+    interrupted run can simply be repeated. Returns the number of rows
+    converted.
+    """
+    engine = engine or db.engine
+    existing_tables = set(inspect(engine).get_table_names())
+
+    converted = 0
+    for table_name, column_name in WEIGHT_BLOB_COLUMNS:
+        if table_name not in existing_tables:
+            continue
+        table = db.metadata.tables[table_name]
+        column = table.c[column_name]
+        with engine.connect() as conn:
+            prefixes = conn.execute(select(table.c.id, func.substr(column, 1, 1))).all()
+        legacy_ids = [row_id for row_id, prefix in prefixes if prefix is not None and is_legacy_json(prefix)]
+
+        for start in range(0, len(legacy_ids), batch_size):
+            batch = legacy_ids[start:start + batch_size]
+            with engine.begin() as conn:
+                rows = conn.execute(select(table.c.id, column).where(table.c.id.in_(batch))).all()
+                updates = [{'row_id': row_id, 'payload': json_to_blob(data)}
+                           for row_id, data in rows if is_legacy_json(data)]
+                if updates:
+                    conn.execute(table.update().where(table.c.id == bindparam('row_id'))
+                                 .values({column_name: bindparam('payload')}), updates)
+                converted += len(updates)
+    return converted
+
+
+def detach_memory_updates(engine=None, before_version=None):
+    """Take local_model_updates rows left pending by the memory state backend
+    out of the sql backend's open round (aggregated = NULL).
+
+    The memory backend keeps its round in process memory; its rows are
+    history. Older versions wrote them with aggregated = false, so the
+    sql backend would have folded all of them, from any model version,
+    into its first round. Starting the sql backend, pass the published
+    version as before_version: only rows trained from an older version
+    are detached, and only while the sql backend has not closed a round
+    yet (once it has, its pending rows are its own). Returns the number
+    of rows detached.
+    """
+    engine = engine or db.engine
+    updates = LocalModelUpdate.__table__
+    if updates.name not in inspect(engine).get_table_names():
+        return 0
+    condition = updates.c.aggregated == False
+    with engine.begin() as conn:
+        if before_version is not None:
+            if conn.execute(select(updates.c.id).where(updates.c.aggregated == True).limit(1)).first() is not None:
+                return 0
+            condition = condition & (updates.c.model_version < before_version)
+        return conn.execute(updates.update().where(condition).values(aggregated=None)).rowcount
@@ -0,0 +1,71 @@
+import io
+import json
+import numpy as np
+
+# Binary encodings for the weight columns (LocalModelUpdate.update_data,
+# GlobalModel.model_data). Dense weights are a float64 .npy file; a sparse
+# delta is an .npz archive holding 'indices' and 'values'. Rows written
+# before the switch hold JSON text (a list, or a dict with indices/values
+# for a sparse delta); the unpack functions still read those, and
+# models/migrations.py converts them.
+NPY_MAGIC = b'\x93NUMPY'
+NPZ_MAGIC = b'PK'
+
+
+def _as_bytes(data):
+    return data.encode('utf-8') if isinstance(data, str) else bytes(data)
+
+
+def is_legacy_json(data):
+    """True if a weight column value is JSON text from before the binary columns"""
+    return len(data) > 0 and _as_bytes(data[:1]) in (b'[', b'{')
+
+
+def is_sparse_blob(data):
+    """True if a weight column value holds a sparse delta"""
+    if is_legacy_json(data):
+        return isinstance(json.loads(_as_bytes(data)), dict)
+    return _as_bytes(data[:2]) == NPZ_MAGIC
+
+
+def pack_weights(weights):
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(weights, dtype=np.float64).ravel(), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def pack_sparse_delta(indices, values):
+    buffer = io.BytesIO()
+    np.savez(buffer, indices=np.asarray(indices, dtype=np.int64).ravel(),
+             values=np.asarray(values, dtype=np.float64).ravel())
+    return buffer.getvalue()
+
+
+def unpack_weights(data):
+    """Dense weights from a weight column value, as a float64 array"""
+    data = _as_bytes(data)
+    if is_legacy_json(data):
+        return np.array(json.loads(data), dtype=np.float64)
+    if data[:len(NPY_MAGIC)] != NPY_MAGIC:
+        raise ValueError('Weight column does not hold dense weights')
+    return np.load(io.BytesIO(data), allow_pickle=False)
+
+
+def unpack_sparse_delta(data):
+    """(indices, values) from a weight column value holding a sparse delta"""
+    data = _as_bytes(data)
+    if is_legacy_json(data):
+        delta = json.loads(data)
+        return np.array(delta['indices'], dtype=np.int64), np.array(delta['values'], dtype=np.float64)
+    if data[:len(NPZ_MAGIC)] != NPZ_MAGIC:
+        raise ValueError('Weight column does not hold a sparse delta')
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        return archive['indices'], archive['values']
+
+
+def json_to_blob(data):
+    """Binary encoding of a legacy JSON weight value"""
+    decoded = json.loads(_as_bytes(data))
+    if isinstance(decoded, dict):
+        return pack_sparse_delta(decoded['indices'], decoded['values'])
+    return pack_weights(decoded)
@@ -0,0 +1,42 @@
+from config import Config
+from ml_models.fraud_detector import FraudDetector
+from ml_models.model_artifacts import list_versions, current_version, publish_version, prune_versions
+import argparse
+import sys
+
+def main():
+    parser = argparse.ArgumentParser(description='Publish fraud models as versioned, memory-mappable artifacts')
+    parser.add_argument('--model-dir', default=Config.FRAUD_MODEL_DIR, help='artifact directory workers load from')
+    parser.add_argument('--from-pickle', metavar='PATH', default='ml_models/fraud_detector.pkl',
+                        help='joblib model saved with FraudDetector.save_model to convert')
+    parser.add_argument('--no-publish', action='store_true', help='write the new version without making it CURRENT')
+    parser.add_argument('--activate', type=int, metavar='VERSION',
+                        help='make an existing version CURRENT (e.g. to roll back) instead of publishing')
+    parser.add_argument('--keep', type=int, metavar='N', help='afterwards, delete all but the newest N versions')
+    parser.add_argument('--list', action='store_true', help='list published versions and exit')
+    args = parser.parse_args()
+
+    if args.list:
+        active = current_version(args.model_dir)
+        for version in list_versions(args.model_dir):
+            print(f"v{version}{'  (current)' if version == active else ''}")
+        return 0
+
+    if args.activate is not None:
+        publish_version(args.model_dir, args.activate)
+        print(f"Version {args.activate} is now current in {args.model_dir}")
+    else:
+        detector = FraudDetector()
+        if not detector.load_model(args.from_pickle):
+            print(f"No trained model at {args.from_pickle}")
+            return 1
+        version = detector.save_artifact(args.model_dir, publish=not args.no_publish)
+        print(f"Wrote version {version} to {args.model_dir}" + ('' if args.no_publish else ' and made it current'))
+
+    if args.keep:
+        removed = prune_versions(args.model_dir, keep=args.keep)
+        print(f"Removed {len(removed)} old version(s).")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,26 @@
+from app import app
+from models.booking_counters import rebuild_booking_counters
+import argparse
+import sys
+
+def main():
+    parser = argparse.ArgumentParser(description='Recompute booking_counters from the bookings table')
+    parser.add_argument('--check', action='store_true',
+                        help='only report drifted counters; exit with status 1 if any are found')
+    args = parser.parse_args()
+
+    with app.app_context():
+        mismatches = rebuild_booking_counters(dry_run=args.check)
+
+    for key, entity_id, stored, expected in mismatches:
+        print(f"{key}={entity_id}: stored={stored} expected={expected}")
+
+    if args.check:
+        print(f"{len(mismatches)} counter(s) out of sync.")
+        return 1 if mismatches else 0
+
+    print(f"Rebuilt booking counters ({len(mismatches)} row(s) corrected).")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+from app import app
+from ml_models.fraud_detector import fraud_detector
+from models.fraud_rescoring import rescore_bookings
+import argparse
+import os
+import sys
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-score all bookings with the current fraud model')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='bookings read and scored per batch')
+    parser.add_argument('--checkpoint', default='rescore_checkpoint.json',
+                        help='file recording the last re-scored booking id (resumes from it)')
+    parser.add_argument('--reset', action='store_true', help='ignore any checkpoint and start from the first booking')
+    parser.add_argument('--model', default='ml_models/fraud_detector.pkl', help='trained model to load, if present')
+    args = parser.parse_args()
+
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    if fraud_detector.load_model(args.model):
+        print(f"Loaded fraud model from {args.model}")
+    elif fraud_detector.is_trained:
+        print(f"Using published fraud model version {fraud_detector.model_version}")
+    else:
+        print("No trained model found - scoring with the rule-based detector")
+
+    with app.app_context():
+        print(f"Re-scoring bookings in chunks of {args.chunk_size}...")
+        result = rescore_bookings(chunk_size=args.chunk_size, checkpoint_path=args.checkpoint)
+
+    print(f"Done: {result['rows_processed']} rows, {result['alerts_inserted']} alerts inserted, "
+          f"{result['alerts_updated']} updated, {result['alerts_resolved']} resolved "
+          f"({result['rows_per_second']:,.0f} rows/sec).")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+from flask import Flask, request, jsonify
+from config import Config
+from ml_models.regional_aggregator import RegionalAggregator, PartialRejected, http_forwarder
+from ml_models.weight_codec import WEIGHTS_MIMETYPE, decode_weights
+import argparse
+import sys
+import threading
+
+def create_regional_app(aggregator, wake):
+    """Flask app in front of one RegionalAggregator.
+
+    Clients of the region post here instead of to the root's
+    /api/federated/submit-update, with the same JSON or binary body. The
+    edge does not check sessions: run it where only the region's clients
+    (or a gateway that authenticates them) can reach it. A submission that
+    makes a flush due only sets wake; flush_periodically forwards the
+    partial, so no client request waits on the root.
+    """
+    app = Flask(__name__)
+
+    @app.route('/submit-update', methods=['POST'])
+    def submit_update():
+        if request.mimetype == WEIGHTS_MIMETYPE:
+            try:
+                local_weights, _ = decode_weights(request.get_data(cache=False))
+            except ValueError as e:
+                return jsonify({'success': False, 'message': f'Invalid update data: {e}'}), 400
+            num_samples = request.headers.get('X-Num-Samples', type=int) or request.args.get('num_samples', 0, type=int)
+            client_id = request.headers.get('X-Client-Id')
+        else:
+            data = request.get_json() or {}
+            local_weights, num_samples, client_id = data.get('weights', []), data.get('num_samples', 0), data.get('client_id')
+        if not aggregator.receive_local_update(client_id, local_weights, num_samples):
+            return jsonify({'success': False, 'message': 'Invalid update data'}), 400
+        if aggregator.due():
+            wake.set()
+        return jsonify({'success': True, 'message': 'Update received', 'stats': aggregator.get_stats()})
+
+    @app.route('/flush', methods=['POST'])
+    def flush_now():
+        forwarded = flush(aggregator)
+        return jsonify({'success': forwarded is not False, 'stats': aggregator.get_stats()})
+
+    @app.route('/stats')
+    def stats():
+        return jsonify(aggregator.get_stats())
+
+    return app
+
+def flush(aggregator):
+    """Forward a partial; False if the root rejected it (dropped) or could not be reached (resent next flush)"""
+    try:
+        return aggregator.flush()
+    except PartialRejected as e:
+        print(f"[{aggregator.region}] partial dropped: {e}")
+        return False
+    except Exception as e:
+        print(f"[{aggregator.region}] forwarding failed, will retry: {e}")
+        return False
+
+def flush_periodically(aggregator, interval, wake):
+    """Flush whenever due, checking every interval seconds or as soon as wake is set"""
+    while True:
+        wake.wait(interval)
+        wake.clear()
+        if aggregator.due():
+            flush(aggregator)
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a regional federated aggregator that forwards partial sums to the root')
+    parser.add_argument('--region', required=True, help='region name, e.g. a Plumber.location like "Bengaluru North"')
+    parser.add_argument('--root-url', default='http://localhost:5000', help='root app the partial sums go to')
+    parser.add_argument('--token', default=Config.FEDAVG_REGION_TOKEN,
+                        help='shared secret the root checks (default: FEDAVG_REGION_TOKEN)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5101)
+    parser.add_argument('--flush-updates', type=int, default=50, help='forward once this many updates are pending')
+    parser.add_argument('--flush-seconds', type=float, default=30.0, help='or once the oldest has waited this long')
+    args = parser.parse_args()
+
+    if not args.token:
+        print("Set FEDAVG_REGION_TOKEN (or --token) to the root's shared region token")
+        return 1
+    aggregator = RegionalAggregator(args.region, forward=http_forwarder(args.root_url, args.token),
+                                    flush_updates=args.flush_updates, flush_seconds=args.flush_seconds)
+    wake = threading.Event()
+    threading.Thread(target=flush_periodically, args=(aggregator, min(1.0, args.flush_seconds), wake),
+                     daemon=True).start()
+    print(f"Regional aggregator for {args.region!r} on {args.host}:{args.port}, forwarding to {args.root_url}")
+    create_regional_app(aggregator, wake).run(host=args.host, port=args.port, threaded=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,6 @@
 from app import app, db, bcrypt
 from models.database import User, Plumber, Booking, TrustScore, FraudAlert, GlobalModel
+from models.booking_counters import rebuild_booking_counters
 from datetime import datetime, timedelta
 import random
 
@@ -123,7 +124,7 @@ def seed_database():
         print("Creating initial global model...")
         global_model = GlobalModel(
             version=1,
-            model_data='[0.1, -0.2, 0.3, -0.1, 0.4, -0.3, 0.2, -0.4, 0.1, 0.0]',
+            weights=[0.1, -0.2, 0.3, -0.1, 0.4, -0.3, 0.2, -0.4, 0.1, 0.0],
             accuracy=0.0,
             updates_aggregated=0,
             is_active=True
@@ -131,6 +132,7 @@ def seed_database():
         db.session.add(global_model)
 
         db.session.commit()
+        rebuild_booking_counters()
         print("Database seeded successfully!")
         print("\nSample Credentials:")
         print("Admin: admin@gmail.com / admin")
@@ -29,7 +29,8 @@ CREATE TABLE `users` (
   `created_at` datetime DEFAULT CURRENT_TIMESTAMP,
   `is_active` tinyint(1) DEFAULT 1,
   PRIMARY KEY (`id`),
-  UNIQUE KEY `email` (`email`)
+  UNIQUE KEY `email` (`email`),
+  KEY `ix_users_role` (`role`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- =====================================================
@@ -72,10 +73,39 @@ CREATE TABLE `bookings` (
   PRIMARY KEY (`id`),
   KEY `customer_id` (`customer_id`),
   KEY `plumber_id` (`plumber_id`),
+  KEY `ix_bookings_customer_status` (`customer_id`, `status`),
+  KEY `ix_bookings_plumber_status` (`plumber_id`, `status`),
+  KEY `ix_bookings_plumber_rating` (`plumber_id`, `rating`),
+  KEY `ix_bookings_customer_created` (`customer_id`, `created_at`),
+  KEY `ix_bookings_plumber_created` (`plumber_id`, `created_at`),
+  KEY `ix_bookings_rating_created` (`rating`, `created_at`),
+  KEY `ix_bookings_created_at` (`created_at`),
   CONSTRAINT `bookings_ibfk_1` FOREIGN KEY (`customer_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
   CONSTRAINT `bookings_ibfk_2` FOREIGN KEY (`plumber_id`) REFERENCES `plumbers` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
+-- =====================================================
+-- Table: booking_counters
+-- =====================================================
+
+DROP TABLE IF EXISTS `booking_counters`;
+CREATE TABLE `booking_counters` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `user_id` int(11) DEFAULT NULL,
+  `plumber_id` int(11) DEFAULT NULL,
+  `total_bookings` int(11) NOT NULL DEFAULT 0,
+  `cancelled_bookings` int(11) NOT NULL DEFAULT 0,
+  `completed_bookings` int(11) NOT NULL DEFAULT 0,
+  `rating_sum` int(11) NOT NULL DEFAULT 0,
+  `rating_count` int(11) NOT NULL DEFAULT 0,
+  `updated_at` datetime DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `user_id` (`user_id`),
+  UNIQUE KEY `plumber_id` (`plumber_id`),
+  CONSTRAINT `booking_counters_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
+  CONSTRAINT `booking_counters_ibfk_2` FOREIGN KEY (`plumber_id`) REFERENCES `plumbers` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
 -- =====================================================
 -- Table: trust_scores
 -- =====================================================
@@ -117,9 +147,11 @@ CREATE TABLE `fraud_alerts` (
   `flagged_at` datetime DEFAULT CURRENT_TIMESTAMP,
   `resolved_at` datetime DEFAULT NULL,
   PRIMARY KEY (`id`),
-  KEY `user_id` (`user_id`),
-  KEY `plumber_id` (`plumber_id`),
-  KEY `booking_id` (`booking_id`),
+  KEY `ix_fraud_alerts_user_id` (`user_id`),
+  KEY `ix_fraud_alerts_plumber_id` (`plumber_id`),
+  KEY `ix_fraud_alerts_booking_id` (`booking_id`),
+  KEY `ix_fraud_alerts_status_flagged` (`status`, `flagged_at`),
+  KEY `ix_fraud_alerts_risk_score` (`risk_score`),
   CONSTRAINT `fraud_alerts_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
   CONSTRAINT `fraud_alerts_ibfk_2` FOREIGN KEY (`plumber_id`) REFERENCES `plumbers` (`id`) ON DELETE CASCADE,
   CONSTRAINT `fraud_alerts_ibfk_3` FOREIGN KEY (`booking_id`) REFERENCES `bookings` (`id`) ON DELETE CASCADE
@@ -135,13 +167,14 @@ CREATE TABLE `local_model_updates` (
   `user_id` int(11) DEFAULT NULL,
   `plumber_id` int(11) DEFAULT NULL,
   `model_version` int(11) NOT NULL,
-  `update_data` text NOT NULL,
+  `update_data` longblob NOT NULL,
   `data_samples_count` int(11) DEFAULT 0,
   `submitted_at` datetime DEFAULT CURRENT_TIMESTAMP,
-  `aggregated` tinyint(1) DEFAULT 0,
+  `aggregated` tinyint(1) DEFAULT NULL,
   PRIMARY KEY (`id`),
   KEY `user_id` (`user_id`),
   KEY `plumber_id` (`plumber_id`),
+  KEY `ix_local_model_updates_aggregated` (`aggregated`),
   CONSTRAINT `local_model_updates_ibfk_1` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`) ON DELETE CASCADE,
   CONSTRAINT `local_model_updates_ibfk_2` FOREIGN KEY (`plumber_id`) REFERENCES `plumbers` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -154,12 +187,30 @@ DROP TABLE IF EXISTS `global_models`;
 CREATE TABLE `global_models` (
   `id` int(11) NOT NULL AUTO_INCREMENT,
   `version` int(11) NOT NULL,
-  `model_data` text NOT NULL,
+  `model_data` longblob NOT NULL,
   `accuracy` float DEFAULT NULL,
   `updates_aggregated` int(11) DEFAULT 0,
   `created_at` datetime DEFAULT CURRENT_TIMESTAMP,
   `is_active` tinyint(1) DEFAULT 1,
   PRIMARY KEY (`id`),
+  UNIQUE KEY `version` (`version`),
+  KEY `ix_global_models_is_active` (`is_active`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- =====================================================
+-- Table: privacy_ledger
+-- =====================================================
+
+DROP TABLE IF EXISTS `privacy_ledger`;
+CREATE TABLE `privacy_ledger` (
+  `id` int(11) NOT NULL AUTO_INCREMENT,
+  `version` int(11) NOT NULL,
+  `epsilon` float NOT NULL,
+  `delta` float NOT NULL,
+  `steps` int(11) NOT NULL,
+  `rdp_state` text NOT NULL,
+  `created_at` datetime DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`id`),
   UNIQUE KEY `version` (`version`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -196,8 +247,10 @@ INSERT INTO `trust_scores` (`plumber_id`, `overall_score`, `completion_rate`, `r
 (2, 92.1, 98.0, 95.0, 88.0, 0, 5.0, 42);
 
 -- Insert Global Model
+-- model_data is a float64 .npy blob of [0.1, -0.2, 0.3, -0.1, 0.4, -0.3, 0.2, -0.4, 0.1, 0.0]
+-- (models/weight_storage.py)
 INSERT INTO `global_models` (`version`, `model_data`, `accuracy`, `updates_aggregated`, `is_active`) VALUES
-(1, '[0.1, -0.2, 0.3, -0.1, 0.4, -0.3, 0.2, -0.4, 0.1, 0.0]', 0.0, 0, 1);
+(1, X'934E554D5059010076007B276465736372273A20273C6638272C2027666F727472616E5F6F72646572273A2046616C73652C20277368617065273A202831302C292C207D20202020202020202020202020202020202020202020202020202020202020202020202020202020202020202020202020202020202020202020200A9A9999999999B93F9A9999999999C9BF333333333333D33F9A9999999999B9BF9A9999999999D93F333333333333D3BF9A9999999999C93F9A9999999999D9BF9A9999999999B93F0000000000000000', 0.0, 0, 1);
 
 COMMIT;
 